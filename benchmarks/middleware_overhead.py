@@ -0,0 +1,121 @@
+"""
+Measure the per-request overhead of the HTTP middlewares on the `GET /` route.
+
+Three applications serving the same route are driven directly through their ASGI
+interface, so neither a server nor the network adds noise:
+
+- bare:     no middleware at all,
+- legacy:   the previous `@app.middleware("http")` exception handler and the
+            `BaseHTTPMiddleware` based IP filter,
+- pure:     `CatchExceptionsMiddleware` and `BlockIPMiddleware` from `core.middlewares`.
+
+Usage:
+    python -m benchmarks.middleware_overhead [requests]
+"""
+import asyncio
+import sys
+import time
+from fastapi import FastAPI, Request, HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+from core.middlewares import BlockIPMiddleware, CatchExceptionsMiddleware
+
+# The deny list the legacy middleware was hard-coded with.
+BLOCKED_IPS = {"192.168.1.10", "203.0.113.42"}
+
+
+class LegacyBlockIPMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if request.client.host in BLOCKED_IPS:
+            raise HTTPException(status_code=403, detail="Forbidden: Your IP is blocked.")
+        return await call_next(request)
+
+
+async def legacy_catch_exceptions(request: Request, call_next):
+    try:
+        return await call_next(request)
+    except HTTPException as h:
+        raise h
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"detail": str(e)})
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def home():
+        return "Hello world"
+
+    if variant == "legacy":
+        # noinspection PyTypeChecker
+        app.add_middleware(LegacyBlockIPMiddleware)
+        app.middleware("http")(legacy_catch_exceptions)
+    elif variant == "pure":
+        # noinspection PyTypeChecker
+        app.add_middleware(BlockIPMiddleware)
+        # noinspection PyTypeChecker
+        app.add_middleware(CatchExceptionsMiddleware)
+    return app
+
+
+async def call(app: FastAPI) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+        "app": app,
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    # Warm up routing and dependency caches before timing.
+    for _ in range(200):
+        await call(app)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        assert await call(app) == 200
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int):
+    apps = {variant: build_app(variant) for variant in ("bare", "legacy", "pure")}
+    for app in apps.values():
+        # Build the middleware stack outside the timed loop.
+        await call(app)
+
+    results = {variant: await measure(app, requests) for variant, app in apps.items()}
+    bare = results["bare"]
+    for variant, micros in results.items():
+        print(f"{variant:>7}: {micros:8.1f} µs/request  (+{micros - bare:6.1f} µs middleware overhead)")
+
+    legacy_overhead = results["legacy"] - bare
+    pure_overhead = results["pure"] - bare
+    if pure_overhead > 0:
+        print(f"overhead reduced {legacy_overhead / pure_overhead:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
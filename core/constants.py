@@ -14,6 +14,13 @@ class Tables(str, Enum):
     ORGANIZATIONS_USERS = "organizations_users"
     RISK_MODULE_USERS = "risk_module_users"
     ACTIVITY_REPORTS = "activity_reports"
+    RISK_HEATMAP_CELLS = "risk_heatmap_cells"
+    KRI_READINGS = "kri_readings"
+    KRI_READING_ROLLUPS = "kri_reading_rollups"
+    RMP_ACTIVITY_COUNTERS = "rmp_activity_counters"
+    RISK_SCORING_CONFIGS = "risk_scoring_configs"
+    RISK_SCORES = "risk_scores"
+    BUSINESS_PROCESS = "business_process"
 
 class RisksColumns(str, Enum):
     RISK_ID = "risk_id"
@@ -59,7 +66,9 @@ class RiskKRIColumns(str, Enum):
     HIGH = "high"
     MEDIUM = "medium"
     LOW = "low"
+    FREQUENCY = "frequency"
     NEXT_AT = "next_at"
+    ANCHOR_AT = "anchor_at"
     CREATED_AT = "created_at"
 
 class ActivitiesColumns(str, Enum):
@@ -73,6 +82,8 @@ class ActivitiesColumns(str, Enum):
     CREATOR = "creator"
     LEADS = "leads"
     NEXT_AT = "next_at"
+    ANCHOR_AT = "anchor_at"
+    DUE_SINCE = "due_since"
     CREATED_AT = "created_at"
 
 class RMPColumns(str, Enum):
@@ -128,3 +139,71 @@ class RiskOwnerColumns(str, Enum):
     RISK_ID = "risk_id"
     USER_ID = "user_id"
     DATE_ASSIGNED = "date_assigned"
+
+class RiskHeatmapCellsColumns(str, Enum):
+    REGISTER_ID = "register_id"
+    RATING_TYPE = "rating_type"
+    IMPACT = "impact"
+    LIKELIHOOD = "likelihood"
+    RISKS = "risks"
+
+class KRIReadingsColumns(str, Enum):
+    RISK_KRI_ID = "risk_kri_id"
+    MEASURED_AT = "measured_at"
+    VALUE = "value"
+    BAND = "band"
+    CREATED_AT = "created_at"
+
+class KRIReadingRollupsColumns(str, Enum):
+    RISK_KRI_ID = "risk_kri_id"
+    GRANULARITY = "granularity"
+    BUCKET = "bucket"
+
+class RMPActivityCountersColumns(str, Enum):
+    RMP_ID = "rmp_id"
+    NOT_STARTED = "not_started"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    REPORTS = "reports"
+
+class RiskScoringConfigsColumns(str, Enum):
+    MODULE_ID = "module_id"
+    IMPACT_LEVELS = "impact_levels"
+    LIKELIHOOD_LEVELS = "likelihood_levels"
+    IMPACT_WEIGHT = "impact_weight"
+    LIKELIHOOD_WEIGHT = "likelihood_weight"
+    MATRIX = "matrix"
+    BANDS = "bands"
+    UPDATED_AT = "updated_at"
+
+class RiskScoresColumns(str, Enum):
+    RISK_ID = "risk_id"
+    REGISTER_ID = "register_id"
+    INHERENT_SCORE = "inherent_score"
+    INHERENT_BAND = "inherent_band"
+    RESIDUAL_SCORE = "residual_score"
+    RESIDUAL_BAND = "residual_band"
+    UPDATED_AT = "updated_at"
+
+class RollupGranularity(str, Enum):
+    RAW = "raw"
+    DAY = "day"
+    MONTH = "month"
+
+class IPFilterAction(str, Enum):
+    ALLOW = "allow"
+    DENY = "deny"
+
+class KRIBand(str, Enum):
+    VERY_HIGH = "very_high"
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+class FrozenScope(str, Enum):
+    RISK_REGISTER = "risk_register"
+    RMP = "rmp"
+
+class ScheduledItemKind(str, Enum):
+    KRI = "kri"
+    ACTIVITY = "activity"
@@ -0,0 +1,155 @@
+import zlib
+from functools import lru_cache
+from typing import Any, Optional
+import pydantic_core
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Payloads larger than this many bytes are compressed by `encode()`.
+COMPRESSION_THRESHOLD = 4096
+COMPRESSION_LEVEL = 1
+
+# First byte of every payload produced by `encode()`.
+RAW_PAYLOAD = 0
+ZLIB_PAYLOAD = 1
+GZIP_PAYLOAD = 2
+
+# zlib window bits selecting the gzip container, and automatic zlib/gzip detection.
+GZIP_WBITS = 31
+AUTO_WBITS = 47
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _holds_models(data: Any) -> bool:
+    if isinstance(data, BaseModel):
+        return True
+    return isinstance(data, (list, tuple)) and len(data) > 0 and isinstance(data[0], BaseModel)
+
+
+@lru_cache(maxsize=256)
+def get_adapter(model: Any) -> TypeAdapter:
+    """
+    Return a cached `TypeAdapter` for a model or type expression such as `list[ReadRisk]`.
+
+    Building an adapter compiles a validator and serializer, so adapters are built once
+    per type and reused.
+    """
+    return TypeAdapter(model)
+
+
+def encode_json(data: Any) -> bytes:
+    """
+    Serialize data to JSON bytes in a single pass.
+
+    Pydantic models (or lists of them) are dumped straight to bytes by pydantic-core
+    without building intermediate dictionaries. Plain rows, dictionaries and lists are
+    written with orjson when it is installed. Both paths handle `datetime` values and
+    `Enum` members natively.
+
+    Args:
+        data (Any): A Pydantic model, a list of models, or JSON-compatible Python data.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if orjson is None or _holds_models(data):
+        return pydantic_core.to_json(data)
+    return orjson.dumps(data, default=_default)
+
+
+def decode_json(data: bytes, model: Optional[Any] = None) -> Any:
+    """
+    Parse JSON bytes, optionally validating them straight into a Pydantic type.
+
+    Args:
+        data (bytes): The JSON document.
+        model (Optional[Any]): A model or type expression (e.g. `list[JoinRisk]`). When
+                               given, the document is validated in one pass by pydantic-core.
+
+    Returns:
+        Any: The decoded Python data or validated model instances.
+    """
+    if model is not None:
+        return get_adapter(model).validate_json(data)
+    if orjson is not None:
+        return orjson.loads(data)
+    return pydantic_core.from_json(data)
+
+
+def encode(
+        data: Any,
+        compression_threshold: Optional[int] = COMPRESSION_THRESHOLD,
+        compression_level: int = COMPRESSION_LEVEL
+) -> bytes:
+    """
+    Encode data into the binary payload format used by the cache layer.
+
+    The payload is a one-byte header followed by the JSON document, gzip-compressed
+    when it is larger than `compression_threshold` bytes. The gzip container is used
+    so a compressed body can be sent to HTTP clients as-is (see `payload_body()`).
+
+    Args:
+        data (Any): The value to encode.
+        compression_threshold (Optional[int]): Minimum size in bytes before compressing.
+                                               `None` disables compression.
+        compression_level (int): zlib compression level, 1 (fastest) to 9 (smallest).
+
+    Returns:
+        bytes: The encoded payload.
+    """
+    body = encode_json(data)
+    if compression_threshold is not None and len(body) > compression_threshold:
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, GZIP_WBITS)
+        return bytes((GZIP_PAYLOAD,)) + compressor.compress(body) + compressor.flush()
+    return bytes((RAW_PAYLOAD,)) + body
+
+
+def payload_body(payload: bytes) -> tuple[Optional[str], bytes]:
+    """
+    Split a payload produced by `encode()` into its HTTP content coding and body.
+
+    Args:
+        payload (bytes): The encoded payload.
+
+    Returns:
+        tuple[Optional[str], bytes]: `("gzip", body)` for compressed payloads, where the
+                                     body is a complete gzip stream, or `(None, body)`
+                                     for plain JSON.
+    """
+    kind = payload[0]
+    if kind == GZIP_PAYLOAD:
+        return "gzip", payload[1:]
+    if kind == ZLIB_PAYLOAD:
+        return None, zlib.decompress(payload[1:])
+    return None, payload[1:]
+
+
+def decode(payload: bytes, model: Optional[Any] = None) -> Any:
+    """
+    Decode a payload produced by `encode()`.
+
+    Args:
+        payload (bytes): The encoded payload.
+        model (Optional[Any]): A model or type expression to validate the data into.
+
+    Raises:
+        ValueError: If the payload header is not recognised.
+
+    Returns:
+        Any: The decoded data.
+    """
+    kind, body = payload[0], payload[1:]
+    if kind in (ZLIB_PAYLOAD, GZIP_PAYLOAD):
+        body = zlib.decompress(body, AUTO_WBITS)
+    elif kind != RAW_PAYLOAD:
+        raise ValueError(f"Unknown payload format: {kind}")
+    return decode_json(body, model)
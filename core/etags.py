@@ -0,0 +1,94 @@
+import hashlib
+from enum import Enum
+from typing import Optional, Union
+from fastapi import Request, Response, HTTPException
+from core.constants import FrozenScope
+from services.databases.redis.frozen import is_known_frozen
+from services.databases.redis.versions import get_versions
+
+# Sent with data from frozen registers and RMPs, which never changes again.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Stands in for the table versions in the ETags of frozen scopes.
+FROZEN_VERSION = "frozen"
+
+
+def make_etag(request: Request, versions: list[str]) -> str:
+    """
+    Build a weak ETag from the request target and the change versions of its tables.
+
+    The tag is weak because the same data may be sent with different encodings.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(request.url.path.encode())
+    digest.update(request.url.query.encode())
+    digest.update(request.headers.get("accept", "").encode())
+    digest.update(":".join(versions).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an `If-None-Match` header against an ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_get(*tables: Union[str, Enum], frozen: Optional[tuple[FrozenScope, str]] = None):
+    """
+    Dependency factory adding ETag / `If-None-Match` support to a GET route.
+
+    The ETag is derived from the request and the change versions of `tables`, which
+    the insert, update and delete builders bump on every committed write. When the
+    client's tag still matches, a `304 Not Modified` is raised before the route body
+    runs. Declare the dependency before the connection dependency so that a 304 does
+    not even check out a database connection.
+
+    With `frozen`, a scope (register or RMP) already known to be frozen gets a fixed
+    ETag that does not depend on the table versions, so writes elsewhere never
+    invalidate its snapshots, and it is marked immutable.
+
+    If Redis is unavailable no ETag is produced and the route runs normally.
+
+    Args:
+        *tables (str | Enum): Every table the response is derived from.
+        frozen (Optional[tuple[FrozenScope, str]]): The scope kind and the path
+                                                   parameter holding its id.
+
+    Returns:
+        Callable: A dependency returning the ETag, or None when versions are unavailable.
+
+    Example:
+        @router.get("/{risk_id}")
+        async def fetch_risk_kri(
+                risk_id: str,
+                etag: Optional[str] = Depends(conditional_get(Tables.RISK_KRI)),
+                connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        ):
+            ...
+    """
+    async def dependency(request: Request, response: Response) -> Optional[str]:
+        if frozen is not None and await is_known_frozen(frozen[0], request.path_params[frozen[1]]):
+            etag = make_etag(request, [FROZEN_VERSION])
+            headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept"}
+        else:
+            versions = await get_versions(*tables)
+            if versions is None:
+                return None
+            etag = make_etag(request, versions)
+            headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+        return etag
+
+    return dependency
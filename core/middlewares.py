@@ -1,14 +1,252 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request, HTTPException
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from fastapi import HTTPException
+from core.responses import parse_accept_encoding
+from services.security.ip_filter import IPFilter, ip_filter
 
-BLOCKED_IPS = {"192.168.1.10", "203.0.113.42"}
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-class BlockIPMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
-        if client_ip in BLOCKED_IPS:
-            raise HTTPException(status_code=403, detail="Forbidden: Your IP is blocked.")
+class BlockIPMiddleware:
+    """
+    Pure ASGI middleware rejecting requests from blocked client IPs with a 403.
 
-        response = await call_next(request)
-        return response
\ No newline at end of file
+    Addresses are checked against the allow and deny ranges of an `IPFilter`, which
+    can be reloaded at runtime (see `services.security.ip_filter`).
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        ip_filter (IPFilter): The filter to consult, the process-wide one by default.
+    """
+
+    def __init__(self, app: ASGIApp, ip_filter: IPFilter = ip_filter):
+        self.app = app
+        self.ip_filter = ip_filter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        if not self.ip_filter.is_allowed(client[0] if client else None):
+            response = JSONResponse(status_code=403, content={"detail": "Forbidden: Your IP is blocked."})
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+
+class CatchExceptionsMiddleware:
+    """
+    Pure ASGI middleware to globally catch and handle exceptions during HTTP request processing.
+
+    Any unhandled exception is caught and returned as a 500 Internal Server Error with
+    a JSON response containing the exception message. `HTTPException` propagates
+    normally so that FastAPI's built-in or custom exception handlers can process it.
+
+    Unlike a `BaseHTTPMiddleware`, requests are not moved onto a separate task and
+    response bodies are passed straight through, so streaming responses keep streaming.
+    If the response has already started when the exception is raised, a JSON error
+    can no longer be sent and the exception is re-raised.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_tracking(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking)
+
+        except HTTPException:
+            raise
+
+        except Exception as e:
+            print(e)
+            if response_started:
+                raise
+            response = JSONResponse(status_code=500, content={"detail": str(e)})
+            await response(scope, receive, send)
+
+
+# Responses of these types are worth compressing.
+COMPRESSIBLE_TYPES = ("application/json", "application/vnd.erisk.", "text/", "application/xml")
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses with the best coding the client accepts.
+
+    Supported codings, in order of server preference: zstd and br (when the optional
+    `zstandard` and `brotli` packages are installed) and gzip. The client's
+    `Accept-Encoding` quality values decide first; the server preference breaks ties.
+
+    Responses are left untouched when they:
+    - already carry a `Content-Encoding` (e.g. precompressed cache payloads),
+    - are smaller than `minimum_size` bytes and complete in a single body message,
+    - have a content type that does not benefit from compression.
+
+    Streaming responses are compressed chunk by chunk.
+
+    Levels and the threshold default to the environment variables
+    COMPRESSION_MINIMUM_SIZE, GZIP_LEVEL, BROTLI_LEVEL and ZSTD_LEVEL.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        minimum_size (int): Smallest body, in bytes, that is compressed.
+        gzip_level (int): gzip level, 1-9.
+        brotli_level (int): Brotli quality, 0-11.
+        zstd_level (int): Zstandard level, 1-22.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024)),
+            gzip_level: int = int(os.getenv("GZIP_LEVEL", 6)),
+            brotli_level: int = int(os.getenv("BROTLI_LEVEL", 4)),
+            zstd_level: int = int(os.getenv("ZSTD_LEVEL", 3)),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressors = {}
+        if zstandard is not None:
+            self.compressors["zstd"] = lambda: _ZstdCompressor(zstd_level)
+        if brotli is not None:
+            self.compressors["br"] = lambda: _BrotliCompressor(brotli_level)
+        self.compressors["gzip"] = lambda: _GzipCompressor(gzip_level)
+
+    def select_coding(self, accept_encoding: str):
+        codings = parse_accept_encoding(accept_encoding)
+        best, best_quality = None, 0.0
+        for coding in self.compressors:
+            quality = codings.get(coding, codings.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = self.select_coding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message = {}
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = self.compressors[coding]()
+                headers["Content-Encoding"] = coding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+
+                if not more_body:
+                    data = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(data))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+
+                await send(start_message)
+
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.flush()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,42 @@
+from fastapi import Depends, HTTPException, Request
+from __schemas__ import CurrentUser
+from services.databases.postgres.connections import AsyncDBPoolSingleton
+from services.security.authorization import authorization_cache
+from services.security.security import get_current_user
+
+
+def module_access(*roles: str):
+    """
+    Dependency factory requiring the current user to belong to the route's module.
+
+    The module is read from the `module_id` path parameter. With `roles`, the user's
+    role in the module must be one of them. After the first request the check is a
+    dictionary lookup.
+
+    Args:
+        *roles (str): Roles allowed to use the route; any member when empty.
+
+    Returns:
+        Callable: A dependency returning the `CurrentUser`, or raising a 403.
+
+    Example:
+        @router.get("/{module_id}")
+        async def fetch_risks(
+                module_id: str,
+                user: CurrentUser = Depends(module_access()),
+                connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        ):
+            ...
+    """
+    async def dependency(
+            request: Request,
+            user: CurrentUser = Depends(get_current_user),
+            connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+    ) -> CurrentUser:
+        module_id = request.path_params.get("module_id")
+        permissions = await authorization_cache.get_permissions(connection, user.user_id)
+        if not permissions.allows(module_id, roles or None):
+            raise HTTPException(status_code=403, detail="Not allowed to access this module")
+        return user
+
+    return dependency
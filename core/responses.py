@@ -0,0 +1,231 @@
+import zlib
+from typing import Any, Optional
+import pydantic_core
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from core.encoders import encode_json, decode, payload_body, AUTO_WBITS
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.erisk.columnar+json"
+
+# A string column is dictionary encoded when it has at most this many distinct values
+# and they make up no more than half of its rows.
+DICTIONARY_MAX_VALUES = 1024
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with `core.encoders.encode_json`.
+
+    Pydantic models are dumped to bytes directly by pydantic-core and plain data by
+    orjson, instead of going through `json.dumps`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+def carry_headers(response: Optional[Response], vary: Optional[str] = None) -> dict:
+    """
+    Collect headers set on a route's injected `Response` for a response built by hand.
+
+    Args:
+        response (Optional[Response]): The injected response, if any.
+        vary (Optional[str]): Request headers to add to `Vary`, e.g. "Accept".
+
+    Returns:
+        dict: Lower-cased header names mapped to their values.
+    """
+    headers = {}
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    if vary:
+        values = [v.strip() for v in headers.get("vary", "").split(",") if v.strip()]
+        values += [v.strip() for v in vary.split(",") if v.strip() not in values]
+        headers["vary"] = ", ".join(values)
+    return headers
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    Return trusted route data as a `FastJSONResponse`, bypassing `jsonable_encoder`.
+
+    FastAPI walks every object returned from a route through `jsonable_encoder` unless
+    the route returns a `Response` itself. Data produced by our own models is already
+    valid, so list routes return it through this helper to serialize it in one pass.
+
+    Args:
+        content (Any): Pydantic models, lists of models or JSON-compatible data.
+        response (Optional[Response]): The route's injected `Response`; headers set on it
+                                       by dependencies (e.g. ETags) are carried over.
+        status_code (int): The HTTP status code.
+
+    Returns:
+        FastJSONResponse: The rendered response.
+    """
+    return FastJSONResponse(content=content, status_code=status_code, headers=carry_headers(response))
+
+
+def to_columnar(rows: list) -> dict:
+    """
+    Convert a list of models or dictionaries into the compact columnar layout.
+
+    Field names are sent once in `columns` and each entry of `data` holds one column's
+    values in row order. Low-cardinality string columns (department, category, status
+    and the like) are dictionary encoded: their entry in `data` holds integer codes
+    and `dictionaries` maps the column name to the list of distinct values.
+
+    Example:
+        {
+            "columns": ["risk_id", "department"],
+            "rows": 3,
+            "data": [["a1", "b2", "c3"], [0, 1, 0]],
+            "dictionaries": {"department": ["Finance", "Operations"]}
+        }
+
+    Args:
+        rows (list): Pydantic models or dictionaries sharing the same fields.
+
+    Returns:
+        dict: The columnar document.
+    """
+    records = pydantic_core.to_jsonable_python(rows)
+    columns = list(records[0].keys()) if records else []
+    data = []
+    dictionaries = {}
+
+    for column in columns:
+        values = [record.get(column) for record in records]
+        distinct = {}
+        for value in values:
+            if value is not None and not isinstance(value, str):
+                distinct = None
+                break
+            distinct.setdefault(value, len(distinct))
+            if len(distinct) > DICTIONARY_MAX_VALUES:
+                distinct = None
+                break
+
+        if distinct and list(distinct) != [None] and len(distinct) * 2 <= len(values):
+            dictionaries[column] = list(distinct)
+            values = [distinct[value] for value in values]
+        data.append(values)
+
+    return {"columns": columns, "rows": len(records), "data": data, "dictionaries": dictionaries}
+
+
+class ColumnarResponse(FastJSONResponse):
+    """
+    Response rendering a list in the columnar layout produced by `to_columnar()`.
+    """
+    media_type = COLUMNAR_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(to_columnar(content))
+
+
+def accepts_columnar(request: Request) -> bool:
+    """
+    Whether the client listed the columnar media type in `Accept` with a non-zero quality.
+    """
+    for media_range in request.headers.get("accept", "").split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != COLUMNAR_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def list_response(content: list, request: Request, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Return a list route's data in the format negotiated through the `Accept` header.
+
+    Clients sending `Accept: application/vnd.erisk.columnar+json` get the compact
+    columnar layout; everyone else gets a regular JSON array. Either way the data is
+    serialized in one pass as with `json_response()`.
+
+    Args:
+        content (list): The models or rows to return.
+        request (Request): The incoming request, used for content negotiation.
+        response (Optional[Response]): The route's injected `Response` whose headers
+                                       should be carried over.
+
+    Returns:
+        FastJSONResponse: A `ColumnarResponse` or a plain `FastJSONResponse`.
+    """
+    headers = carry_headers(response, vary="Accept")
+    response_class = ColumnarResponse if accepts_columnar(request) else FastJSONResponse
+    return response_class(content=content, headers=headers)
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """
+    Parse an `Accept-Encoding` header into a mapping of coding to quality value.
+
+    Example:
+        parse_accept_encoding("gzip, br;q=0.8, *;q=0")  ➜ {"gzip": 1.0, "br": 0.8, "*": 0.0}
+    """
+    codings = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding.lower()] = quality
+    return codings
+
+
+def accepts_encoding(request: Request, coding: str) -> bool:
+    """
+    Whether the client accepts the given content coding.
+    """
+    codings = parse_accept_encoding(request.headers.get("accept-encoding", ""))
+    return codings.get(coding, codings.get("*", 0.0)) > 0
+
+
+def payload_response(payload: bytes, request: Request, response: Optional[Response] = None) -> Response:
+    """
+    Send a payload read from the cache (see `redis_cache(...).payload`) without
+    re-serializing it.
+
+    Compressed payloads are stored as gzip streams and are sent untouched with
+    `Content-Encoding: gzip` to clients that accept it, so hot responses are never
+    compressed twice. Clients asking for the columnar format get list payloads decoded
+    and re-rendered instead; single objects have no columnar form and are sent as JSON.
+
+    Args:
+        payload (bytes): A payload produced by `core.encoders.encode()`.
+        request (Request): The incoming request, used for content negotiation.
+        response (Optional[Response]): The route's injected `Response` whose headers
+                                       should be carried over.
+
+    Returns:
+        Response: The response carrying the payload.
+    """
+    if accepts_columnar(request):
+        content = decode(payload)
+        if isinstance(content, list):
+            return list_response(content, request, response)
+
+    headers = carry_headers(response, vary="Accept, Accept-Encoding")
+
+    coding, body = payload_body(payload)
+    if coding is not None:
+        if accepts_encoding(request, coding):
+            headers["content-encoding"] = coding
+        else:
+            body = zlib.decompress(body, AUTO_WBITS)
+    return Response(content=body, media_type="application/json", headers=headers)
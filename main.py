@@ -1,14 +1,22 @@
-from fastapi import FastAPI, Request, HTTPException
-from starlette.responses import JSONResponse
+from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import sys
 import asyncio
 from starlette.middleware.cors import CORSMiddleware
+from core.middlewares import CompressionMiddleware, CatchExceptionsMiddleware, BlockIPMiddleware
+from services.security.ip_filter import ip_filter
+from services.security.hashing import hashing_service, HASH_TARGET_MS
+from services.security.tokens import load_signing_keys
+from services.security.rate_limiter import rate_limiter
+from services.security.authorization import authorization_cache
+from services.scheduling.scheduler import scheduler, SCHEDULER_ENABLED
+from core.responses import FastJSONResponse
 from services.databases.postgres.connections import AsyncDBPoolSingleton
 from routes.risk_routes import router as risks
 from routes.risk_responses_routes import router as risk_responses
 from routes.risk_ratings_routes import router as risk_ratings
+from routes.risk_scoring_routes import router as risk_scoring
 from routes.risk_kri_routes import router as risk_kri
 from routes.activity_routes import router as activities
 from routes.rmp_routes import router as rmp
@@ -31,8 +39,27 @@ async def lifespan(_api: FastAPI):
     except Exception as e:
         print(e)
 
+    load_signing_keys()
+
+    if HASH_TARGET_MS:
+        parameters = await hashing_service.calibrate(int(HASH_TARGET_MS) / 1000)
+        print(f"password hashing calibrated: {parameters}")
+
+    await ip_filter.reload()
+    ip_filter_watcher = asyncio.create_task(ip_filter.watch())
+    rate_limit_sync = asyncio.create_task(rate_limiter.sync_forever())
+    authorization_listener = asyncio.create_task(authorization_cache.listen())
+    due_item_scheduler = asyncio.create_task(scheduler.run_forever()) if SCHEDULER_ENABLED else None
+
     yield
 
+    ip_filter_watcher.cancel()
+    rate_limit_sync.cancel()
+    authorization_listener.cancel()
+    if due_item_scheduler:
+        due_item_scheduler.cancel()
+    hashing_service.shutdown()
+
     try:
         pool_instance = AsyncDBPoolSingleton.get_instance()
         if pool_instance:
@@ -41,7 +68,7 @@ async def lifespan(_api: FastAPI):
     except Exception as e:
         print(e)
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # noinspection PyTypeChecker
 app.add_middleware(
@@ -50,51 +77,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link"],
 )
 
-@app.middleware("http")
-async def catch_exceptions_middleware(request: Request, call_next):
-    """
-    Middleware to globally catch and handle exceptions during HTTP request processing.
-
-    This middleware intercepts all HTTP requests and ensures that any unhandled
-    exceptions are caught and returned as standardized JSON responses. It allows
-    `HTTPException` to propagate normally so that FastAPI's built-in or custom
-    exception handlers can process them. Any other unhandled exceptions are caught
-    and returned as a 500 Internal Server Error with a JSON response containing
-    the exception message.
-
-    Args:
-        request (Request): The incoming HTTP request.
-        call_next (Callable): A function that forwards the request to the next middleware
-                              or endpoint handler.
-
-    Returns:
-        Response: The HTTP response returned by the next middleware/handler or a JSON
-                  response in case of unhandled exceptions.
-    """
-    try:
-        response = await call_next(request)
-        return response
+# noinspection PyTypeChecker
+app.add_middleware(CompressionMiddleware)
 
-    except HTTPException as h:
-        raise h
+# noinspection PyTypeChecker
+app.add_middleware(CatchExceptionsMiddleware)
 
-    except Exception as e:
-        print(e)
-        return JSONResponse(
-            status_code=500,
-            content={"detail": str(e)}
-        )
+# noinspection PyTypeChecker
+app.add_middleware(BlockIPMiddleware)
 
 
 @app.get("/")
 async def home():
     return "Hello world"
 
+@app.get("/metrics/hashing")
+async def hashing_metrics():
+    return hashing_service.metrics.snapshot()
+
 app.include_router(risks, tags=["Risks Router"])
 app.include_router(risk_responses, tags=["Risks Responses Router"])
 app.include_router(risk_ratings, tags=["Risks Ratings Router"])
+app.include_router(risk_scoring, tags=["Risks Scoring Router"])
 app.include_router(risk_kri, tags=["Risks KRI Router"])
 app.include_router(activities, tags=["Activities Router"])
 app.include_router(rmp, tags=["Risk Management Plan Router"])
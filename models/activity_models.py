@@ -1,17 +1,44 @@
+from typing import Optional
+from fastapi import HTTPException
 from psycopg import AsyncConnection
 from __schemas__ import BaseUser, Creator
-from core.constants import Tables, ActivitiesColumns, ActivityOwnerColumns
+from core.constants import Tables, ActivitiesColumns, ActivityOwnerColumns, RMPActivityCountersColumns
 from core.utils import exception_response, get_unique_key, from_enum
 from schemas.activity_schemas import NewActivity, CreateActivity, ReadActivity, JoinReadActivity, NewActivityOwner, \
-    CreateActivityOwner
+    CreateActivityOwner, ActivityOccurrence, ActivityStatus, UpdateActivityStatus, RMPActivityProgress
+from services.databases.postgres.connections import LazyConnection
 from services.databases.postgres.insert import InsertQueryBuilder
 from services.databases.postgres.read import ReadBuilder
+from services.databases.postgres.update import UpdateQueryBuilder
+from services.databases.redis.connections import redis_cache, SNAPSHOT_EXPIRE
+from services.scheduling.recurrence import expand_occurrences, parse_frequency, align_to
 from datetime import datetime
+import heapq
+from operator import itemgetter
+
+# Column of rmp_activity_counters counting the activities in each status.
+STATUS_COUNTERS = {
+    ActivityStatus.NOT_STARTED: RMPActivityCountersColumns.NOT_STARTED,
+    ActivityStatus.IN_PROGRESS: RMPActivityCountersColumns.IN_PROGRESS,
+    ActivityStatus.COMPLETED: RMPActivityCountersColumns.COMPLETED,
+}
+
+# Most activities returned by the overdue and upcoming queries.
+MAX_DUE_ACTIVITIES = 500
+
+# Open activities of an RMP with an outstanding occurrence; a scan of the partial
+# (rmp_id, due_since) index.
+OVERDUE_COUNT_QUERY = """
+    SELECT COUNT(*) FROM activities
+    WHERE rmp_id = %(rmp_id)s AND due_since IS NOT NULL AND status <> %(completed)s
+"""
+
+CLEAR_DUE_QUERY = "UPDATE activities SET due_since = NULL WHERE activity_id = %(activity_id)s AND due_since IS NOT NULL"
 
 
 async def add_new_activity(connection: AsyncConnection, activity: NewActivity, rmp_id: str, user_id: str):
     with exception_response():
-
+        scheduled_at = datetime.now()
         __activity__ = CreateActivity(
             activity_id=get_unique_key(),
             rmp_id=rmp_id,
@@ -20,7 +47,10 @@ async def add_new_activity(connection: AsyncConnection, activity: NewActivity, r
             frequency=activity.frequency,
             category=activity.category,
             leads="",
-            creator=user_id
+            creator=user_id,
+            next_at=scheduled_at,
+            anchor_at=scheduled_at,
+            created_at=scheduled_at
         )
 
         builder = (
@@ -31,7 +61,178 @@ async def add_new_activity(connection: AsyncConnection, activity: NewActivity, r
             .returning(ActivitiesColumns.ACTIVITY_ID.value, ActivitiesColumns.TITLE.value)
         )
 
-        return await builder.execute()
+        result = await builder.execute()
+
+        await shift_activity_counters(
+            connection=connection,
+            rmp_id=rmp_id,
+            changes={STATUS_COUNTERS[__activity__.status]: 1}
+        )
+        return result
+
+
+async def shift_activity_counters(
+        connection: AsyncConnection,
+        rmp_id: str,
+        changes: dict[RMPActivityCountersColumns, int]
+):
+    query = """
+        INSERT INTO rmp_activity_counters (rmp_id, not_started, in_progress, completed, reports)
+        VALUES (%(rmp_id)s, %(not_started)s, %(in_progress)s, %(completed)s, %(reports)s)
+        ON CONFLICT (rmp_id) DO UPDATE SET
+            not_started = rmp_activity_counters.not_started + EXCLUDED.not_started,
+            in_progress = rmp_activity_counters.in_progress + EXCLUDED.in_progress,
+            completed = rmp_activity_counters.completed + EXCLUDED.completed,
+            reports = rmp_activity_counters.reports + EXCLUDED.reports
+    """
+    deltas = {
+        from_enum(column): changes.get(column, 0)
+        for column in RMPActivityCountersColumns
+        if column != RMPActivityCountersColumns.RMP_ID
+    }
+    builder = (
+        InsertQueryBuilder(connection=connection)
+        .into_table(Tables.RMP_ACTIVITY_COUNTERS.value)
+        .raw(query, {"rmp_id": rmp_id, **deltas})
+    )
+    return await builder.execute()
+
+
+async def lock_activity(connection: AsyncConnection, activity_id: str) -> Optional[dict]:
+    # Concurrent status changes of the same activity apply their counter moves one at a time.
+    return await (
+        ReadBuilder(connection=connection)
+        .from_table(from_enum(Tables.ACTIVITIES))
+        .select_fields(from_enum(ActivitiesColumns.RMP_ID), from_enum(ActivitiesColumns.STATUS))
+        .where(from_enum(ActivitiesColumns.ACTIVITY_ID), activity_id)
+        .for_update()
+        .fetch_one()
+    )
+
+
+async def clear_activity_due(connection: AsyncConnection, activity_id: str):
+    """
+    Mark an activity's outstanding occurrence as done; it is no longer overdue.
+    """
+    await (
+        UpdateQueryBuilder(connection=connection)
+        .into_table(Tables.ACTIVITIES.value)
+        .raw(CLEAR_DUE_QUERY, {"activity_id": activity_id})
+        .execute()
+    )
+
+
+async def move_activity_status(
+        connection: AsyncConnection,
+        activity_id: str,
+        current: dict,
+        status: ActivityStatus
+):
+    """
+    Write an activity's status and move it between the RMP's status counters.
+
+    Args:
+        connection (AsyncConnection): The connection holding the lock from `lock_activity()`.
+        activity_id (str): The activity.
+        current (dict): The locked row, with its `rmp_id` and current `status`.
+        status (ActivityStatus): The new status.
+    """
+    old_status = ActivityStatus(current.get(from_enum(ActivitiesColumns.STATUS)))
+    if status == ActivityStatus.COMPLETED:
+        await clear_activity_due(connection=connection, activity_id=activity_id)
+    if old_status == status:
+        return
+    await (
+        UpdateQueryBuilder(connection=connection)
+        .into_table(Tables.ACTIVITIES.value)
+        .values(UpdateActivityStatus(status=status))
+        .where({ActivitiesColumns.ACTIVITY_ID.value: activity_id})
+        .check_exists({ActivitiesColumns.ACTIVITY_ID.value: activity_id})
+        .execute()
+    )
+    await shift_activity_counters(
+        connection=connection,
+        rmp_id=current.get(from_enum(ActivitiesColumns.RMP_ID)),
+        changes={STATUS_COUNTERS[old_status]: -1, STATUS_COUNTERS[status]: 1}
+    )
+
+
+async def update_activity_status(connection: AsyncConnection, activity_id: str, status: ActivityStatus):
+    with exception_response():
+        current = await lock_activity(connection=connection, activity_id=activity_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Activity Not Found")
+        await move_activity_status(connection=connection, activity_id=activity_id, current=current, status=status)
+
+
+async def get_overdue_activities(connection: AsyncConnection, rmp_id: str):
+    """
+    Open activities of an RMP with an outstanding occurrence, longest overdue first.
+
+    The scheduler advances `next_at` as soon as an occurrence passes, so overdue is
+    tracked by `due_since` instead, which holds the earliest occurrence not yet
+    reported on. Served by the partial (rmp_id, due_since) index.
+    """
+    with exception_response():
+        builder = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.ACTIVITIES))
+            .select(ReadActivity)
+            .where(from_enum(ActivitiesColumns.RMP_ID), rmp_id)
+            .where_not(from_enum(ActivitiesColumns.STATUS), from_enum(ActivityStatus.COMPLETED))
+            .where_not_null(from_enum(ActivitiesColumns.DUE_SINCE))
+            .order_by(from_enum(ActivitiesColumns.DUE_SINCE))
+            .limit(MAX_DUE_ACTIVITIES)
+            .fetch_all()
+        )
+        return [ReadActivity(**data) for data in builder]
+
+
+async def get_due_activities(
+        connection: AsyncConnection,
+        rmp_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+):
+    """
+    Open (not completed) activities of an RMP with `next_at` in `[start, end)`, earliest first.
+
+    Served by the (rmp_id, next_at) index, so only the activities in the range are read.
+    """
+    with exception_response():
+        builder = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.ACTIVITIES))
+            .select(ReadActivity)
+            .where(from_enum(ActivitiesColumns.RMP_ID), rmp_id)
+            .where_not(from_enum(ActivitiesColumns.STATUS), from_enum(ActivityStatus.COMPLETED))
+            .where_range(from_enum(ActivitiesColumns.NEXT_AT), start, end)
+            .order_by(from_enum(ActivitiesColumns.NEXT_AT))
+            .limit(MAX_DUE_ACTIVITIES)
+            .fetch_all()
+        )
+        return [ReadActivity(**data) for data in builder]
+
+
+async def get_rmp_activity_progress(connection: AsyncConnection, rmp_id: str):
+    """
+    Read an RMP's status and report counters, plus the number of overdue activities.
+    """
+    with exception_response():
+        counters = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.RMP_ACTIVITY_COUNTERS))
+            .where(from_enum(RMPActivityCountersColumns.RMP_ID), rmp_id)
+            .fetch_one()
+        )
+        async with connection.cursor() as cursor:
+            await cursor.execute(OVERDUE_COUNT_QUERY, {
+                "rmp_id": rmp_id,
+                "completed": from_enum(ActivityStatus.COMPLETED)
+            })
+            overdue = (await cursor.fetchone())[0]
+
+        return RMPActivityProgress(**(counters or {"rmp_id": rmp_id}), overdue=overdue)
 
 
 async def get_current_activities(connection: AsyncConnection, rmp_id: str):
@@ -70,6 +271,78 @@ async def get_current_activities(connection: AsyncConnection, rmp_id: str):
         return results
 
 
+@redis_cache(
+    key_builder=lambda connection, rmp_id, **_: f"snapshot:activities:{rmp_id}",
+    expire=SNAPSHOT_EXPIRE,
+    model=list[JoinReadActivity]
+)
+async def get_frozen_rmp_activities(connection: LazyConnection, rmp_id: str, redis=None):
+    return await get_current_activities(connection=await connection.get(), rmp_id=rmp_id)
+
+
+def _tagged(occurrences: tuple[datetime, ...], activity: dict):
+    for moment in occurrences:
+        yield moment, activity
+
+
+async def get_activity_calendar(connection: AsyncConnection, rmp_id: str, start: datetime, end: datetime):
+    """
+    Expand the activities of an RMP into their occurrences within `[start, end)`.
+
+    Each activity's schedule is anchored on its fixed `anchor_at`, the same anchor the
+    scheduler advances `next_at` from, and extends both ways, but never before the
+    activity was created. Expansions are memoized per schedule and calendar month by
+    `expand_occurrences()`, and the per-activity series, already sorted, are merged
+    lazily into one chronological list. All anchors come from one column, so they are
+    either all naive or all aware and compare directly.
+
+    Args:
+        connection (AsyncConnection): The connection to read on.
+        rmp_id (str): The RMP.
+        start (datetime): Start of the window, inclusive.
+        end (datetime): End of the window, exclusive.
+
+    Returns:
+        list[ActivityOccurrence]: The occurrences, earliest first.
+    """
+    with exception_response():
+        builder = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.ACTIVITIES))
+            .select_fields(
+                from_enum(ActivitiesColumns.ACTIVITY_ID),
+                from_enum(ActivitiesColumns.TITLE),
+                from_enum(ActivitiesColumns.TYPE),
+                from_enum(ActivitiesColumns.CATEGORY),
+                from_enum(ActivitiesColumns.STATUS),
+                from_enum(ActivitiesColumns.FREQUENCY),
+                from_enum(ActivitiesColumns.ANCHOR_AT),
+                from_enum(ActivitiesColumns.CREATED_AT)
+            )
+            .where(from_enum(ActivitiesColumns.RMP_ID), rmp_id)
+            .fetch_all()
+        )
+
+        series = []
+        for data in builder:
+            anchor = data.pop(from_enum(ActivitiesColumns.ANCHOR_AT))
+            created_at = data.pop(from_enum(ActivitiesColumns.CREATED_AT))
+            frequency = parse_frequency(data.get(from_enum(ActivitiesColumns.FREQUENCY)))
+            if anchor is None or frequency is None:
+                continue
+            window_start = align_to(start, anchor)
+            if created_at is not None:
+                window_start = max(window_start, align_to(created_at, anchor))
+            window_end = align_to(end, anchor)
+            if window_start < window_end:
+                series.append(_tagged(expand_occurrences(anchor, frequency, window_start, window_end), data))
+
+        return [
+            ActivityOccurrence(**activity, occurs_at=moment)
+            for moment, activity in heapq.merge(*series, key=itemgetter(0))
+        ]
+
+
 async def get_single_activity(connection: AsyncConnection, activity_id: str):
     with exception_response():
         builder = await (
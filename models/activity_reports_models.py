@@ -1,16 +1,22 @@
+from fastapi import HTTPException
 from psycopg import AsyncConnection
 from __schemas__ import BaseUser, Creator
-from core.constants import Tables, ActivityReportsColumns
+from core.constants import Tables, ActivityReportsColumns, RMPActivityCountersColumns, ActivitiesColumns
 from core.utils import exception_response, get_unique_key
 from schemas.activity_reports_schemas import NewActivityReport, CreateActivityReport, ReadActivityReport, \
     JoinReadActivityReport
 from services.databases.postgres.insert import InsertQueryBuilder
 from datetime import datetime
 from services.databases.postgres.read import ReadBuilder
+from models.activity_models import lock_activity, shift_activity_counters, clear_activity_due
 
 
 async def add_new_activity_report(connection: AsyncConnection, report: NewActivityReport, activity_id: str, user_id: str):
     with exception_response():
+        activity = await lock_activity(connection=connection, activity_id=activity_id)
+        if activity is None:
+            raise HTTPException(status_code=404, detail="Activity Not Found")
+
         __activity_report_ = CreateActivityReport(
             activity_report_id=get_unique_key(),
             activity_id=activity_id,
@@ -28,7 +34,16 @@ async def add_new_activity_report(connection: AsyncConnection, report: NewActivi
             ActivityReportsColumns.ACTIVITY_ID.value, ActivityReportsColumns.ACTIVITY_REPORT_ID.value
             )
         )
-        return await builder.execute()
+        result = await builder.execute()
+
+        await shift_activity_counters(
+            connection=connection,
+            rmp_id=activity.get(ActivitiesColumns.RMP_ID.value),
+            changes={RMPActivityCountersColumns.REPORTS: 1}
+        )
+        # A report fulfils the outstanding occurrence, if any.
+        await clear_activity_due(connection=connection, activity_id=activity_id)
+        return result
 
 async def get_activity_reports(connection: AsyncConnection, activity_id: str):
     with exception_response():
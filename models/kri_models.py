@@ -1,15 +1,24 @@
+from fastapi import HTTPException
 from psycopg import AsyncConnection
 from core.constants import Tables, RiskKRIColumns
 from core.utils import get_unique_key, exception_response, from_enum
-from schemas.risk_kri_schemas import NewRiskKRI, CreateRiskKRI, ReadRiskKRI
+from schemas.risk_kri_schemas import NewRiskKRI, CreateRiskKRI, ReadRiskKRI, KRIBandReport
 from services.databases.postgres.insert import InsertQueryBuilder
 from datetime import datetime
 
 from services.databases.postgres.read import ReadBuilder
+from services.kri.classification import analyze_bands
+from services.kri.expressions import validate_thresholds, kri_thresholds, KRIExpressionError
 
 
 async def add_new_risk_kri(connection: AsyncConnection, kri: NewRiskKRI, risk_id: str):
     with exception_response():
+        try:
+            validate_thresholds(kri_thresholds(kri))
+        except KRIExpressionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        scheduled_at = datetime.now()
         __kri__ = CreateRiskKRI(
             risk_kri_id=get_unique_key(),
             risk_id=risk_id,
@@ -21,8 +30,9 @@ async def add_new_risk_kri(connection: AsyncConnection, kri: NewRiskKRI, risk_id
             medium=kri.medium,
             low=kri.low,
             description=kri.description,
-            next_at=datetime.now(),
-            created_at=datetime.now()
+            next_at=scheduled_at,
+            anchor_at=scheduled_at,
+            created_at=scheduled_at
         )
 
         builder = (
@@ -44,4 +54,15 @@ async def get_risk_kri(connection: AsyncConnection, risk_id: str):
         )
         return [ReadRiskKRI(**data) for data in builder]
 
-
+async def get_risk_kri_band_reports(connection: AsyncConnection, risk_id: str):
+    with exception_response():
+        reports = []
+        for kri in await get_risk_kri(connection=connection, risk_id=risk_id):
+            try:
+                report = analyze_bands(kri_thresholds(kri))
+            except KRIExpressionError as e:
+                report = KRIBandReport(overlaps=[], gaps=[], error=str(e))
+            report.risk_kri_id = kri.risk_kri_id
+            report.name = kri.name
+            reports.append(report)
+        return reports
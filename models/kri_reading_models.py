@@ -0,0 +1,258 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+from fastapi import HTTPException
+from psycopg import AsyncConnection, sql
+
+from core.constants import Tables, RiskKRIColumns, KRIReadingsColumns, KRIReadingRollupsColumns, RollupGranularity
+from core.utils import exception_response, from_enum
+from schemas.risk_kri_schemas import NewKRIReading, ReadKRIReading, KRIReadingRollup, ReadRiskKRI
+from services.databases.postgres.read import ReadBuilder
+from services.databases.redis.versions import track_change
+from services.kri.classification import classify_array, band_codes_to_names, UNCLASSIFIED
+from services.kri.expressions import kri_thresholds, KRIExpressionError
+
+# Largest batch accepted by one ingestion request.
+MAX_READINGS_PER_BATCH = 100_000
+
+# Raw readings returned by one page; later pages are fetched with the `after` cursor.
+MAX_RAW_READINGS = 10_000
+
+STAGING_TABLE = "kri_readings_staging"
+
+# Moves the staged batch into kri_readings and folds the rows that were actually
+# inserted (duplicates of an existing (risk_kri_id, measured_at) are skipped) into the
+# daily and monthly rollups, all in one statement.
+INGEST_QUERY = """
+    WITH inserted AS (
+        INSERT INTO kri_readings (risk_kri_id, measured_at, value, band)
+        SELECT risk_kri_id, measured_at, value, band FROM kri_readings_staging
+        ON CONFLICT (risk_kri_id, measured_at) DO NOTHING
+        RETURNING risk_kri_id, measured_at, value, band
+    ),
+    buckets AS (
+        SELECT 'day' AS granularity, date_trunc('day', measured_at, 'UTC') AS bucket, * FROM inserted
+        UNION ALL
+        SELECT 'month' AS granularity, date_trunc('month', measured_at, 'UTC') AS bucket, * FROM inserted
+    ),
+    rollups AS (
+        INSERT INTO kri_reading_rollups AS existing (
+            risk_kri_id, granularity, bucket, readings, total, minimum, maximum, last_value, last_at,
+            very_high, high, medium, low, unclassified
+        )
+        SELECT
+            risk_kri_id, granularity, bucket, count(*), sum(value), min(value), max(value),
+            (array_agg(value ORDER BY measured_at DESC))[1], max(measured_at),
+            count(*) FILTER (WHERE band = 0), count(*) FILTER (WHERE band = 1),
+            count(*) FILTER (WHERE band = 2), count(*) FILTER (WHERE band = 3),
+            count(*) FILTER (WHERE band IS NULL)
+        FROM buckets
+        GROUP BY risk_kri_id, granularity, bucket
+        ON CONFLICT (risk_kri_id, granularity, bucket) DO UPDATE SET
+            readings = existing.readings + EXCLUDED.readings,
+            total = existing.total + EXCLUDED.total,
+            minimum = LEAST(existing.minimum, EXCLUDED.minimum),
+            maximum = GREATEST(existing.maximum, EXCLUDED.maximum),
+            last_value = CASE WHEN EXCLUDED.last_at >= existing.last_at
+                THEN EXCLUDED.last_value ELSE existing.last_value END,
+            last_at = GREATEST(existing.last_at, EXCLUDED.last_at),
+            very_high = existing.very_high + EXCLUDED.very_high,
+            high = existing.high + EXCLUDED.high,
+            medium = existing.medium + EXCLUDED.medium,
+            low = existing.low + EXCLUDED.low,
+            unclassified = existing.unclassified + EXCLUDED.unclassified
+    )
+    SELECT count(*) FROM inserted
+"""
+
+
+def _month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+async def ensure_reading_partitions(connection: AsyncConnection, months: set[datetime]):
+    """
+    Create the monthly `kri_readings` partitions covering `months` if they are missing.
+
+    Existing partitions are only looked up. Creating a missing one takes a
+    transaction-scoped advisory lock, so concurrent ingestions of the same new month
+    do not race, while batches for existing months never wait on each other.
+    """
+    table = from_enum(Tables.KRI_READINGS)
+    async with connection.cursor() as cursor:
+        missing = []
+        for month in sorted(months):
+            partition = f"{table}_{month:%Y_%m}"
+            await cursor.execute("SELECT to_regclass(%s)", (partition,))
+            if (await cursor.fetchone())[0] is None:
+                missing.append((partition, month))
+        if not missing:
+            return
+
+        await cursor.execute("SELECT pg_advisory_xact_lock(hashtext('kri_readings_partitions'))")
+        for partition, month in missing:
+            await cursor.execute(
+                sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                    sql.Identifier(partition),
+                    sql.Identifier(table)
+                ),
+                (month, _next_month(month))
+            )
+
+
+async def ingest_kri_readings(connection: AsyncConnection, kri: ReadRiskKRI, readings: list[NewKRIReading]):
+    """
+    Classify and store a batch of readings for one KRI.
+
+    The whole batch is classified against the KRI's thresholds in one vectorized pass,
+    streamed into a temporary staging table with COPY, and then inserted and rolled
+    up by a single statement. Readings for a timestamp that is already stored are
+    skipped, so a batch can safely be retried.
+
+    Args:
+        connection (AsyncConnection): The connection to write on.
+        kri (ReadRiskKRI): The KRI the readings belong to.
+        readings (list[NewKRIReading]): The readings.
+
+    Returns:
+        int: The number of readings inserted.
+    """
+    with exception_response():
+        if len(readings) > MAX_READINGS_PER_BATCH:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_READINGS_PER_BATCH} readings per batch")
+        if not readings:
+            return 0
+
+        measured_at = [
+            reading.measured_at if reading.measured_at.tzinfo else reading.measured_at.replace(tzinfo=timezone.utc)
+            for reading in readings
+        ]
+        values = np.fromiter((reading.value for reading in readings), dtype=np.float64, count=len(readings))
+        if not np.isfinite(values).all():
+            raise HTTPException(status_code=400, detail="Readings must be finite numbers")
+
+        try:
+            codes = classify_array(kri_thresholds(kri), values)
+        except KRIExpressionError:
+            codes = np.full(len(readings), UNCLASSIFIED, dtype=np.int8)
+
+        await ensure_reading_partitions(
+            connection,
+            {_month_start(moment.astimezone(timezone.utc)) for moment in measured_at}
+        )
+
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                    sql.Identifier(STAGING_TABLE),
+                    sql.Identifier(from_enum(Tables.KRI_READINGS))
+                )
+            )
+            async with cursor.copy(
+                sql.SQL("COPY {} (risk_kri_id, measured_at, value, band) FROM STDIN").format(
+                    sql.Identifier(STAGING_TABLE)
+                )
+            ) as copy:
+                for moment, value, code in zip(measured_at, values.tolist(), codes.tolist()):
+                    await copy.write_row((kri.risk_kri_id, moment, value, None if code == UNCLASSIFIED else code))
+
+            await cursor.execute(INGEST_QUERY)
+            inserted = (await cursor.fetchone())[0]
+            await cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(STAGING_TABLE)))
+
+        track_change(connection, Tables.KRI_READINGS)
+        track_change(connection, Tables.KRI_READING_ROLLUPS)
+        return inserted
+
+
+async def get_kri(connection: AsyncConnection, risk_kri_id: str) -> Optional[ReadRiskKRI]:
+    with exception_response():
+        builder = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.RISK_KRI))
+            .where(from_enum(RiskKRIColumns.RISK_KRI_ID), risk_kri_id)
+            .fetch_one()
+        )
+        if builder is None:
+            return None
+        return ReadRiskKRI(**builder)
+
+
+async def get_kri_readings(
+        connection: AsyncConnection,
+        risk_kri_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[datetime] = None
+) -> tuple[list[ReadKRIReading], Optional[datetime]]:
+    """
+    Fetch one page of raw readings for a KRI, oldest first.
+
+    Pages hold at most `MAX_RAW_READINGS` readings and are paginated by keyset on
+    `measured_at`, which is unique per KRI: pass the returned cursor as `after` to
+    fetch the next page.
+
+    Args:
+        connection (AsyncConnection): The connection to read on.
+        risk_kri_id (str): The KRI.
+        start (Optional[datetime]): Inclusive lower bound on `measured_at`.
+        end (Optional[datetime]): Exclusive upper bound on `measured_at`.
+        after (Optional[datetime]): Cursor from the previous page; only later readings are returned.
+
+    Returns:
+        tuple[list[ReadKRIReading], Optional[datetime]]: The readings and the cursor of
+        the next page, or None when this is the last page.
+    """
+    with exception_response():
+        builder = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.KRI_READINGS))
+            .select_fields(
+                from_enum(KRIReadingsColumns.RISK_KRI_ID),
+                from_enum(KRIReadingsColumns.MEASURED_AT),
+                from_enum(KRIReadingsColumns.VALUE),
+                from_enum(KRIReadingsColumns.BAND)
+            )
+            .where(from_enum(KRIReadingsColumns.RISK_KRI_ID), risk_kri_id)
+            .where_range(from_enum(KRIReadingsColumns.MEASURED_AT), start, end)
+            .where_after(from_enum(KRIReadingsColumns.MEASURED_AT), after)
+            .order_by(from_enum(KRIReadingsColumns.MEASURED_AT))
+            .limit(MAX_RAW_READINGS + 1)
+            .fetch_all()
+        )
+        if not builder:
+            return [], None
+        cursor = None
+        if len(builder) > MAX_RAW_READINGS:
+            builder = builder[:MAX_RAW_READINGS]
+            cursor = builder[-1].get("measured_at")
+        bands = band_codes_to_names(np.array(
+            [UNCLASSIFIED if data.get("band") is None else data.get("band") for data in builder],
+            dtype=np.int8
+        ))
+        return [ReadKRIReading(**{**data, "band": band}) for data, band in zip(builder, bands)], cursor
+
+
+async def get_kri_reading_rollups(
+        connection: AsyncConnection,
+        risk_kri_id: str,
+        granularity: RollupGranularity,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+):
+    with exception_response():
+        builder = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.KRI_READING_ROLLUPS))
+            .where(from_enum(KRIReadingRollupsColumns.RISK_KRI_ID), risk_kri_id)
+            .where(from_enum(KRIReadingRollupsColumns.GRANULARITY), from_enum(granularity))
+            .where_range(from_enum(KRIReadingRollupsColumns.BUCKET), start, end)
+            .order_by(from_enum(KRIReadingRollupsColumns.BUCKET))
+            .fetch_all()
+        )
+        return [KRIReadingRollup(**data) for data in builder]
@@ -1,14 +1,143 @@
+import os
 from datetime import datetime
-from typing import Optional
-from psycopg import AsyncConnection
+from typing import AsyncIterator, Optional
+from psycopg import AsyncConnection, sql
 from pydantic import BaseModel
 
 from __schemas__ import Creator, BaseUser
 from core.constants import Tables, RisksColumns, RiskOwnerColumns
 from core.utils import from_enum, exception_response, get_unique_key
-from schemas.risk_schemas import ReadRisk, CreateRisk, NewRisk, RiskRatingJoin, JoinRisk, NewRiskOwner, CreateRiskOwner
+from schemas.risk_ratings_schemas import RiskRatingTypes
+from schemas.risk_schemas import ReadRisk, CreateRisk, NewRisk, RiskRatingJoin, JoinRisk, NewRiskOwner, CreateRiskOwner, \
+    RiskDetail
+from services.databases.postgres.connections import LazyConnection
 from services.databases.postgres.insert import InsertQueryBuilder
 from services.databases.postgres.read import ReadBuilder
+from services.databases.redis.connections import redis_cache, SNAPSHOT_EXPIRE
+
+
+# The whole risk-detail document (the risk with its latest rating, ratings, responses,
+# KRIs and owners) assembled by Postgres in one statement: each child list is a
+# json aggregate over an index lookup on risk_id in its own lateral subquery.
+RISK_DETAIL_QUERY = """
+    SELECT to_jsonb(risk) || jsonb_build_object(
+        'inherent_impact', rating.inherent_impact,
+        'inherent_likelihood', rating.inherent_likelihood,
+        'residual_impact', rating.residual_impact,
+        'residual_likelihood', rating.residual_likelihood,
+        'inherent_score', score.inherent_score,
+        'inherent_band', score.inherent_band,
+        'residual_score', score.residual_score,
+        'residual_band', score.residual_band,
+        'process_name', process.name,
+        'ratings', COALESCE(ratings.items, '[]'::jsonb),
+        'responses', COALESCE(responses.items, '[]'::jsonb),
+        'kris', COALESCE(kris.items, '[]'::jsonb),
+        'owners', COALESCE(owners.items, '[]'::jsonb)
+    )
+    FROM risks AS risk
+    LEFT JOIN business_process AS process ON process.id = risk.process
+    LEFT JOIN LATERAL (
+        SELECT * FROM risk_ratings WHERE risk_id = risk.risk_id ORDER BY created_at DESC LIMIT 1
+    ) AS rating ON TRUE
+    LEFT JOIN risk_scores AS score ON score.risk_id = risk.risk_id
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(to_jsonb(item) ORDER BY item.created_at) AS items
+        FROM risk_ratings AS item WHERE item.risk_id = risk.risk_id
+    ) AS ratings ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(to_jsonb(item) ORDER BY item.created_at) AS items
+        FROM risk_responses AS item WHERE item.risk_id = risk.risk_id
+    ) AS responses ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(to_jsonb(item) ORDER BY item.created_at) AS items
+        FROM risk_kri AS item WHERE item.risk_id = risk.risk_id
+    ) AS kris ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(jsonb_build_object(
+            'usr_id', usr.id,
+            'usr_name', usr.name,
+            'usr_email', usr.email,
+            'usr_image', usr.image,
+            'usr_status', usr.status
+        ) ORDER BY owner.date_assigned) AS items
+        FROM risk_owners AS owner
+        JOIN users AS usr ON usr.id = owner.user_id
+        WHERE owner.risk_id = risk.risk_id
+    ) AS owners ON TRUE
+    WHERE risk.risk_id = %(risk_id)s
+"""
+
+
+# Risks fetched from the export cursor per round trip.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 500))
+
+# Every risk of a register as the same document as RISK_DETAIL_QUERY, rendered to JSON
+# text by Postgres. The children are aggregated set-based, one GROUP BY risk_id per
+# table over the register's risks, rather than one lookup per risk.
+REGISTER_EXPORT_QUERY = """
+    WITH register_risks AS (
+        SELECT risk_id FROM risks WHERE register_id = %(register_id)s
+    ),
+    latest_ratings AS (
+        SELECT DISTINCT ON (risk_id) * FROM risk_ratings
+        WHERE risk_id IN (SELECT risk_id FROM register_risks)
+        ORDER BY risk_id, created_at DESC
+    ),
+    ratings AS (
+        SELECT item.risk_id, jsonb_agg(to_jsonb(item) ORDER BY item.created_at) AS items
+        FROM risk_ratings AS item WHERE item.risk_id IN (SELECT risk_id FROM register_risks)
+        GROUP BY item.risk_id
+    ),
+    responses AS (
+        SELECT item.risk_id, jsonb_agg(to_jsonb(item) ORDER BY item.created_at) AS items
+        FROM risk_responses AS item WHERE item.risk_id IN (SELECT risk_id FROM register_risks)
+        GROUP BY item.risk_id
+    ),
+    kris AS (
+        SELECT item.risk_id, jsonb_agg(to_jsonb(item) ORDER BY item.created_at) AS items
+        FROM risk_kri AS item WHERE item.risk_id IN (SELECT risk_id FROM register_risks)
+        GROUP BY item.risk_id
+    ),
+    owners AS (
+        SELECT owner.risk_id, jsonb_agg(jsonb_build_object(
+            'usr_id', usr.id,
+            'usr_name', usr.name,
+            'usr_email', usr.email,
+            'usr_image', usr.image,
+            'usr_status', usr.status
+        ) ORDER BY owner.date_assigned) AS items
+        FROM risk_owners AS owner
+        JOIN users AS usr ON usr.id = owner.user_id
+        WHERE owner.risk_id IN (SELECT risk_id FROM register_risks)
+        GROUP BY owner.risk_id
+    )
+    SELECT (to_jsonb(risk) || jsonb_build_object(
+        'inherent_impact', rating.inherent_impact,
+        'inherent_likelihood', rating.inherent_likelihood,
+        'residual_impact', rating.residual_impact,
+        'residual_likelihood', rating.residual_likelihood,
+        'inherent_score', score.inherent_score,
+        'inherent_band', score.inherent_band,
+        'residual_score', score.residual_score,
+        'residual_band', score.residual_band,
+        'process_name', process.name,
+        'ratings', COALESCE(ratings.items, '[]'::jsonb),
+        'responses', COALESCE(responses.items, '[]'::jsonb),
+        'kris', COALESCE(kris.items, '[]'::jsonb),
+        'owners', COALESCE(owners.items, '[]'::jsonb)
+    ))::text
+    FROM risks AS risk
+    LEFT JOIN business_process AS process ON process.id = risk.process
+    LEFT JOIN latest_ratings AS rating ON rating.risk_id = risk.risk_id
+    LEFT JOIN risk_scores AS score ON score.risk_id = risk.risk_id
+    LEFT JOIN ratings ON ratings.risk_id = risk.risk_id
+    LEFT JOIN responses ON responses.risk_id = risk.risk_id
+    LEFT JOIN kris ON kris.risk_id = risk.risk_id
+    LEFT JOIN owners ON owners.risk_id = risk.risk_id
+    WHERE risk.register_id = %(register_id)s
+    ORDER BY risk.created_at, risk.risk_id
+"""
 
 
 async def get_all_risk_in_register():
@@ -48,6 +177,135 @@ async def get_general_risk_details(connection: AsyncConnection, risk_id: str):
 
 
 
+async def get_risk_detail(connection: AsyncConnection, risk_id: str) -> Optional[RiskDetail]:
+    """
+    Load a risk with its ratings, responses, KRIs and owners in one round trip.
+
+    Replaces the five lookups the detail page would otherwise make: Postgres builds
+    the nested document (see RISK_DETAIL_QUERY) and it is validated once here.
+
+    Args:
+        connection (AsyncConnection): The connection to read on.
+        risk_id (str): The risk.
+
+    Returns:
+        Optional[RiskDetail]: The document, or None if the risk does not exist.
+    """
+    with exception_response():
+        async with connection.cursor() as cursor:
+            await cursor.execute(RISK_DETAIL_QUERY, {"risk_id": risk_id})
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        return RiskDetail(**row[0])
+
+
+async def stream_register_export(
+        connection: AsyncConnection,
+        register_id: str,
+        chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Stream every risk of a register, as `RiskDetail` documents, as one JSON array.
+
+    The documents are built and serialized by Postgres (see REGISTER_EXPORT_QUERY) and
+    read through a server-side cursor `chunk_size` rows at a time, so the export costs
+    one query and memory for a single chunk however large the register is. The JSON
+    text is passed through without being parsed.
+
+    Args:
+        connection (AsyncConnection): A connection the caller keeps open while the
+                                      stream is consumed.
+        register_id (str): The register.
+        chunk_size (int): Risks per fetch, and per yielded chunk.
+
+    Yields:
+        bytes: Consecutive pieces of the JSON array.
+    """
+    async with connection.cursor(name=f"register_export_{get_unique_key()}") as cursor:
+        cursor.itersize = chunk_size
+        await cursor.execute(REGISTER_EXPORT_QUERY, {"register_id": register_id})
+        separator = b"["
+        while rows := await cursor.fetchmany(chunk_size):
+            yield separator + ",".join(row[0] for row in rows).encode()
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+
+# Most risks returned by one page of a scored listing.
+MAX_SCORED_RISKS = 500
+
+# The risks of a register ordered by {score} (inherent_score or residual_score), highest
+# first. The query is driven from risk_scores, so the (register_id, score) index returns
+# the rows in order and the scan stops at the page limit; the risk and its latest rating
+# are joined for those rows only. Risks are scored as soon as they are rated, so a risk
+# without a risk_scores row has no rating to sort by.
+SCORED_RISKS_QUERY = """
+    SELECT risk.*,
+        rating.inherent_impact, rating.inherent_likelihood,
+        rating.residual_impact, rating.residual_likelihood,
+        score.inherent_score, score.inherent_band, score.residual_score, score.residual_band
+    FROM (
+        SELECT * FROM risk_scores
+        WHERE register_id = %(register_id)s {filters}
+        ORDER BY {score} DESC NULLS LAST, risk_id
+        LIMIT %(limit)s OFFSET %(offset)s
+    ) AS score
+    JOIN risks AS risk ON risk.risk_id = score.risk_id
+    LEFT JOIN LATERAL (
+        SELECT * FROM risk_ratings WHERE risk_id = risk.risk_id ORDER BY created_at DESC LIMIT 1
+    ) AS rating ON TRUE
+    ORDER BY score.{score} DESC NULLS LAST, score.risk_id
+"""
+
+
+async def get_scored_risks(
+        connection: AsyncConnection,
+        risk_register_id: str,
+        rating_type: RiskRatingTypes = RiskRatingTypes.RESIDUAL,
+        band: Optional[str] = None,
+        min_score: Optional[float] = None,
+        limit: int = 100,
+        offset: int = 0
+):
+    """
+    List a register's risks by descending inherent or residual score.
+
+    Sorting, band and minimum-score filters and paging all run in Postgres on the
+    stored scores (see `models.risk_scoring_models.recalculate_risk_scores()`), and only
+    the risks of the page are joined. Risks that were never rated are not listed.
+
+    Args:
+        connection (AsyncConnection): The connection to read on.
+        risk_register_id (str): The register.
+        rating_type (RiskRatingTypes): Which score to sort and filter by.
+        band (Optional[str]): Only risks in this band.
+        min_score (Optional[float]): Only risks scoring at least this much.
+        limit (int): Page size, at most MAX_SCORED_RISKS.
+        offset (int): Risks to skip.
+    """
+    with exception_response():
+        prefix = from_enum(rating_type)
+        filters = []
+        params = {"register_id": risk_register_id, "limit": min(limit, MAX_SCORED_RISKS), "offset": offset}
+        if band is not None:
+            filters.append(sql.SQL("AND {} = %(band)s").format(sql.Identifier(f"{prefix}_band")))
+            params["band"] = band
+        if min_score is not None:
+            filters.append(sql.SQL("AND {} >= %(min_score)s").format(sql.Identifier(f"{prefix}_score")))
+            params["min_score"] = min_score
+
+        query = sql.SQL(SCORED_RISKS_QUERY).format(
+            filters=sql.SQL(" ").join(filters),
+            score=sql.Identifier(f"{prefix}_score")
+        )
+        async with connection.cursor() as cursor:
+            await cursor.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            rows = await cursor.fetchall()
+        return [JoinRisk(**dict(zip(columns, row))) for row in rows]
+
+
 async def get_all_risk_approved(connection: AsyncConnection, risk_register_id: str):
     with exception_response():
         builder =  await (
@@ -60,6 +318,15 @@ async def get_all_risk_approved(connection: AsyncConnection, risk_register_id: s
         return [JoinRisk(**data) for data in builder]
 
 
+@redis_cache(
+    key_builder=lambda connection, risk_register_id, **_: f"snapshot:risks:{risk_register_id}",
+    expire=SNAPSHOT_EXPIRE,
+    model=list[JoinRisk]
+)
+async def get_frozen_register_risks(connection: LazyConnection, risk_register_id: str, redis=None):
+    return await get_all_risk_approved(connection=await connection.get(), risk_register_id=risk_register_id)
+
+
 async def add_new_risk(connection: AsyncConnection, risk: NewRisk, risk_register_id: str):
     __risk__ = CreateRisk(
         risk_id=get_unique_key(),
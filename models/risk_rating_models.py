@@ -1,14 +1,20 @@
+import asyncio
 from datetime import datetime
 
+import numpy as np
 from psycopg import AsyncConnection
 
-from core.constants import Tables, RiskRatingsColumns
+from core.constants import Tables, RiskRatingsColumns, RiskHeatmapCellsColumns
 from core.utils import from_enum, exception_response, get_unique_key
-from schemas.risk_ratings_schemas import ReadRiskRating, CreateRiskRating, UpdateResidualRiskRating
+from schemas.risk_ratings_schemas import ReadRiskRating, CreateRiskRating, UpdateResidualRiskRating, \
+    RiskRatingTypes, RiskHeatmap, RiskHeatmapCell, RegisterSimulation, SimulationPercentile, CategoryExposure
+from models.risk_scoring_models import recalculate_risk_scores
 from schemas.risk_schemas import NewRisk
 from services.databases.postgres.insert import InsertQueryBuilder
 from services.databases.postgres.read import ReadBuilder
 from services.databases.postgres.update import UpdateQueryBuilder
+from services.databases.redis.connections import redis_cache
+from services.simulation.monte_carlo import SimulationConfig, simulate_losses, summarize_losses
 
 
 async def get_risk_ratings(connection: AsyncConnection, risk_id: str):
@@ -38,10 +44,22 @@ async def initialize_risk_rating(connection: AsyncConnection, risk: NewRisk, ris
     )
 
     result = await builder.execute()
+
+    await shift_heatmap_cell(
+        connection=connection,
+        risk_id=risk_id,
+        rating_type=RiskRatingTypes.INHERENT,
+        impact=risk.impact,
+        likelihood=risk.likelihood,
+        delta=1
+    )
+    await recalculate_risk_scores(connection=connection, risk_id=risk_id)
     return result
 
 async def edit_residual_risk_rating(connection: AsyncConnection, risk: UpdateResidualRiskRating, risk_id: str):
     with exception_response():
+         await move_residual_heatmap_cell(connection=connection, risk=risk, risk_id=risk_id)
+
          builder = (
              UpdateQueryBuilder(connection=connection)
              .into_table(Tables.RISK_RATINGS)
@@ -51,5 +69,212 @@ async def edit_residual_risk_rating(connection: AsyncConnection, risk: UpdateRes
          )
 
          result = await builder.execute()
+         await recalculate_risk_scores(connection=connection, risk_id=risk_id)
          return result
 
+
+async def shift_heatmap_cell(
+        connection: AsyncConnection,
+        risk_id: str,
+        rating_type: RiskRatingTypes,
+        impact: int,
+        likelihood: int,
+        delta: int
+):
+    query = """
+        INSERT INTO risk_heatmap_cells (register_id, rating_type, impact, likelihood, risks)
+        SELECT risk.register_id, %(rating_type)s, %(impact)s, %(likelihood)s, %(delta)s
+        FROM risks AS risk WHERE risk.risk_id = %(risk_id)s
+        ON CONFLICT (register_id, rating_type, impact, likelihood)
+        DO UPDATE SET risks = risk_heatmap_cells.risks + EXCLUDED.risks
+    """
+    builder = (
+        InsertQueryBuilder(connection=connection)
+        .into_table(Tables.RISK_HEATMAP_CELLS.value)
+        .raw(query, {
+            "risk_id": risk_id,
+            "rating_type": from_enum(rating_type),
+            "impact": impact,
+            "likelihood": likelihood,
+            "delta": delta
+        })
+    )
+    return await builder.execute()
+
+
+async def move_residual_heatmap_cell(connection: AsyncConnection, risk: UpdateResidualRiskRating, risk_id: str):
+    # Lock the rating so concurrent edits of the same risk apply their moves one at a time.
+    current = await (
+        ReadBuilder(connection=connection)
+        .from_table(from_enum(Tables.RISK_RATINGS))
+        .select_fields("residual_impact", "residual_likelihood")
+        .where(from_enum(RiskRatingsColumns.RISK_ID), risk_id)
+        .for_update()
+        .fetch_one()
+    )
+    if current is None:
+        return
+
+    old_cell = (current.get("residual_impact"), current.get("residual_likelihood"))
+    new_cell = (risk.residual_impact, risk.residual_likelihood)
+    if old_cell == new_cell:
+        return
+
+    if None not in old_cell:
+        await shift_heatmap_cell(
+            connection=connection,
+            risk_id=risk_id,
+            rating_type=RiskRatingTypes.RESIDUAL,
+            impact=old_cell[0],
+            likelihood=old_cell[1],
+            delta=-1
+        )
+    await shift_heatmap_cell(
+        connection=connection,
+        risk_id=risk_id,
+        rating_type=RiskRatingTypes.RESIDUAL,
+        impact=new_cell[0],
+        likelihood=new_cell[1],
+        delta=1
+    )
+
+
+@redis_cache(
+    key_builder=lambda connection, register_id, version, **_: f"heatmap:{register_id}:{version}",
+    expire=300,
+    model=RiskHeatmap
+)
+async def get_register_heatmap(connection: AsyncConnection, register_id: str, version: str, redis=None):
+    with exception_response():
+        builder = await (
+            ReadBuilder(connection=connection)
+            .from_table(from_enum(Tables.RISK_HEATMAP_CELLS))
+            .where(from_enum(RiskHeatmapCellsColumns.REGISTER_ID), register_id)
+            .fetch_all()
+        )
+        cells = {RiskRatingTypes.INHERENT.value: [], RiskRatingTypes.RESIDUAL.value: []}
+        for data in builder:
+            if data.get(RiskHeatmapCellsColumns.RISKS.value) > 0:
+                cells[data.get(RiskHeatmapCellsColumns.RATING_TYPE.value)].append(RiskHeatmapCell(**data))
+
+        return RiskHeatmap(
+            register_id=register_id,
+            inherent=cells[RiskRatingTypes.INHERENT.value],
+            residual=cells[RiskRatingTypes.RESIDUAL.value]
+        )
+
+
+# The latest rating of every risk in a register. Residual ratings fall back to the
+# inherent rating for risks that have not been assessed after their responses.
+SIMULATION_RATINGS_QUERY = """
+    SELECT risk.category,
+        CASE WHEN %(rating_type)s = 'residual'
+            THEN COALESCE(rating.residual_impact, rating.inherent_impact)
+            ELSE rating.inherent_impact END AS impact,
+        CASE WHEN %(rating_type)s = 'residual'
+            THEN COALESCE(rating.residual_likelihood, rating.inherent_likelihood)
+            ELSE rating.inherent_likelihood END AS likelihood
+    FROM risks AS risk
+    JOIN LATERAL (
+        SELECT * FROM risk_ratings WHERE risk_id = risk.risk_id ORDER BY created_at DESC LIMIT 1
+    ) AS rating ON TRUE
+    WHERE risk.register_id = %(register_id)s
+"""
+
+
+def run_register_simulation(
+        register_id: str,
+        rating_type: RiskRatingTypes,
+        rows: list[tuple],
+        trials: int,
+        correlation: float
+) -> RegisterSimulation:
+    """
+    Simulate the annual loss of a register from its rating rows (category, impact, likelihood).
+
+    CPU bound; callers on the event loop run it in a worker thread.
+    """
+    config = SimulationConfig.from_env()
+    rows = [row for row in rows if row[1] is not None and row[2] is not None]
+    categories: dict = {}
+    groups = np.fromiter((categories.setdefault(row[0], len(categories)) for row in rows), dtype=np.int64, count=len(rows))
+    impacts = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    likelihoods = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+
+    losses = simulate_losses(config, likelihoods, impacts, groups=groups, correlation=correlation, trials=trials)
+    summary = summarize_losses(losses)
+
+    # Category exposures are exact means, so they do not depend on the trials.
+    expected = config.expected_loss(likelihoods, impacts)
+    exposures = np.bincount(groups, weights=expected, minlength=len(categories))
+    counts = np.bincount(groups, minlength=len(categories))
+
+    return RegisterSimulation(
+        register_id=register_id,
+        rating_type=rating_type,
+        trials=trials,
+        correlation=correlation,
+        risks=len(rows),
+        expected_loss=summary["expected_loss"],
+        standard_deviation=summary["standard_deviation"],
+        probability_of_loss=summary["probability_of_loss"],
+        var_95=summary["var_95"],
+        var_99=summary["var_99"],
+        expected_shortfall_95=summary["expected_shortfall_95"],
+        expected_shortfall_99=summary["expected_shortfall_99"],
+        percentiles=[
+            SimulationPercentile(percentile=percentile, loss=loss)
+            for percentile, loss in summary["percentiles"].items()
+        ],
+        categories=sorted(
+            (
+                CategoryExposure(category=category, risks=int(counts[group]), expected_loss=float(exposures[group]))
+                for category, group in categories.items()
+            ),
+            key=lambda exposure: exposure.expected_loss,
+            reverse=True
+        )
+    )
+
+
+@redis_cache(
+    key_builder=lambda connection, register_id, version, rating_type, trials, correlation, **_:
+        f"simulation:{register_id}:{version}:{from_enum(rating_type)}:{trials}:{correlation}",
+    expire=3600,
+    lease_timeout=60,
+    model=RegisterSimulation
+)
+async def get_register_simulation(
+        connection: AsyncConnection,
+        register_id: str,
+        version: str,
+        rating_type: RiskRatingTypes,
+        trials: int,
+        correlation: float,
+        redis=None
+):
+    """
+    Monte Carlo loss distribution of a register.
+
+    Ratings are mapped to occurrence probabilities and lognormal severities (see
+    `services.simulation.monte_carlo`), risks of one category are correlated through
+    a shared factor when `correlation` is positive, and the trials run in a worker
+    thread so the event loop keeps serving requests. Results are cached per register
+    version, so they are recomputed only after a risk or rating changes.
+    """
+    with exception_response():
+        async with connection.cursor() as cursor:
+            await cursor.execute(SIMULATION_RATINGS_QUERY, {
+                "register_id": register_id,
+                "rating_type": from_enum(rating_type)
+            })
+            rows = await cursor.fetchall()
+
+        return await asyncio.to_thread(
+            run_register_simulation,
+            register_id,
+            rating_type,
+            rows,
+            trials,
+            correlation
+        )
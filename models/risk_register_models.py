@@ -1,11 +1,13 @@
 from psycopg import AsyncConnection
-from core.constants import Tables, RiskRegisterColumns
+from core.constants import Tables, RiskRegisterColumns, FrozenScope
 from core.utils import exception_response, get_unique_key, from_enum
 from schemas.risk_register_schemas import CreateRiskRegister, ReadRiskRegister, DeactivateRiskRegister, \
-    RiskRegisterStatus, NewRiskRegister
+    RiskRegisterStatus, NewRiskRegister, FROZEN_RISK_REGISTER_STATUSES
 from services.databases.postgres.insert import InsertQueryBuilder
 from services.databases.postgres.read import ReadBuilder
+from services.databases.postgres.connections import LazyConnection
 from services.databases.postgres.update import UpdateQueryBuilder
+from services.databases.redis.frozen import is_known_frozen, mark_frozen
 
 
 async def add_new_risk_register(connection: AsyncConnection, register: NewRiskRegister, module_id: str, user_id: str):
@@ -82,3 +84,16 @@ async def deactivate_risk_register(connection: AsyncConnection, risk_register_id
 
         return await builder.execute()
 
+
+async def is_risk_register_frozen(connection: LazyConnection, risk_register_id: str):
+    """
+    Whether a register is closed or archived. Only registers not yet known to be
+    frozen (see `is_known_frozen()`) take a connection to look their status up.
+    """
+    if await is_known_frozen(FrozenScope.RISK_REGISTER, risk_register_id):
+        return True
+    register = await get_single_risk_register(connection=await connection.get(), risk_register_id=risk_register_id)
+    if register is not None and register.status in FROZEN_RISK_REGISTER_STATUSES:
+        await mark_frozen(FrozenScope.RISK_REGISTER, risk_register_id)
+        return True
+    return False
@@ -3,7 +3,9 @@ from core.constants import Tables, RiskResponsesColumns
 from core.utils import exception_response, from_enum
 from schemas.risk_responses_schemas import ReadRiskResponse
 from schemas.risk_schemas import ReadRisk
+from services.databases.postgres.connections import LazyConnection
 from services.databases.postgres.read import ReadBuilder
+from services.databases.redis.connections import redis_cache, SNAPSHOT_EXPIRE
 
 async def get_risk_responses(connection: AsyncConnection, risk_id: str):
     with exception_response():
@@ -33,4 +35,13 @@ async def get_all_risk_responses(connection: AsyncConnection, register_id: str):
             .where("risk.register_id", register_id)
             .fetch_all()
         )
-        return [ReadRiskResponse(**data) for data in builder]
\ No newline at end of file
+        return [ReadRiskResponse(**data) for data in builder]
+
+
+@redis_cache(
+    key_builder=lambda connection, register_id, **_: f"snapshot:risk_responses:{register_id}",
+    expire=SNAPSHOT_EXPIRE,
+    model=list[ReadRiskResponse]
+)
+async def get_frozen_register_responses(connection: LazyConnection, register_id: str, redis=None):
+    return await get_all_risk_responses(connection=await connection.get(), register_id=register_id)
@@ -0,0 +1,204 @@
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from fastapi import HTTPException
+from psycopg import AsyncConnection, sql
+
+from core.constants import Tables, RiskScoringConfigsColumns
+from core.encoders import encode_json
+from core.utils import exception_response, from_enum
+from schemas.risk_register_schemas import FROZEN_RISK_REGISTER_STATUSES
+from schemas.risk_scoring_schemas import NewRiskScoringConfig, ReadRiskScoringConfig, RiskScoreRecalculation
+from services.databases.postgres.insert import InsertQueryBuilder
+from services.databases.redis.versions import track_change
+from services.scoring.engine import ScoringMatrix
+
+STAGING_TABLE = "risk_scores_staging"
+
+# Latest rating of every risk matching {filter}, with the module of its register.
+# Closed and archived registers are left alone so their snapshots keep the scores
+# they were closed with.
+SCORING_RATINGS_QUERY = """
+    SELECT risk.risk_id, risk.register_id, register.module_id,
+        rating.inherent_impact, rating.inherent_likelihood,
+        rating.residual_impact, rating.residual_likelihood
+    FROM risks AS risk
+    JOIN risk_registers AS register ON register.risk_register_id = risk.register_id
+    LEFT JOIN LATERAL (
+        SELECT * FROM risk_ratings WHERE risk_id = risk.risk_id ORDER BY created_at DESC LIMIT 1
+    ) AS rating ON TRUE
+    WHERE {filter} AND NOT (register.status = ANY(%(frozen)s))
+"""
+
+SAVE_CONFIG_QUERY = """
+    INSERT INTO risk_scoring_configs (
+        module_id, impact_levels, likelihood_levels, impact_weight, likelihood_weight, matrix, bands, updated_at
+    )
+    VALUES (
+        %(module_id)s, %(impact_levels)s, %(likelihood_levels)s, %(impact_weight)s, %(likelihood_weight)s,
+        %(matrix)s::jsonb, %(bands)s::jsonb, %(updated_at)s
+    )
+    ON CONFLICT (module_id) DO UPDATE SET
+        impact_levels = EXCLUDED.impact_levels,
+        likelihood_levels = EXCLUDED.likelihood_levels,
+        impact_weight = EXCLUDED.impact_weight,
+        likelihood_weight = EXCLUDED.likelihood_weight,
+        matrix = EXCLUDED.matrix,
+        bands = EXCLUDED.bands,
+        updated_at = EXCLUDED.updated_at
+"""
+
+# Upserts the staged scores in one statement.
+STORE_SCORES_QUERY = """
+    INSERT INTO risk_scores AS existing (
+        risk_id, register_id, inherent_score, inherent_band, residual_score, residual_band, updated_at
+    )
+    SELECT risk_id, register_id, inherent_score, inherent_band, residual_score, residual_band, updated_at
+    FROM risk_scores_staging
+    ON CONFLICT (risk_id) DO UPDATE SET
+        register_id = EXCLUDED.register_id,
+        inherent_score = EXCLUDED.inherent_score,
+        inherent_band = EXCLUDED.inherent_band,
+        residual_score = EXCLUDED.residual_score,
+        residual_band = EXCLUDED.residual_band,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+async def get_scoring_configs(connection: AsyncConnection, module_ids: list[str]) -> dict[str, ReadRiskScoringConfig]:
+    """
+    Scoring configuration of each module; modules without one get the defaults.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            "SELECT * FROM risk_scoring_configs WHERE module_id = ANY(%(module_ids)s)",
+            {"module_ids": module_ids}
+        )
+        columns = [description[0] for description in cursor.description]
+        rows = [dict(zip(columns, row)) for row in await cursor.fetchall()]
+
+    configs = {data.get(RiskScoringConfigsColumns.MODULE_ID.value): ReadRiskScoringConfig(**data) for data in rows}
+    return {module_id: configs.get(module_id) or ReadRiskScoringConfig(module_id=module_id) for module_id in module_ids}
+
+
+async def get_scoring_config(connection: AsyncConnection, module_id: str) -> ReadRiskScoringConfig:
+    with exception_response():
+        configs = await get_scoring_configs(connection=connection, module_ids=[module_id])
+        return configs[module_id]
+
+
+async def recalculate_risk_scores(
+        connection: AsyncConnection,
+        module_id: Optional[str] = None,
+        risk_id: Optional[str] = None
+) -> int:
+    """
+    Recompute and store the inherent and residual scores of many risks at once.
+
+    The latest ratings are loaded in one query, every module's risks are scored and
+    banded with one vectorized pass of its `ScoringMatrix`, and the results are
+    streamed into a staging table with COPY and upserted by a single statement.
+
+    Args:
+        connection (AsyncConnection): The connection to write on.
+        module_id (Optional[str]): Rescore every open register of this module.
+        risk_id (Optional[str]): Rescore this risk only.
+
+    Returns:
+        int: The number of risks scored.
+    """
+    if module_id is not None:
+        condition, params = sql.SQL("register.module_id = %(module_id)s"), {"module_id": module_id}
+    elif risk_id is not None:
+        condition, params = sql.SQL("risk.risk_id = %(risk_id)s"), {"risk_id": risk_id}
+    else:
+        raise ValueError("Either module_id or risk_id is required")
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            sql.SQL(SCORING_RATINGS_QUERY).format(filter=condition),
+            {**params, "frozen": [from_enum(status) for status in FROZEN_RISK_REGISTER_STATUSES]}
+        )
+        rows = await cursor.fetchall()
+    if not rows:
+        return 0
+
+    module_ids = [row[2] for row in rows]
+    configs = await get_scoring_configs(connection=connection, module_ids=sorted(set(module_ids)))
+    ratings = np.array([row[3:7] for row in rows], dtype=np.float64)
+
+    # Scored module by module; a register belongs to one module, so usually one pass.
+    modules = np.array(module_ids, dtype=object)
+    inherent_scores, residual_scores = np.empty(len(rows)), np.empty(len(rows))
+    inherent_bands, residual_bands = np.empty(len(rows), dtype=object), np.empty(len(rows), dtype=object)
+    for module, config in configs.items():
+        selected = modules == module
+        matrix = ScoringMatrix.from_config(config)
+        (
+            inherent_scores[selected], inherent_bands[selected],
+            residual_scores[selected], residual_bands[selected]
+        ) = matrix.score_ratings(ratings[selected])
+
+    updated_at = datetime.now()
+    inherent = np.where(np.isnan(inherent_scores), None, inherent_scores.astype(object))
+    residual = np.where(np.isnan(residual_scores), None, residual_scores.astype(object))
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                sql.Identifier(STAGING_TABLE),
+                sql.Identifier(from_enum(Tables.RISK_SCORES))
+            )
+        )
+        async with cursor.copy(
+            sql.SQL(
+                "COPY {} (risk_id, register_id, inherent_score, inherent_band, residual_score, residual_band, "
+                "updated_at) FROM STDIN"
+            ).format(sql.Identifier(STAGING_TABLE))
+        ) as copy:
+            for row, inherent_score, inherent_band, residual_score, residual_band in zip(
+                    rows, inherent.tolist(), inherent_bands.tolist(), residual.tolist(), residual_bands.tolist()
+            ):
+                await copy.write_row(
+                    (row[0], row[1], inherent_score, inherent_band, residual_score, residual_band, updated_at)
+                )
+
+        await cursor.execute(STORE_SCORES_QUERY)
+        await cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(STAGING_TABLE)))
+
+    track_change(connection, Tables.RISK_SCORES)
+    return len(rows)
+
+
+async def save_scoring_config(connection: AsyncConnection, config: NewRiskScoringConfig, module_id: str):
+    """
+    Store a module's scoring configuration and rescore its open registers with it.
+
+    Returns:
+        RiskScoreRecalculation: The module and the number of risks rescored.
+    """
+    with exception_response():
+        try:
+            ScoringMatrix.from_config(config)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        await (
+            InsertQueryBuilder(connection=connection)
+            .into_table(Tables.RISK_SCORING_CONFIGS)
+            .raw(SAVE_CONFIG_QUERY, {
+                "module_id": module_id,
+                "impact_levels": config.impact_levels,
+                "likelihood_levels": config.likelihood_levels,
+                "impact_weight": config.impact_weight,
+                "likelihood_weight": config.likelihood_weight,
+                "matrix": None if config.matrix is None else encode_json(config.matrix).decode(),
+                "bands": encode_json(config.bands).decode(),
+                "updated_at": datetime.now()
+            })
+            .execute()
+        )
+
+        risks = await recalculate_risk_scores(connection=connection, module_id=module_id)
+        return RiskScoreRecalculation(module_id=module_id, risks=risks)
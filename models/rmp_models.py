@@ -1,10 +1,12 @@
 from psycopg import AsyncConnection
-from core.constants import RMPColumns, Tables
+from core.constants import RMPColumns, Tables, FrozenScope
 from core.utils import exception_response, get_unique_key, from_enum
-from schemas.rmp_schemas import CreateRMP, ReadRMP, DeactivateRMP, RMPStatus, NewRMP
+from schemas.rmp_schemas import CreateRMP, ReadRMP, DeactivateRMP, RMPStatus, NewRMP, FROZEN_RMP_STATUSES
 from services.databases.postgres.insert import InsertQueryBuilder
 from services.databases.postgres.read import ReadBuilder
+from services.databases.postgres.connections import LazyConnection
 from services.databases.postgres.update import UpdateQueryBuilder
+from services.databases.redis.frozen import is_known_frozen, mark_frozen
 
 
 async def add_new_rmp(connection: AsyncConnection, rmp: NewRMP, module_id: str, user_id:str):
@@ -83,4 +85,15 @@ async def deactivate_rmp(connection: AsyncConnection, rmp_id: str):
         return await builder.execute()
 
 
-
+async def is_rmp_frozen(connection: LazyConnection, rmp_id: str):
+    """
+    Whether an RMP is closed or archived. Only RMPs not yet known to be frozen (see
+    `is_known_frozen()`) take a connection to look their status up.
+    """
+    if await is_known_frozen(FrozenScope.RMP, rmp_id):
+        return True
+    rmp = await get_single_rmp(connection=await connection.get(), rmp_id=rmp_id)
+    if rmp is not None and rmp.status in FROZEN_RMP_STATUSES:
+        await mark_frozen(FrozenScope.RMP, rmp_id)
+        return True
+    return False
@@ -7,7 +7,8 @@ from services.databases.postgres.insert import InsertQueryBuilder
 from services.databases.postgres.read import ReadBuilder
 from datetime import datetime
 
-from services.security.security import generate_hash_password
+from services.security.authorization import mark_stale
+from services.security.hashing import hashing_service
 
 
 async def get_entity_user(connection: AsyncConnection, email: str):
@@ -64,7 +65,7 @@ async def add_new_entity_user(connection: AsyncConnection, user:NewRiskUser, ent
             entity=entity,
             name=user.name,
             status="Active",
-            password_hash=generate_hash_password("123456"),
+            password_hash=await hashing_service.hash_password("123456"),
             email=user.email,
             administrator=False,
             owner=False,
@@ -95,7 +96,9 @@ async def add_new_organization_user(connection: AsyncConnection, user_id: str, o
             .values(__organization_user__)
             .returning("user_id", "organization_id")
         )
-        return await builder.execute()
+        result = await builder.execute()
+        mark_stale(connection, user_id)
+        return result
 
 async def add_new_module_user(connection: AsyncConnection, user: NewRiskUser, user_id: str, module_id: str):
     with exception_response():
@@ -113,7 +116,9 @@ async def add_new_module_user(connection: AsyncConnection, user: NewRiskUser, us
             .values(__module_user__)
             .returning("user_id", "module_id"))
 
-        return await builder.execute()
+        result = await builder.execute()
+        mark_stale(connection, user_id)
+        return result
 
 async def get_users(connection: AsyncConnection, module_id: str):
     with exception_response():
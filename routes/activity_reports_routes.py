@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, Query, Form
+from fastapi import APIRouter, Depends, Query, Form, Request
 from __schemas__ import CreateResponse
+from core.responses import list_response
 from core.utils import exception_response
 from models.activity_reports_models import add_new_activity_report, get_activity_reports, get_activity_report
 from schemas.activity_reports_schemas import NewActivityReport
@@ -35,12 +36,13 @@ async def create_new_activity_reports(
 @router.get("/{activity_id}")
 async def fetch_activity_reports(
         activity_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         data = await get_activity_reports(connection=connection, activity_id=activity_id)
-        return data
+        return list_response(data, request)
 
 
 @router.get("/report/{activity_report_id}")
@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Request
 from __schemas__ import CreateResponse
+from core.constants import Tables, FrozenScope
+from core.etags import conditional_get, IMMUTABLE_CACHE_CONTROL
+from core.responses import list_response, payload_response
 from core.utils import exception_response
 from models.activity_models import add_new_activity, get_current_activities, get_single_activity, add_activity_owners, \
-    get_activity_owners
-from models.rmp_models import get_current_rmp
-from schemas.activity_schemas import NewActivity, NewActivityOwner
-from services.databases.postgres.connections import AsyncDBPoolSingleton
+    get_activity_owners, get_frozen_rmp_activities, get_activity_calendar, get_due_activities, \
+    get_overdue_activities, get_rmp_activity_progress, update_activity_status
+from models.rmp_models import get_current_rmp, is_rmp_frozen
+from schemas.activity_schemas import NewActivity, NewActivityOwner, UpdateActivityStatus, RMPActivityProgress
+from services.databases.postgres.connections import AsyncDBPoolSingleton, get_lazy_db_connection
+from services.databases.redis.connections import get_redis
+from services.security.rate_limiter import rate_limit
 
 router = APIRouter(prefix="/activities")
 
+# Longest calendar window served at once; enough for an annual planning view.
+MAX_CALENDAR_DAYS = 400
+
 @router.post("/{module_id}", status_code=201, response_model=CreateResponse)
 async def create_new_activity(
         module_id: str,
@@ -36,15 +46,125 @@ async def create_new_activity(
 @router.get("/{module_id}")
 async def fetch_current_rmp_activities(
         module_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(Tables.RMP, Tables.ACTIVITIES, Tables.USERS)),
+        _limit = Depends(rate_limit("activities", 120, 60, by=("user", "module_id"))),
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         current_rmp = await get_current_rmp(connection=connection, module_id=module_id)
         if current_rmp is None:
-            return []
+            return list_response([], request, response)
         data = await get_current_activities(connection=connection, rmp_id=current_rmp.rmp_id)
-        return data
+        return list_response(data, request, response)
+
+@router.get("/calendar/{module_id}")
+async def fetch_current_rmp_calendar(
+        module_id: str,
+        request: Request,
+        response: Response,
+        start: datetime = Query(...),
+        end: datetime = Query(...),
+        etag = Depends(conditional_get(Tables.RMP, Tables.ACTIVITIES)),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        if (start.tzinfo is None) != (end.tzinfo is None) or end <= start:
+            raise HTTPException(status_code=400, detail="Invalid calendar window")
+        if (end - start).days > MAX_CALENDAR_DAYS:
+            raise HTTPException(status_code=400, detail=f"Calendar window is limited to {MAX_CALENDAR_DAYS} days")
+        current_rmp = await get_current_rmp(connection=connection, module_id=module_id)
+        if current_rmp is None:
+            return list_response([], request, response)
+        data = await get_activity_calendar(connection=connection, rmp_id=current_rmp.rmp_id, start=start, end=end)
+        return list_response(data, request, response)
+
+@router.get("/overdue/{module_id}")
+async def fetch_overdue_activities(
+        module_id: str,
+        request: Request,
+        response: Response,
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        current_rmp = await get_current_rmp(connection=connection, module_id=module_id)
+        if current_rmp is None:
+            return list_response([], request, response)
+        data = await get_overdue_activities(connection=connection, rmp_id=current_rmp.rmp_id)
+        return list_response(data, request, response)
+
+@router.get("/upcoming/{module_id}")
+async def fetch_upcoming_activities(
+        module_id: str,
+        request: Request,
+        response: Response,
+        days: int = Query(14, ge=1, le=MAX_CALENDAR_DAYS),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        current_rmp = await get_current_rmp(connection=connection, module_id=module_id)
+        if current_rmp is None:
+            return list_response([], request, response)
+        now = datetime.now()
+        data = await get_due_activities(
+            connection=connection,
+            rmp_id=current_rmp.rmp_id,
+            start=now,
+            end=now + timedelta(days=days)
+        )
+        return list_response(data, request, response)
+
+@router.get("/progress/{module_id}", response_model=RMPActivityProgress)
+async def fetch_rmp_activity_progress(
+        module_id: str,
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        current_rmp = await get_current_rmp(connection=connection, module_id=module_id)
+        if current_rmp is None:
+            raise HTTPException(status_code=404, detail="RMP Not Found")
+        return await get_rmp_activity_progress(connection=connection, rmp_id=current_rmp.rmp_id)
+
+@router.put("/status/{activity_id}", response_model=CreateResponse)
+async def change_activity_status(
+        activity_id: str,
+        status: UpdateActivityStatus,
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        await update_activity_status(connection=connection, activity_id=activity_id, status=status.status)
+        return CreateResponse(detail="Activity status updated")
+
+@router.get("/rmp/{rmp_id}")
+async def fetch_rmp_activities(
+        rmp_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(
+            Tables.RMP,
+            Tables.ACTIVITIES,
+            Tables.USERS,
+            frozen=(FrozenScope.RMP, "rmp_id")
+        )),
+        connection = Depends(get_lazy_db_connection),
+        redis = Depends(get_redis),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        # Snapshots of frozen RMPs are served from Redis without a pool connection.
+        if await is_rmp_frozen(connection=connection, rmp_id=rmp_id):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            payload = await get_frozen_rmp_activities.payload(connection=connection, rmp_id=rmp_id, redis=redis)
+            return payload_response(payload, request, response)
+        data = await get_current_activities(connection=await connection.get(), rmp_id=rmp_id)
+        return list_response(data, request, response)
 
 @router.get("/activity/{activity_id}")
 async def fetch_single_rmp_activities(
@@ -70,9 +190,10 @@ async def assign_activity_owners(
 @router.get("/owners/{activity_id}")
 async def fetch_activity_owners(
         activity_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         data = await get_activity_owners(connection=connection, activity_id=activity_id)
-        return data
\ No newline at end of file
+        return list_response(data, request)
\ No newline at end of file
@@ -1,9 +1,15 @@
-from fastapi import Depends, APIRouter
+from datetime import datetime
+from typing import Optional
+from fastapi import Depends, APIRouter, Response, Request, HTTPException, Query
 
 from __schemas__ import CreateResponse
+from core.constants import Tables, RollupGranularity
+from core.etags import conditional_get
+from core.responses import list_response
 from core.utils import exception_response
-from models.kri_models import add_new_risk_kri, get_risk_kri
-from schemas.risk_kri_schemas import NewRiskKRI
+from models.kri_models import add_new_risk_kri, get_risk_kri, get_risk_kri_band_reports
+from models.kri_reading_models import get_kri, ingest_kri_readings, get_kri_readings, get_kri_reading_rollups
+from schemas.risk_kri_schemas import NewRiskKRI, NewKRIReading, KRIReadingsIngested
 from services.databases.postgres.connections import AsyncDBPoolSingleton
 
 router = APIRouter(prefix="/risk_kri")
@@ -21,9 +27,78 @@ async def create_risk_kri(
 @router.get("/{risk_id}")
 async def fetch_risk_kri(
         risk_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(Tables.RISK_KRI)),
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         data = await get_risk_kri(connection=connection, risk_id=risk_id)
-        return data
+        return list_response(data, request, response)
+
+@router.get("/bands/{risk_id}")
+async def fetch_risk_kri_band_reports(
+        risk_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(Tables.RISK_KRI)),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        data = await get_risk_kri_band_reports(connection=connection, risk_id=risk_id)
+        return list_response(data, request, response)
+
+@router.post("/readings/{risk_kri_id}", status_code=201, response_model=KRIReadingsIngested)
+async def create_kri_readings(
+        risk_kri_id: str,
+        readings: list[NewKRIReading],
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        kri = await get_kri(connection=connection, risk_kri_id=risk_kri_id)
+        if kri is None:
+            raise HTTPException(status_code=404, detail="KRI Not Found")
+        inserted = await ingest_kri_readings(connection=connection, kri=kri, readings=readings)
+        return KRIReadingsIngested(
+            detail="Successfully recorded readings",
+            received=len(readings),
+            inserted=inserted
+        )
+
+@router.get("/readings/{risk_kri_id}")
+async def fetch_kri_readings(
+        risk_kri_id: str,
+        request: Request,
+        response: Response,
+        granularity: RollupGranularity = Query(RollupGranularity.DAY),
+        start: Optional[datetime] = Query(None),
+        end: Optional[datetime] = Query(None),
+        after: Optional[datetime] = Query(None),
+        etag = Depends(conditional_get(Tables.KRI_READINGS)),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        if granularity == RollupGranularity.RAW:
+            data, cursor = await get_kri_readings(
+                connection=connection,
+                risk_kri_id=risk_kri_id,
+                start=start,
+                end=end,
+                after=after
+            )
+            if cursor is not None:
+                next_page = request.url.include_query_params(after=cursor.isoformat())
+                response.headers["Link"] = f'<{next_page}>; rel="next"'
+        else:
+            data = await get_kri_reading_rollups(
+                connection=connection,
+                risk_kri_id=risk_kri_id,
+                granularity=granularity,
+                start=start,
+                end=end
+            )
+        return list_response(data, request, response)
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response, Query
+from core.constants import Tables
+from core.etags import conditional_get
+from core.responses import list_response, payload_response
 from core.utils import exception_response
-from models.risk_rating_models import get_risk_ratings, edit_residual_risk_rating
-from schemas.risk_ratings_schemas import NewRiskRating, UpdateResidualRiskRating
+from models.risk_rating_models import get_risk_ratings, edit_residual_risk_rating, get_register_heatmap, \
+    get_register_simulation
+from schemas.risk_ratings_schemas import NewRiskRating, UpdateResidualRiskRating, RiskRatingTypes
 from services.databases.postgres.connections import AsyncDBPoolSingleton
+from services.databases.redis.connections import get_redis
+from services.security.rate_limiter import rate_limit
+from services.simulation.monte_carlo import SIMULATION_TRIALS, MAX_SIMULATION_TRIALS
 
 router = APIRouter(prefix="/risk_ratings")
 @router.post("/{risk_id}")
@@ -19,12 +26,61 @@ async def create_risk_rating(
 @router.get("/{risk_id}")
 async def fetch_risk_rating(
         risk_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         rating = await get_risk_ratings(connection=connection, risk_id=risk_id)
-        return rating
+        return list_response(rating, request)
+
+
+@router.get("/heatmap/{risk_register_id}")
+async def fetch_risk_heatmap(
+        risk_register_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(Tables.RISK_HEATMAP_CELLS)),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        redis = Depends(get_redis),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        # Cached entries are keyed by the ETag, so any rating write retires them.
+        payload = await get_register_heatmap.payload(
+            connection=connection,
+            register_id=risk_register_id,
+            version=etag,
+            redis=redis if etag else None
+        )
+        return payload_response(payload, request, response)
+
+
+@router.get("/simulation/{risk_register_id}")
+async def fetch_register_simulation(
+        risk_register_id: str,
+        request: Request,
+        response: Response,
+        rating_type: RiskRatingTypes = RiskRatingTypes.RESIDUAL,
+        trials: int = Query(SIMULATION_TRIALS, ge=1, le=MAX_SIMULATION_TRIALS),
+        correlation: float = Query(0.0, ge=0.0, lt=1.0),
+        _limit = Depends(rate_limit("risk_simulation", 10, 60, by=("user", "risk_register_id"))),
+        etag = Depends(conditional_get(Tables.RISKS, Tables.RISK_RATINGS)),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        redis = Depends(get_redis),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        payload = await get_register_simulation.payload(
+            connection=connection,
+            register_id=risk_register_id,
+            version=etag,
+            rating_type=rating_type,
+            trials=trials,
+            correlation=correlation,
+            redis=redis if etag else None
+        )
+        return payload_response(payload, request, response)
 
 
 @router.put("/residual/{risk_id}")
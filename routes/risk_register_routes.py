@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 
 from __schemas__ import CreateResponse
+from core.responses import list_response
 from core.utils import exception_response
 from models.risk_register_models import add_new_risk_register, get_current_risk_register, get_all_risk_register
 from schemas.risk_register_schemas import NewRiskRegister
@@ -34,9 +35,10 @@ async def fetch_current_risk_register(
 @router.get("/{module_id}")
 async def fetch_all_risk_register(
         module_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         data = await get_all_risk_register(connection=connection, module_id=module_id)
-        return data
+        return list_response(data, request)
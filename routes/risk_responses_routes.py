@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, Request
 
 from __schemas__ import CreateResponse
-from core.constants import Tables, RiskResponsesColumns
+from core.constants import Tables, RiskResponsesColumns, FrozenScope
+from core.etags import conditional_get, IMMUTABLE_CACHE_CONTROL
+from core.responses import list_response, payload_response
 from core.utils import exception_response, get_unique_key
-from models.risk_register_models import get_current_risk_register
-from models.risk_response_models import get_risk_responses, get_all_risk_responses
+from models.risk_register_models import get_current_risk_register, is_risk_register_frozen
+from models.risk_response_models import get_risk_responses, get_all_risk_responses, get_frozen_register_responses
 from schemas.risk_responses_schemas import NewRiskResponse, CreateRiskResponse
-from services.databases.postgres.connections import AsyncDBPoolSingleton
+from services.databases.postgres.connections import AsyncDBPoolSingleton, get_lazy_db_connection
 from services.databases.postgres.insert import InsertQueryBuilder
+from services.databases.redis.connections import get_redis
 
 router = APIRouter(prefix="/risk_responses")
 @router.post("/{risk_id}", status_code=201, response_model=CreateResponse)
@@ -40,16 +43,18 @@ async def create_risk_response(
 @router.get("/{risk_id}")
 async def fetch_risk_risk_responses(
         risk_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         responses = await get_risk_responses(connection=connection, risk_id=risk_id)
-        return responses
+        return list_response(responses, request)
 
 @router.get("/all/{module_id}")
 async def fetch_all_risk_responses(
         module_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
@@ -66,4 +71,33 @@ async def fetch_all_risk_responses(
             connection=connection,
             register_id=current_risk_register.risk_register_id
         )
-        return responses
\ No newline at end of file
+        return list_response(responses, request)
+
+
+@router.get("/register/{risk_register_id}")
+async def fetch_register_risk_responses(
+        risk_register_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(
+            Tables.RISK_REGISTERS,
+            Tables.RISKS,
+            Tables.RISK_RESPONSES,
+            frozen=(FrozenScope.RISK_REGISTER, "risk_register_id")
+        )),
+        connection = Depends(get_lazy_db_connection),
+        redis = Depends(get_redis),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        # Snapshots of frozen registers are served from Redis without a pool connection.
+        if await is_risk_register_frozen(connection=connection, risk_register_id=risk_register_id):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            payload = await get_frozen_register_responses.payload(
+                connection=connection,
+                register_id=risk_register_id,
+                redis=redis
+            )
+            return payload_response(payload, request, response)
+        responses = await get_all_risk_responses(connection=await connection.get(), register_id=risk_register_id)
+        return list_response(responses, request, response)
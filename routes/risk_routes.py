@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, Request, Query
+from fastapi.responses import StreamingResponse
 
 from __schemas__ import CreateResponse
-from core.constants import RisksColumns
+from core.constants import RisksColumns, Tables, FrozenScope
+from core.etags import conditional_get, IMMUTABLE_CACHE_CONTROL
+from core.responses import list_response, payload_response, json_response, carry_headers
 from core.utils import  exception_response
 from models.risk_models import get_general_risk_details, get_all_risk_approved, add_new_risk, add_risk_owners, \
-    get_risk_owners
+    get_risk_owners, get_frozen_register_risks, get_risk_detail, stream_register_export, get_scored_risks, \
+    MAX_SCORED_RISKS
 from models.risk_rating_models import initialize_risk_rating
-from models.risk_register_models import get_current_risk_register
+from models.risk_register_models import get_current_risk_register, is_risk_register_frozen, get_single_risk_register
+from schemas.risk_ratings_schemas import RiskRatingTypes
 from schemas.risk_schemas import NewRisk, NewRiskOwner
-from services.databases.postgres.connections import AsyncDBPoolSingleton
+from services.databases.postgres.connections import AsyncDBPoolSingleton, db_connection, get_lazy_db_connection
+from services.databases.redis.connections import get_redis
+from services.security.rate_limiter import rate_limit
 
 
 router = APIRouter(prefix="/risks")
@@ -16,15 +25,75 @@ router = APIRouter(prefix="/risks")
 @router.get("/{module_id}")
 async def fetch_risks(
         module_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(Tables.RISK_REGISTERS, Tables.RISKS, Tables.RISK_RATINGS)),
+        _limit = Depends(rate_limit("risks", 120, 60, by=("user", "module_id"))),
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         current_risk_register = await get_current_risk_register(connection=connection, module_id=module_id)
         if current_risk_register is None:
-            return []
+            return list_response([], request, response)
         risks = await get_all_risk_approved(connection=connection, risk_register_id=current_risk_register.risk_register_id)
-        return risks
+        return list_response(risks, request, response)
+
+
+@router.get("/register/{risk_register_id}")
+async def fetch_register_risks(
+        risk_register_id: str,
+        request: Request,
+        response: Response,
+        etag = Depends(conditional_get(
+            Tables.RISK_REGISTERS,
+            Tables.RISKS,
+            Tables.RISK_RATINGS,
+            frozen=(FrozenScope.RISK_REGISTER, "risk_register_id")
+        )),
+        connection = Depends(get_lazy_db_connection),
+        redis = Depends(get_redis),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        # Snapshots of frozen registers are served from Redis without a pool connection.
+        if await is_risk_register_frozen(connection=connection, risk_register_id=risk_register_id):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            payload = await get_frozen_register_risks.payload(
+                connection=connection,
+                risk_register_id=risk_register_id,
+                redis=redis
+            )
+            return payload_response(payload, request, response)
+        risks = await get_all_risk_approved(connection=await connection.get(), risk_register_id=risk_register_id)
+        return list_response(risks, request, response)
+
+
+@router.get("/scored/{risk_register_id}")
+async def fetch_scored_risks(
+        risk_register_id: str,
+        request: Request,
+        response: Response,
+        rating_type: RiskRatingTypes = RiskRatingTypes.RESIDUAL,
+        band: Optional[str] = None,
+        min_score: Optional[float] = None,
+        limit: int = Query(100, ge=1, le=MAX_SCORED_RISKS),
+        offset: int = Query(0, ge=0),
+        etag = Depends(conditional_get(Tables.RISKS, Tables.RISK_RATINGS, Tables.RISK_SCORES)),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        risks = await get_scored_risks(
+            connection=connection,
+            risk_register_id=risk_register_id,
+            rating_type=rating_type,
+            band=band,
+            min_score=min_score,
+            limit=limit,
+            offset=offset
+        )
+        return list_response(risks, request, response)
 
 
 @router.get("/risk/{risk_id}")
@@ -38,6 +107,65 @@ async def fetch_risk_details(
         return risk
 
 
+@router.get("/detail/{risk_id}")
+async def fetch_risk_detail(
+        risk_id: str,
+        response: Response,
+        etag = Depends(conditional_get(
+            Tables.RISKS,
+            Tables.RISK_RATINGS,
+            Tables.RISK_SCORES,
+            Tables.RISK_RESPONSES,
+            Tables.RISK_KRI,
+            Tables.RISK_OWNERS,
+            Tables.USERS,
+            Tables.BUSINESS_PROCESS
+        )),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        risk = await get_risk_detail(connection=connection, risk_id=risk_id)
+        if risk is None:
+            raise HTTPException(status_code=404, detail="Risk Not Found")
+        return json_response(risk, response)
+
+
+@router.get("/export/{risk_register_id}")
+async def export_register_risks(
+        risk_register_id: str,
+        response: Response,
+        etag = Depends(conditional_get(
+            Tables.RISK_REGISTERS,
+            Tables.RISKS,
+            Tables.RISK_RATINGS,
+            Tables.RISK_SCORES,
+            Tables.RISK_RESPONSES,
+            Tables.RISK_KRI,
+            Tables.RISK_OWNERS,
+            Tables.USERS,
+            Tables.BUSINESS_PROCESS
+        )),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        register = await get_single_risk_register(connection=connection, risk_register_id=risk_register_id)
+        if register is None:
+            raise HTTPException(status_code=404, detail="Register Not Found")
+
+        async def chunks():
+            # The request's connection is released before the body is sent, so the
+            # stream holds its own for as long as the client keeps reading.
+            async with db_connection() as export_connection:
+                async for chunk in stream_register_export(connection=export_connection, register_id=risk_register_id):
+                    yield chunk
+
+        headers = carry_headers(response)
+        headers["content-disposition"] = f'attachment; filename="risk-register-{risk_register_id}.json"'
+        return StreamingResponse(chunks(), media_type="application/json", headers=headers)
+
+
 @router.post("/{module_id}")
 async def create_risk(
         module_id: str,
@@ -83,10 +211,11 @@ async def assign_risk_owners(
 @router.get("/owners/{risk_id}")
 async def fetch_risk_owners(
         risk_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         data = await get_risk_owners(connection=connection, risk_id=risk_id)
-        return data
+        return list_response(data, request)
 
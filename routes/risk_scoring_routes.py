@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Response
+from core.constants import Tables
+from core.etags import conditional_get
+from core.responses import json_response
+from core.utils import exception_response
+from models.risk_scoring_models import get_scoring_config, save_scoring_config
+from schemas.risk_scoring_schemas import NewRiskScoringConfig
+from services.databases.postgres.connections import AsyncDBPoolSingleton
+
+router = APIRouter(prefix="/risk_scoring")
+
+
+@router.get("/{module_id}")
+async def fetch_scoring_config(
+        module_id: str,
+        response: Response,
+        etag = Depends(conditional_get(Tables.RISK_SCORING_CONFIGS)),
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        config = await get_scoring_config(connection=connection, module_id=module_id)
+        return json_response(config, response)
+
+
+@router.put("/{module_id}")
+async def update_scoring_config(
+        module_id: str,
+        config: NewRiskScoringConfig,
+        connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        #user: CurrentUser  = Depends(get_current_user),
+):
+    with exception_response():
+        result = await save_scoring_config(connection=connection, config=config, module_id=module_id)
+        return result
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 
 from __schemas__ import CreateResponse
+from core.responses import list_response
 from core.utils import exception_response
 from models.rmp_models import add_new_rmp, get_current_rmp, get_all_rmp
 from schemas.rmp_schemas import NewRMP
@@ -35,10 +36,11 @@ async def fetch_current_module_rmp(
 @router.get("/{module_id}")
 async def fetch_all_module_rmp(
         module_id: str,
+        request: Request,
         connection=Depends(AsyncDBPoolSingleton.get_db_connection),
         # user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         data = await get_all_rmp(connection=connection, module_id=module_id)
-        return data
+        return list_response(data, request)
 
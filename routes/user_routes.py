@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 
 from __schemas__ import CreateResponse
+from core.responses import list_response
 from core.utils import exception_response
 from models.user_models import get_entity_user, add_new_entity_user, add_new_organization_user, get_organization_users, \
     add_new_module_user, get_module_users, get_users, get_user
@@ -73,12 +74,13 @@ async def create_new_risk_user(
 @router.get("/{module_id}")
 async def fetch_risk_users(
         module_id: str,
+        request: Request,
         connection = Depends(AsyncDBPoolSingleton.get_db_connection),
         #user: CurrentUser  = Depends(get_current_user),
 ):
     with exception_response():
         data = await get_users(connection=connection, module_id=module_id)
-        return data
+        return list_response(data, request)
 
 @router.get("/user/{module_id}")
 async def fetch_risk_user(
@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel
 from __schemas__ import Frequency, Creator
-from typing import List
+from typing import List, Optional
 
 
 class ActivityStatus(str, Enum):
@@ -31,6 +31,7 @@ class CreateActivity(BaseModel):
     frequency: Frequency
     creator: str
     next_at: datetime = datetime.now()
+    anchor_at: datetime = datetime.now()
     created_at: datetime = datetime.now()
 
 class CreateActivityOwner(BaseModel):
@@ -50,8 +51,30 @@ class ReadActivity(BaseModel):
     category: str
     frequency: Frequency
     creator: str
-    next_at: datetime
+    next_at: Optional[datetime] = None
+    anchor_at: Optional[datetime] = None
+    due_since: Optional[datetime] = None
     created_at: datetime
 
 class JoinReadActivity(ReadActivity):
     user: Creator
+
+class ActivityOccurrence(BaseModel):
+    activity_id: str
+    title: str
+    type: str
+    category: str
+    status: ActivityStatus
+    frequency: Frequency
+    occurs_at: datetime
+
+class UpdateActivityStatus(BaseModel):
+    status: ActivityStatus
+
+class RMPActivityProgress(BaseModel):
+    rmp_id: str
+    not_started: int = 0
+    in_progress: int = 0
+    completed: int = 0
+    reports: int = 0
+    overdue: int = 0
@@ -25,6 +25,7 @@ class CreateRiskKRI(BaseModel):
     medium: Optional[str] = None
     low: Optional[str] = None
     next_at: datetime
+    anchor_at: datetime
     created_at: datetime
 
 class ReadRiskKRI(BaseModel):
@@ -38,6 +39,52 @@ class ReadRiskKRI(BaseModel):
     high: Optional[str] = None
     medium: Optional[str] = None
     low: Optional[str] = None
-    next_at: datetime
+    next_at: Optional[datetime] = None
+    anchor_at: Optional[datetime] = None
     created_at: datetime
 
+
+class KRIBandRange(BaseModel):
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+    lower_inclusive: bool
+    upper_inclusive: bool
+    bands: list[str]
+
+class KRIBandReport(BaseModel):
+    risk_kri_id: Optional[str] = None
+    name: Optional[str] = None
+    overlaps: list[KRIBandRange]
+    gaps: list[KRIBandRange]
+    error: Optional[str] = None
+
+class NewKRIReading(BaseModel):
+    measured_at: datetime
+    value: float
+
+class ReadKRIReading(BaseModel):
+    risk_kri_id: str
+    measured_at: datetime
+    value: float
+    band: Optional[str] = None
+
+class KRIReadingRollup(BaseModel):
+    risk_kri_id: str
+    granularity: str
+    bucket: datetime
+    readings: int
+    total: float
+    minimum: float
+    maximum: float
+    last_value: float
+    last_at: datetime
+    very_high: int
+    high: int
+    medium: int
+    low: int
+    unclassified: int
+
+class KRIReadingsIngested(BaseModel):
+    detail: str
+    received: int
+    inserted: int
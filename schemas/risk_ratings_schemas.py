@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from enum import Enum
+from typing import List, Optional
 
 
 class RiskRatingTypes(str, Enum):
@@ -40,4 +41,44 @@ class ReadRiskRating(BaseModel):
     inherent_likelihood: int
     inherent_impact: int
     inherent_likelihood: int
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+
+class RiskHeatmapCell(BaseModel):
+    impact: int
+    likelihood: int
+    risks: int
+
+
+class RiskHeatmap(BaseModel):
+    register_id: str
+    inherent: List[RiskHeatmapCell]
+    residual: List[RiskHeatmapCell]
+
+
+class SimulationPercentile(BaseModel):
+    percentile: float
+    loss: float
+
+
+class CategoryExposure(BaseModel):
+    category: Optional[str] = None
+    risks: int
+    expected_loss: float
+
+
+class RegisterSimulation(BaseModel):
+    register_id: str
+    rating_type: RiskRatingTypes
+    trials: int
+    correlation: float
+    risks: int
+    expected_loss: float
+    standard_deviation: float
+    probability_of_loss: float
+    var_95: float
+    var_99: float
+    expected_shortfall_95: float
+    expected_shortfall_99: float
+    percentiles: List[SimulationPercentile]
+    categories: List[CategoryExposure]
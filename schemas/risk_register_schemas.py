@@ -9,6 +9,9 @@ class RiskRegisterStatus(str, Enum):
     CLOSED = "closed"
     ARCHIVED = "archived"
 
+# Registers in these states no longer change and may be cached indefinitely.
+FROZEN_RISK_REGISTER_STATUSES = {RiskRegisterStatus.CLOSED, RiskRegisterStatus.ARCHIVED}
+
 class NewRiskRegister(BaseModel):
     name: str
     year: Optional[int] = None
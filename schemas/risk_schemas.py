@@ -1,6 +1,10 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+from __schemas__ import Creator
+from schemas.risk_kri_schemas import ReadRiskKRI
+from schemas.risk_ratings_schemas import ReadRiskRating
+from schemas.risk_responses_schemas import ReadRiskResponse
 
 class NewRisk(BaseModel):
     name: str
@@ -71,4 +75,13 @@ class JoinRisk(BaseModel):
     residual_impact: Optional[int] = None
     residual_likelihood: Optional[int] = None
     process_name: Optional[str] = None
+    inherent_score: Optional[float] = None
+    inherent_band: Optional[str] = None
+    residual_score: Optional[float] = None
+    residual_band: Optional[str] = None
 
+class RiskDetail(JoinRisk):
+    ratings: List[ReadRiskRating] = []
+    responses: List[ReadRiskResponse] = []
+    kris: List[ReadRiskKRI] = []
+    owners: List[Creator] = []
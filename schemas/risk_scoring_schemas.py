@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class ScoreBand(BaseModel):
+    name: str
+    minimum: float
+
+
+class NewRiskScoringConfig(BaseModel):
+    impact_levels: int = 5
+    likelihood_levels: int = 5
+    impact_weight: float = 1.0
+    likelihood_weight: float = 1.0
+    # Explicit scores, likelihood rows x impact columns; overrides the weights.
+    matrix: Optional[List[List[float]]] = None
+    # Lowest score of each band, in ascending order.
+    bands: List[ScoreBand] = [
+        ScoreBand(name="low", minimum=0),
+        ScoreBand(name="medium", minimum=5),
+        ScoreBand(name="high", minimum=10),
+        ScoreBand(name="very_high", minimum=15),
+    ]
+
+
+class ReadRiskScoringConfig(NewRiskScoringConfig):
+    module_id: str
+    updated_at: Optional[datetime] = None
+
+
+class RiskScoreRecalculation(BaseModel):
+    module_id: str
+    risks: int
@@ -9,6 +9,9 @@ class RMPStatus(str, Enum):
     CLOSED = "closed"
     ARCHIVED = "archived"
 
+# RMPs in these states no longer change and may be cached indefinitely.
+FROZEN_RMP_STATUSES = {RMPStatus.CLOSED, RMPStatus.ARCHIVED}
+
 class NewRMP(BaseModel):
     name: str
     year: Optional[int] = None
@@ -1,8 +1,13 @@
 import os
+from contextlib import asynccontextmanager
 from typing import Optional
 
+from psycopg import AsyncConnection
+
 from psycopg_pool import AsyncConnectionPool
 from dotenv import load_dotenv
+from services.databases.redis.versions import publish_changes, discard_changes
+from services.security.authorization import publish_invalidations, discard_invalidations
 
 load_dotenv()
 
@@ -86,10 +91,71 @@ class AsyncDBPoolSingleton:
     async def get_db_connection():
         pool = await AsyncDBPoolSingleton.get_instance().get_pool()
         async with pool.connection() as conn:
-            yield conn
+            try:
+                yield conn
+            except BaseException:
+                discard_changes(conn)
+                discard_invalidations(conn)
+                raise
+        # The transaction is committed once the pool context exits.
+        await publish_changes(conn)
+        await publish_invalidations(conn)
 
 
 async def get_db_connection():
     pool = await AsyncDBPoolSingleton.get_instance().get_pool()
     async with pool.connection() as conn:
-        yield conn
\ No newline at end of file
+        try:
+            yield conn
+        except BaseException:
+            discard_changes(conn)
+            discard_invalidations(conn)
+            raise
+    await publish_changes(conn)
+    await publish_invalidations(conn)
+
+
+# `get_db_connection` as an async context manager, for work that runs outside a
+# request's dependencies (background tasks, streamed responses).
+db_connection = asynccontextmanager(get_db_connection)
+
+
+class LazyConnection:
+    """
+    A request's database connection, checked out of the pool on first use.
+
+    Routes that can often answer from Redis (frozen snapshots) depend on this instead
+    of `get_db_connection`, so a cache hit never takes a pool connection. The
+    connection is committed and its changes published when the request ends, exactly
+    as with `get_db_connection`.
+    """
+
+    def __init__(self):
+        self._context = None
+        self._connection: Optional[AsyncConnection] = None
+
+    async def get(self) -> AsyncConnection:
+        if self._connection is None:
+            context = db_connection()
+            self._connection = await context.__aenter__()
+            self._context = context
+        return self._connection
+
+    async def release(self, error: Optional[BaseException] = None):
+        context, self._context, self._connection = self._context, None, None
+        if context is None:
+            return
+        if error is None:
+            await context.__aexit__(None, None, None)
+        else:
+            await context.__aexit__(type(error), error, error.__traceback__)
+
+
+async def get_lazy_db_connection():
+    lazy = LazyConnection()
+    try:
+        yield lazy
+    except BaseException as e:
+        await lazy.release(e)
+        raise
+    await lazy.release()
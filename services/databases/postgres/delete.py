@@ -1,4 +1,5 @@
 from psycopg import sql, AsyncConnection
+from services.databases.redis.versions import track_change
 from typing import Optional, Dict, Any, List
 from fastapi import HTTPException
 
@@ -13,6 +14,8 @@ class DeleteQueryBuilder:
     - Adding WHERE conditions to filter which rows to delete.
     - Optionally checking if matching records exist before deletion.
     - Returning specific fields from deleted rows.
+    - Recording the write so the table's change version is bumped once the
+      transaction commits (see `services.databases.redis.versions`).
 
     Example usage:
         builder = (
@@ -178,6 +181,7 @@ class DeleteQueryBuilder:
         try:
             async with self.connection.cursor() as cursor:
                 await cursor.execute(query, params)
+                track_change(self.connection, self._table)
                 if self._returning_fields:
                     row = await cursor.fetchone()
                     if row:
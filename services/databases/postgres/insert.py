@@ -1,4 +1,5 @@
 from psycopg import sql, AsyncConnection
+from services.databases.redis.versions import track_change
 from pydantic import BaseModel
 from typing import TypeVar, Optional, Union
 
@@ -14,6 +15,8 @@ class InsertQueryBuilder:
     - Providing insert values via a Pydantic model.
     - Optionally returning specific fields after insertion.
     - Checking for record existence based on one or more columns before inserting.
+    - Recording the write so the table's change version is bumped once the
+      transaction commits (see `services.databases.redis.versions`).
 
     Example usage:
         builder = (
@@ -61,6 +64,8 @@ class InsertQueryBuilder:
         """
         Provide a raw SQL query and parameter dictionary to execute directly.
 
+        Combine with `into_table()` so the write is recorded for change versioning.
+
         Args:
             raw_query (str | sql.SQL): The raw SQL query to be executed.
             params (dict): The parameter dictionary to be used in the query.
@@ -197,6 +202,8 @@ class InsertQueryBuilder:
             try:
                 async with self.connection.cursor() as cursor:
                     await cursor.execute(self._raw_query, self._raw_params)
+                    if self._table:
+                        track_change(self.connection, self._table)
 
                     if self._returning_fields:
                         row = await cursor.fetchone()
@@ -211,6 +218,7 @@ class InsertQueryBuilder:
         try:
             async with self.connection.cursor() as cursor:
                 await cursor.execute(query, params)
+                track_change(self.connection, self._table)
 
                 if self._returning_fields:
                     row = await cursor.fetchone()
@@ -0,0 +1,33 @@
+-- Per-register impact x likelihood counts for inherent and residual ratings.
+-- Maintained incrementally by models/risk_rating_models.py whenever a rating is written.
+CREATE TABLE IF NOT EXISTS risk_heatmap_cells (
+    register_id TEXT NOT NULL,
+    rating_type TEXT NOT NULL,
+    impact INTEGER NOT NULL,
+    likelihood INTEGER NOT NULL,
+    risks INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (register_id, rating_type, impact, likelihood)
+);
+
+-- Backfill from the latest rating of each existing risk, the rating the incremental
+-- path, the simulation and scoring all use.
+INSERT INTO risk_heatmap_cells (register_id, rating_type, impact, likelihood, risks)
+WITH latest AS (
+    SELECT risk.register_id,
+        rating.inherent_impact, rating.inherent_likelihood,
+        rating.residual_impact, rating.residual_likelihood
+    FROM risks AS risk
+    JOIN LATERAL (
+        SELECT * FROM risk_ratings WHERE risk_id = risk.risk_id ORDER BY created_at DESC LIMIT 1
+    ) AS rating ON TRUE
+)
+SELECT register_id, 'inherent', inherent_impact, inherent_likelihood, COUNT(*)
+FROM latest
+WHERE inherent_impact IS NOT NULL AND inherent_likelihood IS NOT NULL
+GROUP BY register_id, inherent_impact, inherent_likelihood
+UNION ALL
+SELECT register_id, 'residual', residual_impact, residual_likelihood, COUNT(*)
+FROM latest
+WHERE residual_impact IS NOT NULL AND residual_likelihood IS NOT NULL
+GROUP BY register_id, residual_impact, residual_likelihood
+ON CONFLICT (register_id, rating_type, impact, likelihood) DO UPDATE SET risks = EXCLUDED.risks;
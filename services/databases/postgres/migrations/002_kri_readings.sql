@@ -0,0 +1,33 @@
+-- Measured KRI values, append-only and range partitioned by month on measured_at.
+-- Monthly partitions (kri_readings_YYYY_MM) are created on demand by
+-- models/kri_reading_models.py before a batch is ingested.
+-- band holds the classification code at ingest time:
+-- 0 very_high, 1 high, 2 medium, 3 low, NULL when no band matched.
+CREATE TABLE IF NOT EXISTS kri_readings (
+    risk_kri_id TEXT NOT NULL,
+    measured_at TIMESTAMPTZ NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    band SMALLINT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (risk_kri_id, measured_at)
+) PARTITION BY RANGE (measured_at);
+
+-- Daily and monthly aggregates of kri_readings, updated in the same statement that
+-- ingests the readings so charts never scan raw rows.
+CREATE TABLE IF NOT EXISTS kri_reading_rollups (
+    risk_kri_id TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    readings INTEGER NOT NULL,
+    total DOUBLE PRECISION NOT NULL,
+    minimum DOUBLE PRECISION NOT NULL,
+    maximum DOUBLE PRECISION NOT NULL,
+    last_value DOUBLE PRECISION NOT NULL,
+    last_at TIMESTAMPTZ NOT NULL,
+    very_high INTEGER NOT NULL DEFAULT 0,
+    high INTEGER NOT NULL DEFAULT 0,
+    medium INTEGER NOT NULL DEFAULT 0,
+    low INTEGER NOT NULL DEFAULT 0,
+    unclassified INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (risk_kri_id, granularity, bucket)
+);
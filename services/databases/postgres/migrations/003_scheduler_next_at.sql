@@ -0,0 +1,7 @@
+-- Range scans of due KRIs and activities by services/scheduling/scheduler.py.
+CREATE INDEX IF NOT EXISTS risk_kri_next_at_idx ON risk_kri (next_at);
+CREATE INDEX IF NOT EXISTS activities_next_at_idx ON activities (next_at);
+
+-- A "Specific Date" item has no occurrence after its date; next_at is cleared once it is dispatched.
+ALTER TABLE risk_kri ALTER COLUMN next_at DROP NOT NULL;
+ALTER TABLE activities ALTER COLUMN next_at DROP NOT NULL;
@@ -0,0 +1,31 @@
+-- Per-RMP activity counts by status, plus submitted reports.
+-- Maintained incrementally by models/activity_models.py on activity writes and report submissions.
+CREATE TABLE IF NOT EXISTS rmp_activity_counters (
+    rmp_id TEXT PRIMARY KEY,
+    not_started INTEGER NOT NULL DEFAULT 0,
+    in_progress INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    reports INTEGER NOT NULL DEFAULT 0
+);
+
+-- Overdue and upcoming activities of an RMP are a range scan on next_at; the status is
+-- carried in the index so open activities are filtered without visiting the table.
+CREATE INDEX IF NOT EXISTS activities_rmp_next_at_idx ON activities (rmp_id, next_at) INCLUDE (status);
+
+-- Backfill from the activities and reports that already exist.
+INSERT INTO rmp_activity_counters (rmp_id, not_started, in_progress, completed, reports)
+SELECT activity.rmp_id,
+       COUNT(*) FILTER (WHERE activity.status = 'Not Started'),
+       COUNT(*) FILTER (WHERE activity.status = 'In Progress'),
+       COUNT(*) FILTER (WHERE activity.status = 'Completed'),
+       COALESCE(SUM(report.reports), 0)
+FROM activities AS activity
+LEFT JOIN (
+    SELECT activity_id, COUNT(*) AS reports FROM activity_reports GROUP BY activity_id
+) AS report ON report.activity_id = activity.activity_id
+GROUP BY activity.rmp_id
+ON CONFLICT (rmp_id) DO UPDATE SET
+    not_started = EXCLUDED.not_started,
+    in_progress = EXCLUDED.in_progress,
+    completed = EXCLUDED.completed,
+    reports = EXCLUDED.reports;
@@ -0,0 +1,55 @@
+-- Per-module scoring configuration: matrix size, impact/likelihood weights, an optional
+-- explicit score matrix (likelihood rows x impact columns) and band cut-offs.
+-- Modules without a row are scored with the defaults in services/scoring/engine.py.
+CREATE TABLE IF NOT EXISTS risk_scoring_configs (
+    module_id TEXT PRIMARY KEY,
+    impact_levels INTEGER NOT NULL DEFAULT 5,
+    likelihood_levels INTEGER NOT NULL DEFAULT 5,
+    impact_weight DOUBLE PRECISION NOT NULL DEFAULT 1,
+    likelihood_weight DOUBLE PRECISION NOT NULL DEFAULT 1,
+    matrix JSONB,
+    bands JSONB NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- Inherent and residual score and band of every risk, from its latest rating.
+-- Rewritten by models/risk_scoring_models.py when a rating is written and in bulk
+-- when a module's configuration changes.
+CREATE TABLE IF NOT EXISTS risk_scores (
+    risk_id TEXT PRIMARY KEY,
+    register_id TEXT NOT NULL,
+    inherent_score DOUBLE PRECISION,
+    inherent_band TEXT,
+    residual_score DOUBLE PRECISION,
+    residual_band TEXT,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- Listing a register by score (models/risk_models.py SCORED_RISKS_QUERY) is an index
+-- scan that stops at the page limit; band and minimum-score filters are applied while
+-- scanning. risk_id breaks ties so pages are stable.
+CREATE INDEX IF NOT EXISTS risk_scores_register_inherent_idx
+    ON risk_scores (register_id, inherent_score DESC NULLS LAST, risk_id);
+CREATE INDEX IF NOT EXISTS risk_scores_register_residual_idx
+    ON risk_scores (register_id, residual_score DESC NULLS LAST, risk_id);
+
+-- Backfill with the default configuration: impact x likelihood on a 5 x 5 matrix,
+-- ratings clamped to the matrix, bands low < 5 <= medium < 10 <= high < 15 <= very high.
+INSERT INTO risk_scores (risk_id, register_id, inherent_score, inherent_band, residual_score, residual_band)
+SELECT risk.risk_id, risk.register_id, scored.inherent_score,
+       CASE WHEN scored.inherent_score >= 15 THEN 'very_high' WHEN scored.inherent_score >= 10 THEN 'high'
+            WHEN scored.inherent_score >= 5 THEN 'medium' WHEN scored.inherent_score >= 0 THEN 'low' END,
+       scored.residual_score,
+       CASE WHEN scored.residual_score >= 15 THEN 'very_high' WHEN scored.residual_score >= 10 THEN 'high'
+            WHEN scored.residual_score >= 5 THEN 'medium' WHEN scored.residual_score >= 0 THEN 'low' END
+FROM risks AS risk
+JOIN LATERAL (
+    SELECT * FROM risk_ratings WHERE risk_id = risk.risk_id ORDER BY created_at DESC LIMIT 1
+) AS rating ON TRUE
+CROSS JOIN LATERAL (
+    SELECT LEAST(GREATEST(rating.inherent_impact, 1), 5) * LEAST(GREATEST(rating.inherent_likelihood, 1), 5)
+               AS inherent_score,
+           LEAST(GREATEST(rating.residual_impact, 1), 5) * LEAST(GREATEST(rating.residual_likelihood, 1), 5)
+               AS residual_score
+) AS scored
+ON CONFLICT (risk_id) DO NOTHING;
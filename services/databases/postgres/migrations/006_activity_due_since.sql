@@ -0,0 +1,9 @@
+-- The earliest occurrence of an activity that is still outstanding. Set by
+-- services/scheduling/scheduler.py when an open activity's next_at passes (the
+-- scheduler then moves next_at on to the following occurrence) and cleared by
+-- models/activity_models.py when a report is submitted or the activity is completed.
+ALTER TABLE activities ADD COLUMN IF NOT EXISTS due_since TIMESTAMP;
+
+-- Overdue activities of an RMP are a scan of this small partial index.
+CREATE INDEX IF NOT EXISTS activities_rmp_due_since_idx ON activities (rmp_id, due_since) INCLUDE (status)
+    WHERE due_since IS NOT NULL;
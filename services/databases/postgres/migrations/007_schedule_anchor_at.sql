@@ -0,0 +1,9 @@
+-- The fixed first occurrence of each schedule. services/scheduling/scheduler.py counts
+-- every next_at from it, so a month-end day clamped once by a short month is not
+-- carried into the following months; the activity calendar expands from it too.
+ALTER TABLE risk_kri ADD COLUMN IF NOT EXISTS anchor_at TIMESTAMP;
+ALTER TABLE activities ADD COLUMN IF NOT EXISTS anchor_at TIMESTAMP;
+
+-- Existing schedules started when they were created.
+UPDATE risk_kri SET anchor_at = created_at WHERE anchor_at IS NULL;
+UPDATE activities SET anchor_at = created_at WHERE anchor_at IS NULL;
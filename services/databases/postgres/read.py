@@ -21,11 +21,24 @@ class ReadBuilder:
         self._joins = []
         self._table_alias = None
         self._distinct = False
+        self._for_update = False
+        self._for_update_of = None
 
     def distinct(self):
         self._distinct = True
         return self
 
+    def for_update(self, of: Optional[str] = None):
+        """
+        Lock the selected rows until the end of the transaction.
+
+        Args:
+            of (Optional[str]): Table or alias to lock when the query joins several tables.
+        """
+        self._for_update = True
+        self._for_update_of = of
+        return self
+
     def join(self, join_type: str, table: str, on: str, alias: Optional[str] = None,
              model: Optional[Type[BaseModel]] = None, use_prefix: bool = True):
         join_clause = {
@@ -83,6 +96,45 @@ class ReadBuilder:
         self._params[column] = value
         return self
 
+    def where_not(self, column: str, value):
+        if column is None:
+            raise ValueError("Value of column can't be None")
+        self._where.append(f"{column} <> %({column}_not)s")
+        self._params[f"{column}_not"] = value
+        return self
+
+    def where_not_null(self, column: str):
+        if column is None:
+            raise ValueError("Value of column can't be None")
+        self._where.append(f"{column} IS NOT NULL")
+        return self
+
+    def where_range(self, column: str, start=None, end=None):
+        """
+        Restrict a column to the half-open range [start, end). Either bound may be None.
+        """
+        if column is None:
+            raise ValueError("Value of column can't be None")
+        if start is not None:
+            self._where.append(f"{column} >= %({column}_start)s")
+            self._params[f"{column}_start"] = start
+        if end is not None:
+            self._where.append(f"{column} < %({column}_end)s")
+            self._params[f"{column}_end"] = end
+        return self
+
+    def where_after(self, column: str, value=None):
+        """
+        Restrict a column to values strictly greater than `value`, e.g. a keyset cursor.
+        A None value adds no condition.
+        """
+        if column is None:
+            raise ValueError("Value of column can't be None")
+        if value is not None:
+            self._where.append(f"{column} > %({column}_after)s")
+            self._params[f"{column}_after"] = value
+        return self
+
     def order_by(self, column: str, descending=False):
         if column is None:
             raise ValueError("Value of column can't be None")
@@ -184,6 +236,11 @@ class ReadBuilder:
             query += sql.SQL(" OFFSET %(offset)s")
             self._params['offset'] = self._offset
 
+        if self._for_update:
+            query += sql.SQL(" FOR UPDATE")
+            if self._for_update_of:
+                query += sql.SQL(" OF ") + sql.Identifier(self._for_update_of)
+
         return query, self._params
 
     async def fetch_all(self):
@@ -1,4 +1,5 @@
 from psycopg import sql, AsyncConnection
+from services.databases.redis.versions import track_change
 from pydantic import BaseModel
 from typing import TypeVar, Optional, Union
 
@@ -15,6 +16,8 @@ class UpdateQueryBuilder:
     - Defining WHERE conditions to target rows for update.
     - Optionally returning specific fields after the update.
     - Checking for record existence before performing the update.
+    - Recording the write so the table's change version is bumped once the
+      transaction commits (see `services.databases.redis.versions`).
 
     Example usage:
         builder = (
@@ -62,6 +65,8 @@ class UpdateQueryBuilder:
         """
         Provide a raw SQL query and parameter dictionary to execute directly.
 
+        Combine with `into_table()` so the write is recorded for change versioning.
+
         Args:
             raw_query (str | sql.SQL): The raw SQL query to be executed.
             params (dict): The parameter dictionary to be used in the query.
@@ -241,6 +246,8 @@ class UpdateQueryBuilder:
             try:
                 async with self.connection.cursor() as cursor:
                     await cursor.execute(self._raw_query, self._raw_params)
+                    if self._table:
+                        track_change(self.connection, self._table)
 
                     if self._returning_fields:
                         row = await cursor.fetchone()
@@ -262,6 +269,7 @@ class UpdateQueryBuilder:
         try:
             async with self.connection.cursor() as cursor:
                 await cursor.execute(query, params)
+                track_change(self.connection, self._table)
 
                 if self._returning_fields:
                     row = await cursor.fetchone()
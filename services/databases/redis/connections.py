@@ -1,19 +1,40 @@
 import asyncio
+import math
+import random
+import struct
+import time
+import uuid
 from redis.asyncio import Redis, ConnectionPool
+from redis.exceptions import RedisError
 from typing import AsyncGenerator, Optional
-import json
 from functools import wraps
-from typing import Callable, Awaitable
+from typing import Callable, Awaitable, Any
 import os
 from dotenv import load_dotenv
+from core.encoders import encode, decode
 
 load_dotenv()
 
 redis_host = os.getenv("REDIS_HOST", "redis")
 redis_port = int(os.getenv("REDIS_PORT", 6379))
 
+# Lifetime of snapshots of frozen (closed or archived) registers and RMPs.
+SNAPSHOT_EXPIRE = int(os.getenv("REDIS_SNAPSHOT_EXPIRE", 30 * 24 * 60 * 60))
+
+# Deletes the lease only if it is still held by the caller's token.
+RELEASE_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Cache entry header: compute time in seconds and logical expiry timestamp.
+ENTRY_HEADER = struct.Struct("!dd")
+
 class RedisSingleton:
     _client: Optional[Redis] = None
+    _binary_client: Optional[Redis] = None
     _lock = asyncio.Lock()
 
     @classmethod
@@ -30,31 +51,240 @@ class RedisSingleton:
                     cls._client = Redis(connection_pool=pool)
         return cls._client
 
+    @classmethod
+    async def get_binary_client(cls) -> Redis:
+        """
+        Get a client that returns raw bytes, for binary payloads written by `core.encoders`.
+        """
+        if cls._binary_client is None:
+            async with cls._lock:
+                if cls._binary_client is None:
+                    pool = ConnectionPool.from_url(
+                        f"redis://{redis_host}:{redis_port}",
+                        max_connections=20,
+                        decode_responses=False
+                    )
+                    cls._binary_client = Redis(connection_pool=pool)
+        return cls._binary_client
+
 async def get_redis() -> AsyncGenerator[Redis, None]:
     client = await RedisSingleton.get_client()
     yield client
 
-def redis_cache(key_builder: Callable[..., str], expire: int = 60):
+
+# Marks a refresh that was skipped because another worker holds the lease.
+_NOT_REFRESHED = object()
+
+# Marks a cache hit whose payload has not been decoded.
+_UNDECODED = object()
+
+# Computations currently running in this process, keyed by cache key.
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def _single_flight(key: str, compute: Callable[[], Awaitable[Any]]):
+    """
+    Coalesce concurrent computations of the same key inside this process.
+
+    The first caller for a key runs `compute()`; every caller arriving while it is
+    running awaits the same result instead of issuing its own query. If the leading
+    caller is cancelled, waiters fall back to computing the value themselves.
+
+    Args:
+        key (str): The cache key being computed.
+        compute (Callable[[], Awaitable[Any]]): Coroutine factory producing the value.
+
+    Returns:
+        Any: The computed value.
+    """
+    future = _inflight.get(key)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            return await compute()
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await compute()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved when nobody else was waiting on it.
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(key, None)
+
+
+async def _binary(redis: Redis) -> Redis:
+    if redis.connection_pool.connection_kwargs.get("decode_responses"):
+        return await RedisSingleton.get_binary_client()
+    return redis
+
+
+async def _acquire_lease(redis: Redis, key: str, lease_timeout: int) -> Optional[str]:
+    token = uuid.uuid4().hex
+    acquired = await redis.set(f"{key}:lease", token, nx=True, px=lease_timeout * 1000)
+    return token if acquired else None
+
+
+async def _release_lease(redis: Redis, key: str, token: str):
+    try:
+        await redis.eval(RELEASE_LEASE_SCRIPT, 1, f"{key}:lease", token)
+    except RedisError:
+        # The lease expires on its own; a failed release only delays the next refresh.
+        pass
+
+
+def redis_cache(
+        key_builder: Callable[..., str],
+        expire: int = 60,
+        stale: Optional[int] = None,
+        beta: float = 1.0,
+        lease_timeout: int = 10,
+        model: Optional[Any] = None
+):
+    """
+    Cache the result of an async function in Redis with single-flight semantics.
+
+    Entries are stored together with the time it took to compute them and their
+    logical expiry. Reads follow these rules:
+
+    - Fresh entries are returned directly. As the expiry approaches, a request is
+      picked probabilistically (XFetch, weighted by compute time and `beta`) to
+      refresh the entry early, so hot keys are rebuilt before they expire.
+    - Entries past their logical expiry remain readable for `stale` more seconds.
+      One request refreshes them while everyone else keeps getting the stale value.
+    - Only the holder of a short Redis lease recomputes a key, which coordinates
+      refreshes across workers; inside a worker, concurrent callers for the same
+      key share one computation.
+
+    Values are stored with the binary codec from `core.encoders`, so Pydantic models
+    and `datetime` fields are supported and large values are compressed. Pass `model`
+    to get validated model instances back from cache hits instead of plain data.
+
+    The decorated function also exposes `payload(...)`, which takes the same
+    arguments but returns the stored payload without decoding it. Large payloads are
+    stored gzip-compressed, so routes can send them to clients without serializing
+    or compressing them again (see `core.responses.payload_response()`).
+
+    Caching is enabled by passing a `redis` keyword argument to the decorated
+    function. Any Redis failure falls back to calling the function directly.
+
+    Args:
+        key_builder (Callable[..., str]): Builds the cache key from the call arguments.
+        expire (int): Seconds an entry is considered fresh.
+        stale (Optional[int]): Seconds an expired entry may still be served while it is
+                               being refreshed. Defaults to `expire`.
+        beta (float): Early refresh aggressiveness; values above 1 refresh earlier.
+        lease_timeout (int): Seconds a refresh lease is held before it lapses.
+        model (Optional[Any]): Type the cached value is decoded into, e.g. `list[JoinRisk]`.
+
+    Example:
+        @redis_cache(key_builder=lambda connection, module_id, **_: f"risks:{module_id}", model=list[JoinRisk])
+        async def get_module_risks(connection, module_id: str, redis=None):
+            ...
+    """
+    stale_window = expire if stale is None else stale
+
     def decorator(func: Callable[..., Awaitable]):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
+        async def compute(args, kwargs):
+            return await func(*args, **kwargs), None
+
+        async def compute_and_store(redis: Redis, key: str, args, kwargs):
+            started = time.perf_counter()
+            result = await func(*args, **kwargs)
+            delta = time.perf_counter() - started
+
+            payload = encode(result)
+            try:
+                entry = ENTRY_HEADER.pack(delta, time.time() + expire) + payload
+                await redis.set(key, entry, ex=expire + stale_window)
+            except RedisError:
+                pass
+            return result, payload
+
+        async def refresh(redis: Redis, key: str, args, kwargs):
+            token = await _acquire_lease(redis, key, lease_timeout)
+            if token is None:
+                return _NOT_REFRESHED
+            try:
+                return await compute_and_store(redis, key, args, kwargs)
+            finally:
+                await _release_lease(redis, key, token)
+
+        async def fill(redis: Redis, key: str, args, kwargs):
+            token = await _acquire_lease(redis, key, lease_timeout)
+            if token is not None:
+                try:
+                    return await compute_and_store(redis, key, args, kwargs)
+                finally:
+                    await _release_lease(redis, key, token)
+
+            # Another worker is computing this key; wait for its result.
+            deadline = time.monotonic() + lease_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                cached = await redis.get(key)
+                if cached:
+                    return _UNDECODED, cached[ENTRY_HEADER.size:]
+            return await compute(args, kwargs)
+
+        async def resolve(args, kwargs):
+            """
+            Return `(result, payload)`. The result is `_UNDECODED` when only the encoded
+            payload is at hand, and the payload is None when caching was bypassed.
+            """
             redis: Redis = kwargs.get("redis")  # expect redis to be passed
-            key = key_builder(*args, **kwargs)
 
             if redis is None:
-                return await func(*args, **kwargs)
+                return await compute(args, kwargs)
+
+            key = key_builder(*args, **kwargs)
+
+            try:
+                redis = await _binary(redis)
+                cached = await redis.get(key)
+            except RedisError:
+                return await compute(args, kwargs)
 
-            # Try to get from Redis
-            cached = await redis.get(key)
             if cached:
-                return json.loads(cached)
+                delta, expires_at = ENTRY_HEADER.unpack_from(cached)
+                stored = (_UNDECODED, cached[ENTRY_HEADER.size:])
+                early = time.time() - delta * beta * math.log(1.0 - random.random())
+                if early < expires_at:
+                    return stored
 
-            # Call original function
-            result = await func(*args, **kwargs)
+                # Early refresh or stale-while-revalidate: one request rebuilds, others read.
+                try:
+                    refreshed = await _single_flight(key, lambda: refresh(redis, key, args, kwargs))
+                except Exception:
+                    refreshed = _NOT_REFRESHED
+                return stored if refreshed is _NOT_REFRESHED else refreshed
+
+            try:
+                return await _single_flight(key, lambda: fill(redis, key, args, kwargs))
+            except RedisError:
+                return await compute(args, kwargs)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            result, payload = await resolve(args, kwargs)
+            return decode(payload, model) if result is _UNDECODED else result
 
-            # Cache the result
-            await redis.set(key, json.dumps(result), ex=expire)
-            return result
+        async def payload_of(*args, **kwargs) -> bytes:
+            result, payload = await resolve(args, kwargs)
+            return encode(result) if payload is None else payload
 
+        wrapper.payload = payload_of
         return wrapper
     return decorator
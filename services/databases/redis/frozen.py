@@ -0,0 +1,45 @@
+from redis.exceptions import RedisError
+
+from core.constants import FrozenScope
+from services.databases.redis.connections import RedisSingleton, SNAPSHOT_EXPIRE
+
+FROZEN_KEY_PREFIX = "frozen"
+
+# Frozen is a terminal state, so a scope seen frozen never needs to be looked up again.
+_frozen: dict[FrozenScope, set[str]] = {scope: set() for scope in FrozenScope}
+
+
+def frozen_key(scope: FrozenScope, scope_id: str) -> str:
+    return f"{FROZEN_KEY_PREFIX}:{scope.value}:{scope_id}"
+
+
+async def is_known_frozen(scope: FrozenScope, scope_id: str) -> bool:
+    """
+    Whether a register or RMP is already known to be frozen, without asking Postgres.
+
+    Scopes are remembered in this process and, across processes, in Redis, so only the
+    first request to a scope anywhere in the deployment looks its status up. False means
+    "not known", not "not frozen"; callers fall back to the database.
+    """
+    if scope_id in _frozen[scope]:
+        return True
+    try:
+        redis = await RedisSingleton.get_client()
+        if not await redis.exists(frozen_key(scope, scope_id)):
+            return False
+    except RedisError:
+        return False
+    _frozen[scope].add(scope_id)
+    return True
+
+
+async def mark_frozen(scope: FrozenScope, scope_id: str):
+    """
+    Remember a register or RMP whose committed status is closed or archived.
+    """
+    _frozen[scope].add(scope_id)
+    try:
+        redis = await RedisSingleton.get_client()
+        await redis.set(frozen_key(scope, scope_id), 1, ex=SNAPSHOT_EXPIRE)
+    except RedisError as e:
+        print(e)
@@ -0,0 +1,91 @@
+import uuid
+from enum import Enum
+from typing import Optional, Union
+from weakref import WeakKeyDictionary
+from psycopg import AsyncConnection
+from redis.exceptions import RedisError
+from services.databases.redis.connections import RedisSingleton
+
+VERSION_KEY_PREFIX = "version"
+
+# Identifies the lifetime of the version counters. If Redis loses its data the epoch
+# changes too, so counters restarting from zero can never repeat an old ETag.
+EPOCH_KEY = f"{VERSION_KEY_PREFIX}:epoch"
+
+# Tables written on a connection whose transaction has not been committed yet.
+_pending: WeakKeyDictionary[AsyncConnection, set[str]] = WeakKeyDictionary()
+
+
+def _table_name(table: Union[str, Enum]) -> str:
+    return table.value if isinstance(table, Enum) else table
+
+
+def version_key(table: Union[str, Enum]) -> str:
+    return f"{VERSION_KEY_PREFIX}:{_table_name(table)}"
+
+
+def track_change(connection: AsyncConnection, table: Union[str, Enum]):
+    """
+    Record that `table` was written on `connection`.
+
+    The change version is only bumped by `publish_changes()` once the transaction has
+    committed, so a reader can never pair a new version with uncommitted data.
+
+    Args:
+        connection (AsyncConnection): The connection the write was executed on.
+        table (str | Enum): The table that was written.
+    """
+    _pending.setdefault(connection, set()).add(_table_name(table))
+
+
+def discard_changes(connection: AsyncConnection):
+    """
+    Forget the writes recorded on a connection whose transaction was rolled back.
+    """
+    _pending.pop(connection, None)
+
+
+async def publish_changes(connection: AsyncConnection):
+    """
+    Bump the change version of every table written on `connection`.
+
+    Must be called after the transaction has committed. Failures are swallowed: a
+    missed bump is resolved by the next write to the same table, and readers treat an
+    unreachable Redis as "no version available" rather than serving stale data.
+
+    Args:
+        connection (AsyncConnection): The connection whose writes were committed.
+    """
+    tables = _pending.pop(connection, None)
+    if not tables:
+        return
+    try:
+        redis = await RedisSingleton.get_client()
+        async with redis.pipeline(transaction=False) as pipe:
+            for table in tables:
+                pipe.incr(version_key(table))
+            await pipe.execute()
+    except RedisError as e:
+        print(e)
+
+
+async def get_versions(*tables: Union[str, Enum]) -> Optional[list[str]]:
+    """
+    Read the current change versions of the given tables.
+
+    Args:
+        *tables (str | Enum): The tables a response is derived from.
+
+    Returns:
+        Optional[list[str]]: The epoch followed by one version per table, or None if
+                             Redis is unavailable.
+    """
+    try:
+        redis = await RedisSingleton.get_client()
+        values = await redis.mget(EPOCH_KEY, *(version_key(table) for table in tables))
+        if values[0] is None:
+            await redis.set(EPOCH_KEY, uuid.uuid4().hex, nx=True)
+            values = await redis.mget(EPOCH_KEY, *(version_key(table) for table in tables))
+    except RedisError:
+        return None
+    return [value or "0" for value in values]
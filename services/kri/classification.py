@@ -0,0 +1,169 @@
+import ast
+from typing import Optional
+import numpy as np
+
+from core.constants import KRIBand
+from schemas.risk_kri_schemas import KRIBandRange, KRIBandReport
+from services.kri.expressions import KRI_BANDS, VARIABLE, Node, parse_expression
+
+# Band code for readings matching no band.
+UNCLASSIFIED = -1
+
+# Band codes returned by `classify_array()`: the index of the band in `KRI_BANDS`.
+BAND_CODES = {band: code for code, band in enumerate(KRI_BANDS)}
+
+_UFUNCS = {
+    ast.Gt: np.greater,
+    ast.Lt: np.less,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+    ast.GtE: np.greater_equal,
+    ast.LtE: np.less_equal,
+}
+
+
+def evaluate_mask(node: Node, values: np.ndarray) -> np.ndarray:
+    """
+    Evaluate a lowered expression (see `parse_expression()`) over a whole array.
+
+    Args:
+        node (Node): The lowered expression.
+        values (np.ndarray): The readings, as a float array.
+
+    Returns:
+        np.ndarray: Boolean mask of the readings satisfying the expression.
+    """
+    kind = node[0]
+    if kind == "cmp":
+        _, op, left, right = node
+        ufunc = _UFUNCS[op]
+        if left == VARIABLE:
+            return ufunc(values, right if right != VARIABLE else values)
+        return ufunc(left, values)
+    if kind == "const":
+        return np.full(values.shape, node[1], dtype=bool)
+    if kind == "not":
+        return np.logical_not(evaluate_mask(node[1], values))
+
+    masks = [evaluate_mask(child, values) for child in node[1]]
+    reduce = np.logical_and if kind == "and" else np.logical_or
+    result = masks[0]
+    for mask in masks[1:]:
+        result = reduce(result, mask)
+    return result
+
+
+def _band_nodes(thresholds: dict[KRIBand, Optional[str]]) -> list[tuple[int, Node]]:
+    return [
+        (BAND_CODES[band], parse_expression(expression))
+        for band, expression in thresholds.items()
+        if expression and expression.strip()
+    ]
+
+
+def classify_array(thresholds: dict[KRIBand, Optional[str]], values: np.ndarray) -> np.ndarray:
+    """
+    Classify a whole series of readings into bands in one vectorized pass.
+
+    Each band's expression is lowered to NumPy comparisons and boolean masks. As with
+    `expressions.classify()`, the first matching band from very high to low wins.
+
+    Args:
+        thresholds (dict[KRIBand, Optional[str]]): Band mapped to its expression.
+        values (np.ndarray): The readings.
+
+    Raises:
+        KRIExpressionError: If a threshold is invalid.
+
+    Returns:
+        np.ndarray: int8 band codes (see `BAND_CODES`), `UNCLASSIFIED` where no band matches.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.full(values.shape, UNCLASSIFIED, dtype=np.int8)
+    # Apply the lowest priority band first so higher ones overwrite it.
+    for code, node in sorted(_band_nodes(thresholds), reverse=True):
+        codes[evaluate_mask(node, values)] = code
+    return codes
+
+
+def band_codes_to_names(codes: np.ndarray) -> list[Optional[str]]:
+    names = [band.value for band in KRI_BANDS]
+    return [names[code] if code != UNCLASSIFIED else None for code in codes.tolist()]
+
+
+def _constants(node: Node, found: set):
+    kind = node[0]
+    if kind == "cmp":
+        found.update(operand for operand in node[2:] if operand != VARIABLE)
+    elif kind == "not":
+        _constants(node[1], found)
+    elif kind in ("and", "or"):
+        for child in node[1]:
+            _constants(child, found)
+
+
+def analyze_bands(thresholds: dict[KRIBand, Optional[str]]) -> KRIBandReport:
+    """
+    Find the ranges of readings matched by more than one band, or by none.
+
+    Every expression only compares `N` with constants, so the number line splits into
+    the constants themselves and the open intervals between them, and each band either
+    matches a whole piece or none of it. One sample per piece is classified with
+    `evaluate_mask()`, and neighbouring pieces with the same outcome are merged.
+
+    Args:
+        thresholds (dict[KRIBand, Optional[str]]): Band mapped to its expression.
+
+    Raises:
+        KRIExpressionError: If a threshold is invalid.
+
+    Returns:
+        KRIBandReport: The overlapping and uncovered ranges.
+    """
+    nodes = _band_nodes(thresholds)
+    found: set = set()
+    for _, node in nodes:
+        _constants(node, found)
+    constants = sorted(found) or [0.0]
+
+    # Pieces: (-inf, c0), c0, (c0, c1), c1, ..., ck, (ck, inf), each with one sample.
+    samples, pieces = [constants[0] - 1.0], [(None, constants[0], False, False)]
+    for index, constant in enumerate(constants):
+        samples.append(constant)
+        pieces.append((constant, constant, True, True))
+        upper = constants[index + 1] if index + 1 < len(constants) else None
+        samples.append((constant + upper) / 2 if upper is not None else constant + 1.0)
+        pieces.append((constant, upper, False, False))
+
+    values = np.array(samples, dtype=np.float64)
+    matches = np.zeros((len(KRI_BANDS), len(values)), dtype=bool)
+    for code, node in nodes:
+        matches[code] = evaluate_mask(node, values)
+    counts = matches.sum(axis=0)
+
+    overlaps: list[KRIBandRange] = []
+    gaps: list[KRIBandRange] = []
+    previous_key = None
+    for position, (lower, upper, lower_inclusive, upper_inclusive) in enumerate(pieces):
+        count = counts[position]
+        if count == 1:
+            previous_key = None
+            continue
+
+        bands = [KRI_BANDS[code].value for code in np.flatnonzero(matches[:, position])]
+        key = ("gap",) if count == 0 else tuple(bands)
+        ranges = gaps if count == 0 else overlaps
+        if key == previous_key:
+            ranges[-1].upper = upper
+            ranges[-1].upper_inclusive = upper_inclusive
+        else:
+            ranges.append(KRIBandRange(
+                lower=lower,
+                upper=upper,
+                lower_inclusive=lower_inclusive,
+                upper_inclusive=upper_inclusive,
+                bands=bands
+            ))
+        previous_key = key
+
+    return KRIBandReport(overlaps=overlaps, gaps=gaps)
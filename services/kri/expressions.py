@@ -0,0 +1,197 @@
+import ast
+import math
+import operator
+import os
+from functools import lru_cache
+from typing import Any, Callable, Optional, Union
+
+from core.constants import KRIBand
+
+# Compiled expressions kept in memory, keyed by expression text.
+KRI_EXPRESSION_CACHE_SIZE = int(os.getenv("KRI_EXPRESSION_CACHE_SIZE", 4096))
+
+# Bands in the order they are tried; the first matching band wins.
+KRI_BANDS = (KRIBand.VERY_HIGH, KRIBand.HIGH, KRIBand.MEDIUM, KRIBand.LOW)
+
+# Longest expression accepted, to keep parsing of user input cheap.
+MAX_EXPRESSION_LENGTH = 256
+
+VARIABLE = "N"
+
+# Supported binary comparison operators
+operators: dict[type, Any] = {
+    ast.Gt: operator.gt,
+    ast.Lt: operator.lt,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.GtE: operator.ge,
+    ast.LtE: operator.le,
+}
+
+# Lowered expression tree, shared by the scalar and vectorized evaluators:
+#   ("cmp", operator, left, right)  where each operand is VARIABLE or a float,
+#   ("and", [nodes]), ("or", [nodes]), ("not", node), ("const", bool).
+Node = tuple
+
+
+class KRIExpressionError(ValueError):
+    """
+    Raised when a KRI threshold expression is invalid or unsupported.
+    """
+
+
+def _operand(node: ast.expr) -> Union[str, float]:
+    if isinstance(node, ast.Name) and node.id == VARIABLE:
+        return VARIABLE
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        if not math.isfinite(node.value):
+            raise KRIExpressionError("Numeric constants must be finite.")
+        return float(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _operand(node.operand)
+        if value == VARIABLE:
+            raise KRIExpressionError("Only numeric constants can be negated.")
+        return -value if isinstance(node.op, ast.USub) else value
+    raise KRIExpressionError(f"Unsupported operand: {ast.unparse(node)}")
+
+
+def _lower(node: ast.expr) -> Node:
+    if isinstance(node, ast.BoolOp):
+        kind = "and" if isinstance(node.op, ast.And) else "or"
+        return kind, [_lower(value) for value in node.values]
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return "not", _lower(node.operand)
+
+    if isinstance(node, ast.Compare):
+        # "a < N <= b" is "a < N and N <= b".
+        comparisons = []
+        left = _operand(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in operators:
+                raise KRIExpressionError(f"Unsupported operator: {type(op).__name__}")
+            right = _operand(comparator)
+            if left != VARIABLE and right != VARIABLE:
+                comparisons.append(("const", operators[type(op)](left, right)))
+            else:
+                comparisons.append(("cmp", type(op), left, right))
+            left = right
+        return comparisons[0] if len(comparisons) == 1 else ("and", comparisons)
+
+    raise KRIExpressionError("Only comparisons of N combined with 'and', 'or' and 'not' are supported.")
+
+
+@lru_cache(maxsize=KRI_EXPRESSION_CACHE_SIZE)
+def parse_expression(expression: str) -> Node:
+    """
+    Parse and validate a threshold expression over `N` into a lowered tree.
+
+    Supported: numeric constants, the comparison operators `<`, `<=`, `>`, `>=`, `==`
+    and `!=`, chained comparisons such as `10 <= N < 20`, `and`, `or`, `not` and
+    parentheses.
+
+    Args:
+        expression (str): The expression, e.g. "N >= 75 or N < 5".
+
+    Raises:
+        KRIExpressionError: If the expression is invalid or unsupported.
+
+    Returns:
+        Node: The lowered expression tree.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise KRIExpressionError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters.")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise KRIExpressionError(f"Invalid expression: {e.msg}")
+    return _lower(tree.body)
+
+
+_SYMBOLS = {ast.Gt: ">", ast.Lt: "<", ast.Eq: "==", ast.NotEq: "!=", ast.GtE: ">=", ast.LtE: "<="}
+
+
+def _operand_source(operand: Union[str, float]) -> str:
+    return VARIABLE if operand == VARIABLE else repr(operand)
+
+
+def _source(node: Node) -> str:
+    kind = node[0]
+    if kind == "cmp":
+        _, op, left, right = node
+        return f"({_operand_source(left)} {_SYMBOLS[op]} {_operand_source(right)})"
+    if kind == "const":
+        return repr(node[1])
+    if kind == "not":
+        return f"(not {_source(node[1])})"
+    return "(" + f" {kind} ".join(_source(child) for child in node[1]) + ")"
+
+
+@lru_cache(maxsize=KRI_EXPRESSION_CACHE_SIZE)
+def compile_expression(expression: str) -> Callable[[float], bool]:
+    """
+    Compile a threshold expression into a Python function of `N`.
+
+    The expression is validated by `parse_expression()` and then compiled to
+    bytecode once; the returned function evaluates it without any parsing. Compiled
+    functions are cached by expression text.
+
+    Args:
+        expression (str): The expression, e.g. "12 <= N < 60".
+
+    Raises:
+        KRIExpressionError: If the expression is invalid or unsupported.
+
+    Returns:
+        Callable[[float], bool]: The compiled predicate.
+
+    Example:
+        compile_expression("N > 80 or N < 5")(90)  ➜ True
+    """
+    source = f"lambda {VARIABLE}: {_source(parse_expression(expression))}"
+    # Only `N`, numbers and operators can appear in the source, as checked above.
+    return eval(compile(source, f"<kri: {expression}>", "eval"), {"__builtins__": {}})
+
+
+def validate_thresholds(thresholds: dict[KRIBand, Optional[str]]):
+    """
+    Check that every given band threshold compiles.
+
+    Args:
+        thresholds (dict[KRIBand, Optional[str]]): Band mapped to its expression.
+
+    Raises:
+        KRIExpressionError: Naming the first invalid band.
+    """
+    for band, expression in thresholds.items():
+        if expression is None or not expression.strip():
+            continue
+        try:
+            compile_expression(expression)
+        except KRIExpressionError as e:
+            raise KRIExpressionError(f"Invalid {band.value} threshold '{expression}': {e}")
+
+
+def kri_thresholds(kri: Any) -> dict[KRIBand, Optional[str]]:
+    """
+    Collect the band thresholds of a KRI model (`NewRiskKRI`, `ReadRiskKRI`, ...).
+    """
+    return {band: getattr(kri, band.value, None) for band in KRI_BANDS}
+
+
+def classify(thresholds: dict[KRIBand, Optional[str]], value: float) -> Optional[KRIBand]:
+    """
+    Return the first band, from very high to low, whose threshold `value` satisfies.
+
+    Args:
+        thresholds (dict[KRIBand, Optional[str]]): Band mapped to its expression.
+        value (float): The KRI reading.
+
+    Returns:
+        Optional[KRIBand]: The matching band, or None if no band matches.
+    """
+    for band in KRI_BANDS:
+        expression = thresholds.get(band)
+        if expression and expression.strip() and compile_expression(expression)(value):
+            return band
+    return None
@@ -0,0 +1,175 @@
+import calendar
+import os
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from __schemas__ import Frequency
+
+# Expanded calendar months kept in memory, keyed by (anchor, frequency, month). A month
+# holds at most 31 occurrences, so this also bounds the cached occurrences.
+RECURRENCE_CACHE_SIZE = int(os.getenv("RECURRENCE_CACHE_SIZE", 8192))
+
+# Frequencies that repeat after a fixed duration.
+FIXED_STEPS = {
+    Frequency.DAILY: timedelta(days=1),
+    Frequency.WEEKLY: timedelta(weeks=1),
+    Frequency.BIWEEKLY: timedelta(weeks=2),
+}
+
+# Frequencies that repeat after a number of calendar months.
+MONTH_STEPS = {
+    Frequency.MONTHLY: 1,
+    Frequency.QUARTERLY: 3,
+    Frequency.SEMI_ANNUALLY: 6,
+    Frequency.ANNUALLY: 12,
+}
+
+
+def parse_frequency(value) -> Optional[Frequency]:
+    """
+    Read a stored frequency, returning None for values that are not a `Frequency`.
+    """
+    try:
+        return Frequency(value)
+    except ValueError:
+        return None
+
+
+def align_to(moment: datetime, reference: datetime) -> datetime:
+    """
+    Make `moment` comparable with `reference`: naive values are local time.
+    """
+    if reference.tzinfo is None and moment.tzinfo is not None:
+        return moment.astimezone().replace(tzinfo=None)
+    if reference.tzinfo is not None and moment.tzinfo is None:
+        return moment.astimezone()
+    return moment
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """
+    Move `moment` by whole calendar months, clamping the day to the end of shorter months.
+
+    Example:
+        add_months(datetime(2025, 1, 31), 1)  ➜ datetime(2025, 2, 28)
+    """
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence(anchor: datetime, frequency: Frequency, index: int) -> datetime:
+    """
+    Return the `index`-th occurrence of a schedule starting at `anchor` (the 0th).
+
+    Occurrences are always counted from the anchor, so a monthly schedule anchored on
+    the 31st falls on the 30th in April but back on the 31st in May.
+    """
+    if frequency in FIXED_STEPS:
+        return anchor + FIXED_STEPS[frequency] * index
+    if frequency in MONTH_STEPS:
+        return add_months(anchor, MONTH_STEPS[frequency] * index)
+    if index == 0:
+        return anchor
+    raise ValueError(f"{frequency.value} schedules have a single occurrence")
+
+
+def _first_index(anchor: datetime, frequency: Frequency, moment: datetime, strict: bool) -> int:
+    """
+    Index, possibly negative, of the first occurrence of a repeating schedule that is
+    later than `moment`, or also equal to it unless `strict`.
+    """
+    if frequency in FIXED_STEPS:
+        index = (moment - anchor) // FIXED_STEPS[frequency]
+    else:
+        # Whole steps of months elapsed never overshoot; clamping can only push one step further.
+        index = ((moment.year - anchor.year) * 12 + moment.month - anchor.month) // MONTH_STEPS[frequency]
+    while True:
+        candidate = occurrence(anchor, frequency, index)
+        if candidate > moment or (candidate == moment and not strict):
+            return index
+        index += 1
+
+
+def first_index_after(anchor: datetime, frequency: Frequency, after: datetime) -> Optional[int]:
+    """
+    Index of the first occurrence strictly later than `after`, or None if there is none.
+    """
+    if anchor > after:
+        return 0
+    if frequency in FIXED_STEPS or frequency in MONTH_STEPS:
+        return _first_index(anchor, frequency, after, strict=True)
+    return None
+
+
+def next_occurrence(anchor: datetime, frequency: Frequency, after: datetime) -> Optional[datetime]:
+    """
+    Return the first occurrence of the schedule strictly later than `after`.
+
+    Args:
+        anchor (datetime): The first occurrence of the schedule.
+        frequency (Frequency): How often it repeats. `Specific Date` never repeats.
+        after (datetime): Occurrences up to and including this moment are skipped.
+
+    Returns:
+        Optional[datetime]: The next occurrence, or None when the schedule has ended.
+    """
+    index = first_index_after(anchor, frequency, after)
+    return None if index is None else occurrence(anchor, frequency, index)
+
+
+def iter_occurrences(anchor: datetime, frequency: Frequency, start: datetime, end: datetime) -> Iterator[datetime]:
+    """
+    Lazily yield the occurrences of a schedule falling in `[start, end)`.
+
+    Repeating schedules extend both ways from `anchor`, so a window in the past yields
+    the occurrences that led up to it. The first occurrence in the window is computed
+    directly; only the occurrences inside the window are generated.
+
+    Args:
+        anchor (datetime): Any occurrence of the schedule.
+        frequency (Frequency): How often it repeats.
+        start (datetime): Start of the window, inclusive.
+        end (datetime): End of the window, exclusive.
+    """
+    if frequency not in FIXED_STEPS and frequency not in MONTH_STEPS:
+        if start <= anchor < end:
+            yield anchor
+        return
+    index = _first_index(anchor, frequency, start, strict=False)
+    while (moment := occurrence(anchor, frequency, index)) < end:
+        yield moment
+        index += 1
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+@lru_cache(maxsize=RECURRENCE_CACHE_SIZE)
+def month_occurrences(anchor: datetime, frequency: Frequency, month: datetime) -> tuple[datetime, ...]:
+    """
+    Memoized occurrences of a schedule in the calendar month starting at `month`.
+    """
+    return tuple(iter_occurrences(anchor, frequency, month, add_months(month, 1)))
+
+
+def expand_occurrences(anchor: datetime, frequency: Frequency, start: datetime, end: datetime) -> list[datetime]:
+    """
+    Every occurrence of the schedule in `[start, end)`.
+
+    Windows are split into calendar months, which are memoized by
+    `month_occurrences()` and sliced to the window. Requests with arbitrary bounds
+    share the same cache entries, and repeated calendar requests reuse the
+    expansions until the activity changes.
+    """
+    occurrences = []
+    month = month_start(start)
+    while month < end:
+        bucket = month_occurrences(anchor, frequency, month)
+        first = bisect_left(bucket, start) if month < start else 0
+        occurrences.extend(bucket[first:bisect_left(bucket, end)])
+        month = add_months(month, 1)
+    return occurrences
@@ -0,0 +1,258 @@
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from psycopg import AsyncConnection, sql
+
+from __schemas__ import Frequency
+from core.constants import Tables, ScheduledItemKind, RiskKRIColumns, ActivitiesColumns
+from core.encoders import encode_json
+from core.utils import from_enum
+from schemas.activity_schemas import ActivityStatus
+from services.databases.postgres.connections import db_connection
+from services.databases.redis.connections import RedisSingleton
+from services.databases.redis.versions import track_change
+from services.scheduling.recurrence import next_occurrence, parse_frequency
+
+# Redis channel announcing every dispatched item, for reminder and notification consumers.
+SCHEDULER_CHANNEL = "scheduler:due"
+
+# Items falling due within this many seconds are loaded into memory.
+SCHEDULER_HORIZON = float(os.getenv("SCHEDULER_HORIZON", 120))
+
+# Seconds between range queries picking up new and rescheduled items.
+SCHEDULER_REFILL_INTERVAL = float(os.getenv("SCHEDULER_REFILL_INTERVAL", 30))
+
+# Most items of each kind loaded by one range query.
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", 1000))
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
+
+# Table and key column holding the schedule of each kind of item.
+SCHEDULED_TABLES = {
+    ScheduledItemKind.KRI: (Tables.RISK_KRI, RiskKRIColumns.RISK_KRI_ID),
+    ScheduledItemKind.ACTIVITY: (Tables.ACTIVITIES, ActivitiesColumns.ACTIVITY_ID),
+}
+
+# Loads the items due before a moment, earliest first; served by the next_at index.
+DUE_ITEMS_QUERY = """
+    SELECT {key}, frequency, next_at FROM {table}
+    WHERE next_at < %(until)s AND frequency = ANY(%(frequencies)s)
+    ORDER BY next_at
+    LIMIT %(limit)s
+"""
+
+# Locks an item if it is still due at the moment it was loaded with. Rows locked by
+# another worker are skipped rather than waited for: that worker is dispatching them.
+# Rows written before anchor_at existed fall back to their current next_at.
+CLAIM_ITEM_QUERY = """
+    SELECT frequency, COALESCE(anchor_at, next_at) FROM {table}
+    WHERE {key} = %(item_id)s AND next_at = %(due_at)s
+    FOR UPDATE SKIP LOCKED
+"""
+
+ADVANCE_ITEM_QUERY = "UPDATE {table} SET next_at = %(next_at)s WHERE {key} = %(item_id)s"
+
+# Keeps the earliest outstanding occurrence of an open activity; cleared by a report
+# or completion (see models/activity_models.py).
+MARK_ACTIVITY_DUE_QUERY = """
+    UPDATE activities SET due_since = COALESCE(due_since, %(due_at)s)
+    WHERE activity_id = %(item_id)s AND status <> %(completed)s
+"""
+
+class DueItem:
+    """
+    A KRI or activity whose `next_at` has been reached.
+
+    Args:
+        kind (ScheduledItemKind): What the item is.
+        item_id (str): The `risk_kri_id` or `activity_id`.
+        due_at (datetime): The occurrence being dispatched.
+        frequency (Frequency): How often the item recurs.
+        next_at (Optional[datetime]): The following occurrence, None if there is none.
+    """
+
+    __slots__ = ("kind", "item_id", "due_at", "frequency", "next_at")
+
+    def __init__(
+            self,
+            kind: ScheduledItemKind,
+            item_id: str,
+            due_at: datetime,
+            frequency: Frequency,
+            next_at: Optional[datetime]
+    ):
+        self.kind = kind
+        self.item_id = item_id
+        self.due_at = due_at
+        self.frequency = frequency
+        self.next_at = next_at
+
+
+Handler = Callable[[AsyncConnection, DueItem], Awaitable[None]]
+
+
+def _query(template: str, kind: ScheduledItemKind) -> sql.Composed:
+    table, key = SCHEDULED_TABLES[kind]
+    return sql.SQL(template).format(table=sql.Identifier(from_enum(table)), key=sql.Identifier(from_enum(key)))
+
+
+class DueItemScheduler:
+    """
+    Dispatches KRIs and activities when their `next_at` is reached and advances it.
+
+    Every SCHEDULER_REFILL_INTERVAL seconds an indexed range query loads the items due
+    within SCHEDULER_HORIZON seconds into a min-heap ordered by due time, and the
+    scheduler sleeps until the earliest one. Each due item is claimed in its own
+    transaction: the row is locked only if `next_at` still holds the loaded value,
+    the handlers run, and `next_at` moves to the following occurrence of the item's
+    frequency, counted from its fixed `anchor_at` (or NULL for a specific date). Any number of workers can run the
+    scheduler; a row is dispatched by whichever claims it first, and the others skip
+    it. A failing handler rolls the claim back, so the item is retried.
+    """
+
+    def __init__(
+            self,
+            horizon: float = SCHEDULER_HORIZON,
+            refill_interval: float = SCHEDULER_REFILL_INTERVAL,
+            batch_size: int = SCHEDULER_BATCH_SIZE
+    ):
+        # Items due before the next refill must already be in the heap.
+        self.horizon = max(horizon, refill_interval)
+        self.refill_interval = refill_interval
+        self.batch_size = batch_size
+        self._heap: list[tuple[float, str, str, datetime]] = []
+        self._queued: set[tuple[str, str, datetime]] = set()
+        self._handlers: dict[ScheduledItemKind, list[Handler]] = {kind: [] for kind in SCHEDULED_TABLES}
+
+    def on(self, kind: ScheduledItemKind, handler: Handler):
+        """
+        Register a coroutine run, inside the claiming transaction, for each due item of `kind`.
+        """
+        self._handlers[kind].append(handler)
+        return handler
+
+    def push(self, kind: ScheduledItemKind, item_id: str, due_at: datetime):
+        entry = (from_enum(kind), item_id, due_at)
+        if entry in self._queued:
+            return
+        self._queued.add(entry)
+        # Naive timestamps are local time, as written by datetime.now().
+        heapq.heappush(self._heap, (due_at.timestamp(), *entry))
+
+    async def refill(self, connection: AsyncConnection):
+        # Naive like the datetime.now() values the models write to next_at.
+        params = {
+            "until": datetime.now() + timedelta(seconds=self.horizon),
+            "frequencies": [from_enum(frequency) for frequency in Frequency]
+        }
+        async with connection.cursor() as cursor:
+            for kind in SCHEDULED_TABLES:
+                await cursor.execute(_query(DUE_ITEMS_QUERY, kind), {**params, "limit": self.batch_size})
+                for item_id, _, due_at in await cursor.fetchall():
+                    self.push(kind, item_id, due_at)
+
+    async def claim(self, connection: AsyncConnection, kind: ScheduledItemKind, item_id: str, due_at: datetime):
+        """
+        Dispatch one item and advance its `next_at`, unless another worker got there first.
+
+        Returns:
+            Optional[DueItem]: The dispatched item, or None if it was not claimed.
+        """
+        params = {"item_id": item_id, "due_at": due_at}
+        async with connection.cursor() as cursor:
+            await cursor.execute(_query(CLAIM_ITEM_QUERY, kind), params)
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+
+            frequency = parse_frequency(row[0])
+            if frequency is None:
+                return None
+            # Counted from the fixed anchor rather than due_at, so a day clamped by a short
+            # month is not carried forward. Occurrences missed while no worker was
+            # running collapse into this one.
+            now = datetime.now(due_at.tzinfo)
+            item = DueItem(kind, item_id, due_at, frequency, next_occurrence(row[1], frequency, max(now, due_at)))
+
+            for handler in self._handlers[kind]:
+                await handler(connection, item)
+
+            await cursor.execute(_query(ADVANCE_ITEM_QUERY, kind), {**params, "next_at": item.next_at})
+            track_change(connection, SCHEDULED_TABLES[kind][0])
+            return item
+
+    async def run_due(self):
+        """
+        Dispatch every queued item whose due time has passed.
+        """
+        while self._heap and self._heap[0][0] <= time.time():
+            _, kind, item_id, due_at = heapq.heappop(self._heap)
+            self._queued.discard((kind, item_id, due_at))
+            try:
+                async with db_connection() as connection:
+                    await self.claim(connection, ScheduledItemKind(kind), item_id, due_at)
+            except Exception as e:
+                # Left untouched in the database, so the next refill queues it again.
+                print(e)
+
+    async def run_forever(self):
+        """
+        Refill and dispatch until cancelled.
+        """
+        refilled_at = float("-inf")
+        while True:
+            if time.monotonic() - refilled_at >= self.refill_interval:
+                try:
+                    async with db_connection() as connection:
+                        await self.refill(connection)
+                except Exception as e:
+                    print(e)
+                refilled_at = time.monotonic()
+
+            await self.run_due()
+
+            wait = self.refill_interval - (time.monotonic() - refilled_at)
+            if self._heap:
+                wait = min(wait, self._heap[0][0] - time.time())
+            await asyncio.sleep(max(wait, 0.01))
+
+
+scheduler = DueItemScheduler()
+
+
+async def publish_due_item(_connection: AsyncConnection, item: DueItem):
+    """
+    Announce a dispatched item on SCHEDULER_CHANNEL.
+
+    A Redis error fails the claim, so the item is dispatched again once Redis is back.
+    """
+    redis = await RedisSingleton.get_client()
+    await redis.publish(SCHEDULER_CHANNEL, encode_json({
+        "kind": item.kind,
+        "item_id": item.item_id,
+        "due_at": item.due_at,
+        "frequency": item.frequency,
+        "next_at": item.next_at,
+    }))
+
+
+async def mark_activity_due(connection: AsyncConnection, item: DueItem):
+    """
+    Record a passed occurrence of an open activity in `due_since`, so it stays overdue
+    after `next_at` moves on to the following occurrence.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(MARK_ACTIVITY_DUE_QUERY, {
+            "item_id": item.item_id,
+            "due_at": item.due_at,
+            "completed": from_enum(ActivityStatus.COMPLETED)
+        })
+
+
+for _kind in SCHEDULED_TABLES:
+    scheduler.on(_kind, publish_due_item)
+scheduler.on(ScheduledItemKind.ACTIVITY, mark_activity_due)
@@ -0,0 +1,128 @@
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+
+from schemas.risk_scoring_schemas import NewRiskScoringConfig
+
+# Largest impact or likelihood scale a module can configure.
+MAX_MATRIX_LEVELS = 10
+
+# Band code for missing ratings and scores below the lowest band.
+UNBANDED = -1
+
+
+class ScoringMatrix:
+    """
+    Scores and bands impact x likelihood ratings for one module.
+
+    The score of a rating is read from a likelihood x impact lookup table: either the
+    configured `matrix`, or `likelihood ** likelihood_weight * impact ** impact_weight`
+    (plain impact x likelihood with the default weights of 1). Ratings beyond the
+    matrix use the nearest edge. A score falls in the band with the highest
+    `minimum` not above it.
+
+    Args:
+        impact_levels (int): Number of impact ratings, from 1.
+        likelihood_levels (int): Number of likelihood ratings, from 1.
+        impact_weight (float): Exponent applied to the impact rating.
+        likelihood_weight (float): Exponent applied to the likelihood rating.
+        bands (Sequence[tuple[str, float]]): (name, minimum score) in ascending order.
+        matrix (Optional[Sequence[Sequence[float]]]): Explicit scores, likelihood rows x impact columns.
+
+    Raises:
+        ValueError: If the configuration is inconsistent.
+    """
+
+    def __init__(
+            self,
+            impact_levels: int,
+            likelihood_levels: int,
+            impact_weight: float,
+            likelihood_weight: float,
+            bands: Sequence[tuple[str, float]],
+            matrix: Optional[Sequence[Sequence[float]]] = None
+    ):
+        if not 1 <= impact_levels <= MAX_MATRIX_LEVELS or not 1 <= likelihood_levels <= MAX_MATRIX_LEVELS:
+            raise ValueError(f"Matrix levels must be between 1 and {MAX_MATRIX_LEVELS}")
+        if not impact_weight > 0 or not likelihood_weight > 0:
+            raise ValueError("Weights must be positive")
+        if not bands:
+            raise ValueError("At least one band is required")
+        names = [name for name, _ in bands]
+        minimums = np.asarray([minimum for _, minimum in bands], dtype=np.float64)
+        if len(set(names)) != len(names):
+            raise ValueError("Band names must be unique")
+        if not np.isfinite(minimums).all() or (np.diff(minimums) <= 0).any():
+            raise ValueError("Band minimums must be finite and strictly ascending")
+
+        if matrix is None:
+            likelihoods = np.arange(1, likelihood_levels + 1, dtype=np.float64) ** likelihood_weight
+            impacts = np.arange(1, impact_levels + 1, dtype=np.float64) ** impact_weight
+            table = np.outer(likelihoods, impacts)
+        else:
+            table = np.asarray(matrix, dtype=np.float64)
+            if table.shape != (likelihood_levels, impact_levels):
+                raise ValueError(f"Matrix must have {likelihood_levels} rows of {impact_levels} scores")
+            if not np.isfinite(table).all():
+                raise ValueError("Matrix scores must be finite")
+
+        self.table = table
+        self.minimums = minimums
+        # Indexed by band code; UNBANDED (-1) picks the trailing None.
+        self.names = np.array(names + [None], dtype=object)
+
+    @classmethod
+    def from_config(cls, config: NewRiskScoringConfig) -> "ScoringMatrix":
+        return cls(
+            impact_levels=config.impact_levels,
+            likelihood_levels=config.likelihood_levels,
+            impact_weight=config.impact_weight,
+            likelihood_weight=config.likelihood_weight,
+            bands=[(band.name, band.minimum) for band in config.bands],
+            matrix=config.matrix
+        )
+
+    def score(self, impacts: np.ndarray, likelihoods: np.ndarray) -> np.ndarray:
+        """
+        Score ratings given as float arrays, NaN where a rating is missing.
+
+        Returns:
+            np.ndarray: The scores, NaN where either rating is missing.
+        """
+        missing = np.isnan(impacts) | np.isnan(likelihoods)
+        rows = np.clip(np.where(missing, 1, likelihoods), 1, self.table.shape[0]).astype(np.int64) - 1
+        columns = np.clip(np.where(missing, 1, impacts), 1, self.table.shape[1]).astype(np.int64) - 1
+        scores = self.table[rows, columns]
+        scores[missing] = math.nan
+        return scores
+
+    def band_codes(self, scores: np.ndarray) -> np.ndarray:
+        """
+        Index of the band of each score, `UNBANDED` for NaN and scores below every band.
+        """
+        codes = np.searchsorted(self.minimums, scores, side="right") - 1
+        codes[np.isnan(scores)] = UNBANDED
+        return codes
+
+    def band_names(self, scores: np.ndarray) -> np.ndarray:
+        """
+        Band name of each score, None where it has no band.
+        """
+        return self.names[self.band_codes(scores)]
+
+    def score_ratings(self, ratings: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score and band the inherent and residual ratings of many risks in one pass.
+
+        Args:
+            ratings (np.ndarray): Float array of shape (risks, 4) holding inherent impact,
+                                  inherent likelihood, residual impact and residual
+                                  likelihood, NaN where missing.
+
+        Returns:
+            tuple: Inherent scores, inherent bands, residual scores, residual bands.
+        """
+        inherent = self.score(ratings[:, 0], ratings[:, 1])
+        residual = self.score(ratings[:, 2], ratings[:, 3])
+        return inherent, self.band_names(inherent), residual, self.band_names(residual)
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import time
+from typing import Iterable, Optional
+from weakref import WeakKeyDictionary
+from psycopg import AsyncConnection
+from redis.exceptions import RedisError
+from core.constants import Tables
+from core.utils import from_enum
+from services.databases.postgres.read import ReadBuilder
+from services.databases.redis.connections import RedisSingleton
+
+# Redis channel carrying the IDs of users whose memberships changed.
+AUTHORIZATION_CHANNEL = "authorization:invalidate"
+
+# Message asking every process to drop all cached permissions.
+INVALIDATE_ALL = "*"
+
+# Seconds a permission set is trusted, in case an invalidation message was missed.
+AUTHORIZATION_CACHE_TTL = float(os.getenv("AUTHORIZATION_CACHE_TTL", 300))
+
+AUTHORIZATION_CACHE_SIZE = int(os.getenv("AUTHORIZATION_CACHE_SIZE", 50000))
+
+# Users whose memberships were written on a connection whose transaction has not committed yet.
+_pending: WeakKeyDictionary[AsyncConnection, set[str]] = WeakKeyDictionary()
+
+
+class PermissionSet:
+    """
+    A user's module and organization memberships, compiled for constant-time checks.
+
+    Args:
+        modules (dict[str, tuple[str, str]]): Module ID mapped to the `(role, type)`
+                                              from `risk_module_users`.
+        organizations (Iterable[str]): IDs of the organizations the user belongs to.
+    """
+
+    __slots__ = ("modules", "organizations", "loaded_at")
+
+    def __init__(self, modules: dict[str, tuple[str, str]], organizations: Iterable[str]):
+        self.modules = modules
+        self.organizations = frozenset(organizations)
+        self.loaded_at = time.monotonic()
+
+    def in_module(self, module_id: str) -> bool:
+        return module_id in self.modules
+
+    def in_organization(self, organization_id: str) -> bool:
+        return organization_id in self.organizations
+
+    def role(self, module_id: str) -> Optional[str]:
+        membership = self.modules.get(module_id)
+        return membership[0] if membership else None
+
+    def type(self, module_id: str) -> Optional[str]:
+        membership = self.modules.get(module_id)
+        return membership[1] if membership else None
+
+    def allows(self, module_id: str, roles: Optional[Iterable[str]] = None) -> bool:
+        """
+        Whether the user belongs to the module, with one of `roles` if given.
+        """
+        membership = self.modules.get(module_id)
+        if membership is None:
+            return False
+        return roles is None or membership[0] in roles
+
+
+async def load_permissions(connection: AsyncConnection, user_id: str) -> PermissionSet:
+    modules = await (
+        ReadBuilder(connection=connection)
+        .from_table(from_enum(Tables.RISK_MODULE_USERS))
+        .select_fields("module_id", "role", "type")
+        .where("user_id", user_id)
+        .fetch_all()
+    )
+    organizations = await (
+        ReadBuilder(connection=connection)
+        .from_table(from_enum(Tables.ORGANIZATIONS_USERS))
+        .select_fields("organization_id")
+        .where("user_id", user_id)
+        .fetch_all()
+    )
+    return PermissionSet(
+        modules={row.get("module_id"): (row.get("role"), row.get("type")) for row in modules},
+        organizations=(row.get("organization_id") for row in organizations)
+    )
+
+
+class AuthorizationCache:
+    """
+    In-process cache of users' permission sets.
+
+    Permission sets are loaded from `risk_module_users` and `organizations_users` on
+    first use and kept until the user's memberships change. Writers call
+    `mark_stale()`; once their transaction commits, `publish_invalidations()` drops
+    the local entry and announces the user ID on a Redis channel that every process
+    follows with `listen()`. Entries also expire after AUTHORIZATION_CACHE_TTL
+    seconds, which bounds staleness if a message is lost.
+    """
+
+    def __init__(self, maxsize: int = AUTHORIZATION_CACHE_SIZE, ttl: float = AUTHORIZATION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: dict[str, PermissionSet] = {}
+        # Bumped on every invalidation so a load racing with one is not cached.
+        self._generation = 0
+
+    async def get_permissions(self, connection: AsyncConnection, user_id: str) -> PermissionSet:
+        permissions = self._entries.get(user_id)
+        if permissions is not None and time.monotonic() - permissions.loaded_at < self.ttl:
+            return permissions
+
+        generation = self._generation
+        permissions = await load_permissions(connection, user_id)
+        if generation != self._generation:
+            return permissions
+
+        if len(self._entries) >= self.maxsize:
+            # Drop the oldest entry; dicts keep insertion order.
+            self._entries.pop(next(iter(self._entries)))
+        self._entries.pop(user_id, None)
+        self._entries[user_id] = permissions
+        return permissions
+
+    def invalidate(self, user_id: str):
+        self._generation += 1
+        if user_id == INVALIDATE_ALL:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    async def listen(self):
+        """
+        Follow invalidations published by other processes until cancelled.
+        """
+        while True:
+            try:
+                redis = await RedisSingleton.get_client()
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(AUTHORIZATION_CHANNEL)
+                    # Messages published while we were not subscribed are lost.
+                    self.invalidate(INVALIDATE_ALL)
+                    async for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self.invalidate(message.get("data"))
+            except RedisError as e:
+                print(e)
+                await asyncio.sleep(1)
+
+
+authorization_cache = AuthorizationCache()
+
+
+def mark_stale(connection: AsyncConnection, user_id: str):
+    """
+    Record that a user's memberships were written on `connection`.
+
+    The cached permissions are dropped by `publish_invalidations()` once the
+    transaction has committed, so no process can reload and cache the old rows.
+    """
+    _pending.setdefault(connection, set()).add(user_id)
+
+
+def discard_invalidations(connection: AsyncConnection):
+    _pending.pop(connection, None)
+
+
+async def publish_invalidations(connection: AsyncConnection):
+    """
+    Drop the permissions of users whose memberships were committed on `connection`,
+    in this process and, through Redis, in every other one.
+    """
+    user_ids = _pending.pop(connection, None)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        authorization_cache.invalidate(user_id)
+    try:
+        redis = await RedisSingleton.get_client()
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.publish(AUTHORIZATION_CHANNEL, user_id)
+            await pipe.execute()
+    except RedisError as e:
+        print(e)
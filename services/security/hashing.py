@@ -0,0 +1,249 @@
+import asyncio
+import dataclasses
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+from argon2 import Parameters, Type
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from services.databases.redis.connections import RedisSingleton
+from services.security import security
+
+# Worker processes hashing passwords. Defaults to one per CPU.
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", os.cpu_count() or 1))
+
+# Jobs allowed to wait for a free worker before new ones are rejected with a 503.
+HASHING_QUEUE_LIMIT = int(os.getenv("HASHING_QUEUE_LIMIT", 64))
+
+# When set, Argon2 parameters are calibrated at startup to take about this long per hash.
+HASH_TARGET_MS = os.getenv("HASH_TARGET_MS")
+
+# Seconds calibrated parameters are shared through Redis before a process recalibrates.
+HASH_CALIBRATION_TTL = int(os.getenv("HASH_CALIBRATION_TTL", 7 * 24 * 3600))
+
+# Seconds a rejected client is asked to wait before retrying.
+HASHING_RETRY_AFTER = 1
+
+
+class HashingMetrics:
+    """
+    Counters describing the load on the hashing service.
+
+    All times are in seconds. `queued` and `running` are current values; the rest
+    accumulate over the life of the process.
+    """
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.run_time = 0.0
+
+    def snapshot(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "average_wait_time": self.wait_time / finished if finished else 0.0,
+            "max_wait_time": self.max_wait_time,
+            "average_run_time": self.run_time / finished if finished else 0.0,
+        }
+
+
+class HashingService:
+    """
+    Runs password hashing and verification in a bounded process pool.
+
+    Argon2 and bcrypt take tens to hundreds of milliseconds of CPU per call. Running
+    them in the event loop stalls every other request on the worker, and threads do
+    not help because the GIL is held for much of that time. Jobs are therefore sent
+    to worker processes.
+
+    At most `workers` jobs run at once. Up to `queue_limit` more wait for a worker;
+    beyond that new jobs fail fast with `503 Service Unavailable` and a `Retry-After`
+    header instead of piling up behind a login storm.
+
+    Args:
+        workers (int): Number of worker processes.
+        queue_limit (int): Number of jobs allowed to wait for a worker.
+    """
+
+    def __init__(self, workers: int = HASHING_WORKERS, queue_limit: int = HASHING_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.metrics = HashingMetrics()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.parameters: Optional[Parameters] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Workers are spawned rather than forked so they never inherit the
+            # event loop, open sockets or locks held by other threads.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=security.configure_password_hasher if self.parameters else None,
+                initargs=(self.parameters,) if self.parameters else ()
+            )
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._executor
+
+    async def run(self, function: Callable, *args):
+        """
+        Run a module-level function of `services.security.security` in the pool.
+
+        Args:
+            function (Callable): The function to run; it must be picklable.
+            *args: Its positional arguments.
+
+        Raises:
+            HTTPException: 503 when the queue is full.
+
+        Returns:
+            Any: The function's result.
+        """
+        metrics = self.metrics
+        self._get_executor()
+
+        if metrics.queued >= self.queue_limit:
+            metrics.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": str(HASHING_RETRY_AFTER)}
+            )
+
+        metrics.submitted += 1
+        metrics.queued += 1
+        metrics.max_queued = max(metrics.max_queued, metrics.queued)
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            metrics.queued -= 1
+
+        started_at = time.perf_counter()
+        wait_time = started_at - queued_at
+        metrics.wait_time += wait_time
+        metrics.max_wait_time = max(metrics.max_wait_time, wait_time)
+        metrics.running += 1
+        try:
+            # Looked up after waiting, in case the pool was replaced in the meantime.
+            executor = self._get_executor()
+            result = await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+            metrics.completed += 1
+            return result
+        except BrokenProcessPool:
+            metrics.failed += 1
+            # A worker died (e.g. killed for memory); start a fresh pool for later jobs.
+            self._executor = None
+            raise
+        except BaseException:
+            metrics.failed += 1
+            raise
+        finally:
+            metrics.running -= 1
+            metrics.run_time += time.perf_counter() - started_at
+            self._slots.release()
+
+    async def hash_password(self, password: str) -> str:
+        """
+        Hash a plain-text password with Argon2 in the pool.
+        """
+        return await self.run(security.hash_password, password)
+
+    async def generate_hash_password(self, password: str) -> str:
+        """
+        Hash a plain-text password with bcrypt in the pool.
+        """
+        return await self.run(security.generate_hash_password, password)
+
+    async def verify_password(self, hashed_password: str, plain_password: str) -> bool:
+        """
+        Verify a plain-text password against its hash in the pool.
+        """
+        return await self.run(security.verify_password, hashed_password, plain_password)
+
+    def configure(self, parameters: Parameters):
+        """
+        Use new Argon2 parameters for every hash made from now on.
+
+        The parameters are applied in this process and passed to each worker as it
+        starts; running workers finish their jobs and are replaced.
+        """
+        self.parameters = parameters
+        security.configure_password_hasher(parameters)
+        self.shutdown()
+
+    async def calibrate(self, target_seconds: float) -> Parameters:
+        """
+        Configure Argon2 parameters meeting `target_seconds` per hash, shared by every
+        process of the deployment.
+
+        The first process to start measures hashing speed in a worker process (see
+        `security.calibrate_password_hasher()`) and publishes the result in Redis; the
+        others adopt it, so every process hashes with the same parameters. When two
+        calibrate at once, the first result stored wins. Without Redis the process
+        calibrates on its own.
+
+        Args:
+            target_seconds (float): Desired time per hash.
+
+        Returns:
+            Parameters: The parameters now in use.
+        """
+        key = f"hashing:argon2:{round(target_seconds * 1000)}"
+        try:
+            redis = await RedisSingleton.get_client()
+            stored = await redis.get(key)
+        except RedisError as e:
+            print(e)
+            redis, stored = None, None
+
+        if stored is None:
+            parameters = await self.run(security.calibrate_password_hasher, target_seconds)
+            if redis is not None:
+                try:
+                    if not await redis.set(key, _dump_parameters(parameters), ex=HASH_CALIBRATION_TTL, nx=True):
+                        stored = await redis.get(key)
+                except RedisError as e:
+                    print(e)
+        if stored is not None:
+            parameters = _load_parameters(stored)
+
+        self.configure(parameters)
+        return parameters
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _dump_parameters(parameters: Parameters) -> str:
+    return json.dumps({**dataclasses.asdict(parameters), "type": parameters.type.value})
+
+
+def _load_parameters(stored) -> Parameters:
+    data = json.loads(stored)
+    return Parameters(**{**data, "type": Type(data["type"])})
+
+
+hashing_service = HashingService()
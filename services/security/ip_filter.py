@@ -0,0 +1,256 @@
+import asyncio
+import ipaddress
+import os
+from typing import Iterable, Optional
+from redis.exceptions import RedisError
+from core.constants import IPFilterAction
+from services.databases.redis.connections import RedisSingleton
+
+# Rules file, reloaded whenever its modification time changes.
+IP_FILTER_FILE = os.getenv("IP_FILTER_FILE")
+
+# Redis key holding the rules text. `<key>:version` is bumped after every change to it.
+IP_FILTER_REDIS_KEY = os.getenv("IP_FILTER_REDIS_KEY", "ip_filter:rules")
+
+# Seconds between checks of the rule sources for changes.
+IP_FILTER_RELOAD_INTERVAL = float(os.getenv("IP_FILTER_RELOAD_INTERVAL", 5))
+
+
+class IPTrie:
+    """
+    Binary radix trie mapping IP prefixes to an action, for one address family.
+
+    Each node is a list `[zero_child, one_child, action]`. A lookup walks the address
+    bit by bit and keeps the action of the deepest prefix it passes, so it costs at
+    most one step per bit of the longest stored prefix (32 for IPv4, 128 for IPv6),
+    however many prefixes are stored.
+
+    Args:
+        bits (int): Address length in bits, 32 or 128.
+    """
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.root: list = [None, None, None]
+        self.size = 0
+
+    def insert(self, network: int, prefix_length: int, action: IPFilterAction):
+        node = self.root
+        shift = self.bits - 1
+        for _ in range(prefix_length):
+            bit = (network >> shift) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+            shift -= 1
+        if node[2] is None:
+            self.size += 1
+        node[2] = action
+
+    def longest_match(self, address: int) -> Optional[IPFilterAction]:
+        node = self.root
+        action = node[2]
+        shift = self.bits - 1
+        while shift >= 0:
+            node = node[(address >> shift) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                action = node[2]
+            shift -= 1
+        return action
+
+
+class IPRuleSet:
+    """
+    Immutable set of allow and deny rules for IPv4 and IPv6 addresses and ranges.
+
+    The most specific matching rule wins, so `allow 10.1.0.0/16` punches a hole in
+    `deny 10.0.0.0/8`. Addresses matching no rule get `default`.
+
+    Args:
+        rules (Iterable[tuple[IPFilterAction, str]]): Actions with an address or CIDR range.
+        default (IPFilterAction): Action for addresses matching no rule.
+    """
+
+    def __init__(
+            self,
+            rules: Iterable[tuple[IPFilterAction, str]] = (),
+            default: IPFilterAction = IPFilterAction.ALLOW
+    ):
+        self.default = default
+        self.tries = {4: IPTrie(32), 6: IPTrie(128)}
+        for action, cidr in rules:
+            self._add(action, cidr)
+
+    def __len__(self):
+        return self.tries[4].size + self.tries[6].size
+
+    def _add(self, action: IPFilterAction, cidr: str):
+        network = ipaddress.ip_network(cidr, strict=False)
+        self.tries[network.version].insert(int(network.network_address), network.prefixlen, action)
+
+    @classmethod
+    def parse(cls, *texts: str) -> "IPRuleSet":
+        """
+        Build a rule set from one or more rules documents.
+
+        Each non-empty line holds one rule; `#` starts a comment:
+
+            default allow
+            deny 203.0.113.0/24
+            allow 203.0.113.7
+            2001:db8::/32
+
+        A line with only an address or range is a deny rule. Invalid lines are
+        reported and skipped.
+
+        Args:
+            *texts (str): Rules documents, applied in order.
+
+        Returns:
+            IPRuleSet: The parsed rule set.
+        """
+        actions = {action.value for action in IPFilterAction}
+        rule_set = cls()
+        for text in texts:
+            for line in text.splitlines():
+                parts = line.split("#", 1)[0].split()
+                if not parts:
+                    continue
+
+                keyword = parts[0].lower()
+                if len(parts) == 2 and keyword == "default" and parts[1].lower() in actions:
+                    rule_set.default = IPFilterAction(parts[1].lower())
+                    continue
+                if len(parts) == 1:
+                    action, cidr = IPFilterAction.DENY, parts[0]
+                elif len(parts) == 2 and keyword in actions:
+                    action, cidr = IPFilterAction(keyword), parts[1]
+                else:
+                    print(f"ip filter: skipping invalid rule: {line.strip()}")
+                    continue
+
+                try:
+                    rule_set._add(action, cidr)
+                except ValueError as e:
+                    print(f"ip filter: skipping invalid rule: {e}")
+        return rule_set
+
+    def action(self, host: str) -> IPFilterAction:
+        """
+        Return the action for a client address, or `default` if it cannot be parsed.
+        """
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return self.default
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        return self.tries[address.version].longest_match(int(address)) or self.default
+
+
+class IPFilter:
+    """
+    Hot-reloadable IP filter.
+
+    Rules are read from the file named by IP_FILTER_FILE and from the Redis key
+    IP_FILTER_REDIS_KEY (file rules first, so Redis rules of the same prefix win).
+    When neither provides rules every address is allowed.
+
+    A reload parses the sources into a new `IPRuleSet` and replaces the current one
+    with a single assignment, so requests always see either the old or the new rules
+    and the request path never takes a lock. If a source cannot be read the previous
+    rules are kept.
+
+    To change the Redis rules, write the whole document and then bump the version:
+
+        SET ip_filter:rules "deny 198.51.100.0/24"
+        INCR ip_filter:rules:version
+
+    Args:
+        path (Optional[str]): Rules file path.
+        redis_key (Optional[str]): Redis key holding the rules document.
+    """
+
+    def __init__(self, path: Optional[str] = IP_FILTER_FILE, redis_key: Optional[str] = IP_FILTER_REDIS_KEY):
+        self.path = path
+        self.redis_key = redis_key
+        self.rules = self.builtin_rules()
+        self._file_state: Optional[tuple[float, str]] = None
+        self._redis_state: Optional[tuple[Optional[str], str]] = None
+
+    @staticmethod
+    def builtin_rules() -> IPRuleSet:
+        return IPRuleSet()
+
+    def is_allowed(self, host: Optional[str]) -> bool:
+        if host is None:
+            return self.rules.default is IPFilterAction.ALLOW
+        return self.rules.action(host) is IPFilterAction.ALLOW
+
+    def _read_file(self) -> Optional[tuple[float, str]]:
+        """
+        The file's (mtime, text), re-read only when its mtime changed.
+        """
+        if not self.path:
+            return None
+        mtime = os.stat(self.path).st_mtime
+        if self._file_state is not None and self._file_state[0] == mtime:
+            return self._file_state
+        with open(self.path, encoding="utf-8") as file:
+            return mtime, file.read()
+
+    async def _read_redis(self) -> Optional[tuple[Optional[str], str]]:
+        """
+        The Redis document's (version, text), re-read only when its version changed.
+        """
+        if not self.redis_key:
+            return None
+        redis = await RedisSingleton.get_client()
+        version = await redis.get(f"{self.redis_key}:version")
+        if self._redis_state is not None and self._redis_state[0] == version:
+            return self._redis_state
+        return version, await redis.get(self.redis_key) or ""
+
+    async def reload(self) -> bool:
+        """
+        Re-read the rule sources and swap in the new rules if they changed.
+
+        Both sources are read before anything is recorded, so a failed read leaves
+        the previous state in place and the next reload retries the whole change.
+
+        Returns:
+            bool: True if new rules were installed.
+        """
+        try:
+            file_state = await asyncio.to_thread(self._read_file)
+            redis_state = await self._read_redis()
+        except (OSError, RedisError) as e:
+            print(f"ip filter: keeping current rules, {e}")
+            return False
+
+        if (file_state, redis_state) == (self._file_state, self._redis_state):
+            return False
+
+        file_rules = file_state[1] if file_state is not None else None
+        redis_rules = (redis_state[1] or None) if redis_state is not None else None
+        texts = [text for text in (file_rules, redis_rules) if text is not None]
+        if texts:
+            self.rules = await asyncio.to_thread(IPRuleSet.parse, *texts)
+        else:
+            self.rules = self.builtin_rules()
+        self._file_state, self._redis_state = file_state, redis_state
+        print(f"ip filter: loaded {len(self.rules)} rules")
+        return True
+
+    async def watch(self, interval: float = IP_FILTER_RELOAD_INTERVAL):
+        """
+        Reload the rules every `interval` seconds until cancelled.
+        """
+        while True:
+            await self.reload()
+            await asyncio.sleep(interval)
+
+
+ip_filter = IPFilter()
@@ -0,0 +1,253 @@
+import asyncio
+import math
+import os
+import time
+from typing import Optional
+from fastapi import Request, HTTPException
+from redis.exceptions import RedisError
+from services.databases.redis.connections import RedisSingleton
+from services.security.tokens import verify_token
+
+RATE_LIMIT_KEY_PREFIX = "ratelimit"
+
+# Seconds between reconciliations of the local buckets with Redis.
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", 1))
+
+# Set to "false" to disable rate limiting, e.g. for load tests.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second up to `capacity`.
+
+    `cluster_remaining` caps the tokens with the requests the whole cluster has left
+    in the current Redis window, as of the last reconciliation, until `cluster_reset_at`.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated_at", "unsynced", "cluster_remaining", "cluster_reset_at")
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.unsynced = 0
+        self.cluster_remaining: Optional[int] = None
+        self.cluster_reset_at = 0.0
+
+    def take(self) -> float:
+        """
+        Take one token.
+
+        Returns:
+            float: 0 if a token was taken, else the seconds until one is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.cluster_remaining is not None:
+            wall_time = time.time()
+            if wall_time >= self.cluster_reset_at:
+                self.cluster_remaining = None
+            elif self.cluster_remaining < 1:
+                return self.cluster_reset_at - wall_time
+
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+
+        self.tokens -= 1
+        self.unsynced += 1
+        if self.cluster_remaining is not None:
+            self.cluster_remaining -= 1
+        return 0.0
+
+
+class RateLimit:
+    """
+    Limit of `requests` per `per_seconds`, with bursts of up to `burst` requests.
+
+    Args:
+        name (str): Identifies the limit in Redis keys and the RATE_LIMIT_<NAME>
+                    environment override, whose value is `requests/per_seconds`,
+                    e.g. RATE_LIMIT_ACTIVITIES=120/60.
+        requests (int): Requests allowed per period.
+        per_seconds (float): Length of the period.
+        burst (Optional[int]): Bucket size; defaults to `requests`.
+    """
+
+    def __init__(self, name: str, requests: int, per_seconds: float, burst: Optional[int] = None):
+        override = os.getenv(f"RATE_LIMIT_{name.upper()}")
+        if override:
+            requests_text, _, seconds_text = override.partition("/")
+            requests = int(requests_text)
+            per_seconds = float(seconds_text or per_seconds)
+        self.name = name
+        self.requests = requests
+        self.per_seconds = per_seconds
+        self.burst = burst or requests
+        self.rate = requests / per_seconds
+
+
+class RateLimiter:
+    """
+    Cluster-wide rate limiter with an in-process fast path.
+
+    Every request is decided by a local token bucket, without touching Redis. A
+    background task (`sync_forever()`) periodically adds each bucket's consumption to
+    a per-window counter in Redis and reads back the cluster-wide total, which caps
+    the local bucket for the rest of the window. Between reconciliations every
+    process may spend its local tokens, so the cluster can overshoot a limit by at
+    most one sync interval's worth of requests per process.
+
+    If Redis is unreachable the local buckets keep enforcing the limits per process.
+    """
+
+    def __init__(self):
+        self.buckets: dict[tuple[str, str], tuple[RateLimit, TokenBucket]] = {}
+        self.limited = 0
+
+    def check(self, limit: RateLimit, key: str) -> float:
+        """
+        Spend one request of `limit` for `key`.
+
+        Returns:
+            float: 0 if the request is allowed, else seconds to wait before retrying.
+        """
+        entry = self.buckets.get((limit.name, key))
+        if entry is None:
+            entry = (limit, TokenBucket(limit.burst, limit.rate))
+            self.buckets[(limit.name, key)] = entry
+        retry_after = entry[1].take()
+        if retry_after:
+            self.limited += 1
+        return retry_after
+
+    async def sync(self):
+        """
+        Reconcile the local buckets with the cluster-wide counters in Redis.
+        """
+        now = time.time()
+        idle_since = time.monotonic()
+        dirty = []
+        for bucket_key, (limit, bucket) in list(self.buckets.items()):
+            if bucket.unsynced or (bucket.cluster_remaining is not None and now < bucket.cluster_reset_at):
+                # Buckets capped by the cluster are refreshed even when idle locally.
+                dirty.append((bucket_key, limit, bucket, bucket.unsynced))
+                bucket.unsynced = 0
+            elif idle_since - bucket.updated_at > limit.per_seconds:
+                # Nothing spent for a whole period: the bucket is full again.
+                del self.buckets[bucket_key]
+        if not dirty:
+            return
+
+        try:
+            redis = await RedisSingleton.get_client()
+            async with redis.pipeline(transaction=False) as pipe:
+                for (name, key), limit, _, spent in dirty:
+                    window = int(now // limit.per_seconds)
+                    redis_key = f"{RATE_LIMIT_KEY_PREFIX}:{name}:{key}:{window}"
+                    pipe.incrby(redis_key, spent)
+                    pipe.expire(redis_key, math.ceil(limit.per_seconds) + 1)
+                results = await pipe.execute()
+        except RedisError as e:
+            for _, _, bucket, spent in dirty:
+                bucket.unsynced += spent
+            print(e)
+            return
+
+        for index, (_, limit, bucket, _) in enumerate(dirty):
+            total = results[index * 2]
+            bucket.cluster_remaining = max(0, limit.requests - total - bucket.unsynced)
+            bucket.cluster_reset_at = (int(now // limit.per_seconds) + 1) * limit.per_seconds
+
+    async def sync_forever(self, interval: float = RATE_LIMIT_SYNC_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(e)
+
+
+rate_limiter = RateLimiter()
+
+
+def _client_key(request: Request, by: tuple[str, ...]) -> str:
+    parts = []
+    for part in by:
+        if part == "user":
+            user_id = _user_id(request)
+            parts.append(f"user={user_id}" if user_id else f"ip={_client_ip(request)}")
+        elif part == "ip":
+            parts.append(f"ip={_client_ip(request)}")
+        else:
+            parts.append(str(request.path_params.get(part, "")))
+    return ":".join(parts)
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _user_id(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return verify_token(token).user_id
+    except Exception:
+        return None
+
+
+def rate_limit(
+        name: str,
+        requests: int,
+        per_seconds: float,
+        burst: Optional[int] = None,
+        by: tuple[str, ...] = ("user",)
+):
+    """
+    Dependency factory limiting how often a client may call a route.
+
+    Clients are identified by the parts listed in `by`: "user" (the bearer token's
+    user, falling back to the client IP), "ip", or the name of a path parameter such
+    as "module_id". Rejected requests get `429 Too Many Requests` with a
+    `Retry-After` header. Declare the dependency before the connection dependency so
+    rejected requests never check out a database connection.
+
+    Args:
+        name (str): Name of the limit, see `RateLimit`.
+        requests (int): Requests allowed per period.
+        per_seconds (float): Length of the period in seconds.
+        burst (Optional[int]): Requests allowed in a burst; defaults to `requests`.
+        by (tuple[str, ...]): What identifies a client.
+
+    Returns:
+        Callable: The dependency.
+
+    Example:
+        @router.get("/{module_id}")
+        async def fetch_current_rmp_activities(
+                module_id: str,
+                _limit = Depends(rate_limit("activities", 120, 60, by=("user", "module_id"))),
+                connection = Depends(AsyncDBPoolSingleton.get_db_connection),
+        ):
+            ...
+    """
+    limit = RateLimit(name, requests, per_seconds, burst)
+
+    async def dependency(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+        retry_after = rate_limiter.check(limit, _client_key(request, by))
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    return dependency
@@ -1,26 +1,96 @@
 import os
+import statistics
+import time
 import jwt
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
+from argon2 import PasswordHasher, Parameters
+from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHashError
+from argon2.low_level import ARGON2_VERSION
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
 import bcrypt
 
-from __schemas__ import CurrentUser
+from services.security.tokens import verify_token
 
 load_dotenv()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Lowest Argon2 memory cost calibration may fall back to (OWASP minimum, in KiB).
+MIN_MEMORY_COST = 19456
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
 
 password_hasher = PasswordHasher(
-    time_cost=2,        # Number of iterations
-    memory_cost=102400, # RAM usage in KiB (e.g., 100MB)
-    parallelism=8,      # Threads
+    time_cost=int(os.getenv("PASSWORD_TIME_COST", 2)),          # Number of iterations
+    memory_cost=int(os.getenv("PASSWORD_MEMORY_COST", 102400)),  # RAM usage in KiB (e.g., 100MB)
+    parallelism=int(os.getenv("PASSWORD_PARALLELISM", 8)),      # Threads
     hash_len=32,        # Length of the hash
     salt_len=16         # Salt length
 )
 
+def configure_password_hasher(parameters: Parameters):
+    """
+    Replace the Argon2 parameters used for new hashes in this process.
+
+    Existing hashes keep verifying because Argon2 stores its parameters in the hash.
+    """
+    global password_hasher
+    password_hasher = PasswordHasher.from_parameters(parameters)
+
+def calibrate_password_hasher(
+        target_seconds: float,
+        memory_cost: int = password_hasher.memory_cost,
+        parallelism: int = password_hasher.parallelism,
+        samples: int = 3
+) -> Parameters:
+    """
+    Pick Argon2 parameters whose hashing time on this machine is close to a target.
+
+    The memory cost is halved (down to `MIN_MEMORY_COST`) while a single iteration
+    is already slower than the target; the number of iterations is then scaled
+    linearly to fill the remaining budget and checked against the target.
+
+    Args:
+        target_seconds (float): Desired time per hash, e.g. 0.25.
+        memory_cost (int): Starting memory cost in KiB.
+        parallelism (int): Number of lanes.
+        samples (int): Hashes timed per measurement; the median is used.
+
+    Returns:
+        Parameters: The chosen parameters, usable with `configure_password_hasher()`.
+    """
+    def measure(time_cost: int, memory: int) -> float:
+        hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory, parallelism=parallelism)
+        durations = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            hasher.hash("calibration password")
+            durations.append(time.perf_counter() - started)
+        return statistics.median(durations)
+
+    single = measure(1, memory_cost)
+    while single > target_seconds and memory_cost // 2 >= MIN_MEMORY_COST:
+        memory_cost //= 2
+        single = measure(1, memory_cost)
+
+    time_cost = max(1, int(target_seconds / single))
+    while time_cost > 1 and measure(time_cost, memory_cost) > target_seconds * 1.25:
+        time_cost -= 1
+
+    return Parameters(
+        type=password_hasher.type,
+        version=ARGON2_VERSION,
+        salt_len=16,
+        hash_len=32,
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism
+    )
+
+def is_bcrypt_hash(hashed_password: str) -> bool:
+    return hashed_password.startswith(("$2a$", "$2b$", "$2y$"))
+
 def hash_password(password: str) -> str:
     """
     Hashes a plain-text password using Argon2.
@@ -28,30 +98,35 @@ def hash_password(password: str) -> str:
     return password_hasher.hash(password)
 
 def generate_hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode(), salt).decode()
     return hashed
 
 def verify_password(hashed_password: str, plain_password: str) -> bool:
     """
     Verifies a plain-text password against its hashed version.
+    Both Argon2 and bcrypt hashes are accepted.
     Returns True if matched, False otherwise.
     """
     try:
+        if is_bcrypt_hash(hashed_password):
+            return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
         return password_hasher.verify(hashed_password, plain_password)
-    except VerifyMismatchError:
+    except (VerifyMismatchError, VerificationError, InvalidHashError, ValueError):
         return False
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Dependency function to extract and validate the current user from a JWT token.
 
     This function is used in FastAPI routes to authorize users based on a JWT token
     provided in the Authorization header (using the OAuth2 Bearer token scheme).
 
-    It decodes the token using the secret key and returns a CurrentUser object if
-    the token is valid. If the token is missing, expired, invalid, or if the
-    secret key is not configured, it raises appropriate HTTP exceptions.
+    The token is checked against the signing keys loaded at startup (see
+    `services.security.tokens`). Verified tokens are remembered until they expire, so
+    repeat requests with the same token skip decoding and signature checks. If the
+    token is missing, expired, invalid, or if no signing key is configured, it raises
+    appropriate HTTP exceptions.
 
     Args:
         token (str): The JWT token provided via FastAPI's OAuth2PasswordBearer dependency.
@@ -61,17 +136,13 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 
     Raises:
         HTTPException: If the token is missing, expired, or invalid.
-        RuntimeError: If the SECRET_KEY is not set in environment variables.
+        RuntimeError: If neither SECRET_KEY nor SECRET_KEYS is set in environment variables.
     """
     if not token:
         raise HTTPException(status_code=401, detail="auth token not provided")
     try:
-        secret_key = os.getenv("SECRET_KEY")
-        if not secret_key:
-            raise RuntimeError("SECRET_KEY not set in environment")
-        decoded_token = jwt.decode(token, key=secret_key, algorithms=["HS256"])
-        return CurrentUser(**decoded_token)
+        return verify_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="auth token expired")
     except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="auth token is invalid")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="auth token is invalid")
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+import jwt
+from dotenv import load_dotenv
+
+from __schemas__ import CurrentUser
+
+load_dotenv()
+
+# Verified tokens kept in memory per process.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+
+# Longest time a token without an `exp` claim is trusted without re-verification.
+TOKEN_CACHE_MAX_TTL = int(os.getenv("TOKEN_CACHE_MAX_TTL", 300))
+
+TOKEN_ALGORITHMS = ["HS256"]
+
+# Key ID given to a key configured through the single SECRET_KEY variable.
+DEFAULT_KEY_ID = "default"
+
+
+class SigningKeys:
+    """
+    The set of keys accepted for verifying access tokens, by key ID.
+
+    Keys are read from the environment once, at startup:
+
+    - SECRET_KEYS: comma separated `kid:secret` pairs, e.g. `2025-06:abc,2025-07:def`.
+      Tokens carrying a `kid` header are verified with that key only.
+    - SECRET_KEY: a single key, used under the key ID `default`.
+
+    To rotate, add the new key, start issuing tokens with its `kid`, and remove the
+    old key once the tokens signed with it have expired.
+    """
+
+    def __init__(self, keys: dict[str, str]):
+        self.keys = keys
+
+    @classmethod
+    def from_env(cls) -> "SigningKeys":
+        keys = {}
+        for item in os.getenv("SECRET_KEYS", "").split(","):
+            key_id, _, secret = item.strip().partition(":")
+            if key_id and secret:
+                keys[key_id] = secret
+        secret_key = os.getenv("SECRET_KEY")
+        if secret_key:
+            keys.setdefault(DEFAULT_KEY_ID, secret_key)
+        return cls(keys)
+
+    def candidates(self, token: str) -> list[tuple[str, str]]:
+        """
+        Return the `(kid, secret)` pairs that may have signed a token.
+
+        Raises:
+            jwt.InvalidTokenError: If the header is malformed or names an unknown key.
+        """
+        key_id = jwt.get_unverified_header(token).get("kid")
+        if key_id is None:
+            return list(self.keys.items())
+        if key_id not in self.keys:
+            raise jwt.InvalidTokenError(f"unknown key id {key_id}")
+        return [(key_id, self.keys[key_id])]
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified access tokens.
+
+    Entries are keyed by a digest of the token, so raw tokens are never kept, and hold
+    the decoded `CurrentUser`, the key ID that verified it and the time the entry stops
+    being valid: the token's `exp`, or `TOKEN_CACHE_MAX_TTL` from now if it has none.
+    Entries whose key has been rotated out are dropped on their next use.
+
+    Args:
+        maxsize (int): Maximum number of cached tokens.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[float, str, CurrentUser]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=20).digest()
+
+    def get(self, token_digest: bytes, keys: SigningKeys) -> Optional[CurrentUser]:
+        entry = self._entries.get(token_digest)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, key_id, user = entry
+        if time.time() >= expires_at or key_id not in keys.keys:
+            del self._entries[token_digest]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(token_digest)
+        self.hits += 1
+        return user
+
+    def put(self, token_digest: bytes, expires_at: float, key_id: str, user: CurrentUser):
+        self._entries[token_digest] = (expires_at, key_id, user)
+        self._entries.move_to_end(token_digest)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+_signing_keys: Optional[SigningKeys] = None
+token_cache = VerifiedTokenCache()
+
+
+def load_signing_keys() -> SigningKeys:
+    """
+    (Re)load the signing keys from the environment and drop cached verifications.
+    """
+    global _signing_keys
+    _signing_keys = SigningKeys.from_env()
+    token_cache.clear()
+    return _signing_keys
+
+
+def get_signing_keys() -> SigningKeys:
+    return _signing_keys or load_signing_keys()
+
+
+def verify_token(token: str) -> CurrentUser:
+    """
+    Verify an access token and return its user, using the verified-token cache.
+
+    Args:
+        token (str): The encoded JWT.
+
+    Raises:
+        RuntimeError: If no signing key is configured.
+        jwt.ExpiredSignatureError: If the token has expired.
+        jwt.InvalidTokenError: If the token is malformed or its signature is invalid.
+
+    Returns:
+        CurrentUser: The decoded user. The instance is shared between requests
+                     carrying the same token and must not be modified.
+    """
+    keys = get_signing_keys()
+    token_digest = VerifiedTokenCache.digest(token)
+    user = token_cache.get(token_digest, keys)
+    if user is not None:
+        return user
+
+    if not keys.keys:
+        raise RuntimeError("SECRET_KEY not set in environment")
+
+    error: jwt.InvalidTokenError = jwt.InvalidSignatureError("Signature verification failed")
+    for key_id, secret in keys.candidates(token):
+        try:
+            claims = jwt.decode(token, key=secret, algorithms=TOKEN_ALGORITHMS)
+        except jwt.InvalidSignatureError as e:
+            error = e
+            continue
+
+        user = CurrentUser(**claims)
+        expires_at = claims.get("exp", time.time() + TOKEN_CACHE_MAX_TTL)
+        token_cache.put(token_digest, float(expires_at), key_id, user)
+        return user
+
+    raise error
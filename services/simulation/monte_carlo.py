@@ -0,0 +1,218 @@
+import math
+import os
+from statistics import NormalDist
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Annual probability of a risk occurring for likelihood ratings 1, 2, 3, ...
+SIMULATION_LIKELIHOOD_PROBABILITIES = os.getenv("SIMULATION_LIKELIHOOD_PROBABILITIES", "0.05,0.15,0.35,0.6,0.85")
+
+# Median loss of one occurrence for impact ratings 1, 2, 3, ...
+SIMULATION_IMPACT_MEDIANS = os.getenv("SIMULATION_IMPACT_MEDIANS", "10000,50000,250000,1000000,5000000")
+
+# Shape of the lognormal severity; larger values mean heavier tails.
+SIMULATION_SEVERITY_SIGMA = float(os.getenv("SIMULATION_SEVERITY_SIGMA", 1.0))
+
+SIMULATION_TRIALS = int(os.getenv("SIMULATION_TRIALS", 100_000))
+
+MAX_SIMULATION_TRIALS = int(os.getenv("MAX_SIMULATION_TRIALS", 1_000_000))
+
+# Occurrences, and trials x cells, simulated per chunk; bounds the memory of a run.
+SIMULATION_CHUNK_CELLS = int(os.getenv("SIMULATION_CHUNK_CELLS", 2_000_000))
+
+# Fixed seed, so a register's results only change when its ratings do.
+SIMULATION_SEED = int(os.getenv("SIMULATION_SEED", 20240601))
+
+PERCENTILES = (50.0, 75.0, 90.0, 95.0, 99.0, 99.5, 99.9)
+
+
+def _floats(text: str) -> tuple[float, ...]:
+    return tuple(float(value) for value in text.split(",") if value.strip())
+
+
+class SimulationConfig:
+    """
+    Maps ordinal ratings to loss distributions.
+
+    A risk occurs at most once per trial, with a probability set by its likelihood
+    rating, and an occurrence costs a lognormal loss whose median is set by its
+    impact rating. Ratings beyond the configured scales use the nearest end.
+
+    Args:
+        probabilities (Sequence[float]): Occurrence probability per likelihood rating, from 1.
+        medians (Sequence[float]): Median loss per impact rating, from 1.
+        sigma (float): Lognormal shape shared by every severity.
+    """
+
+    def __init__(self, probabilities: Sequence[float], medians: Sequence[float], sigma: float):
+        if not probabilities or not medians:
+            raise ValueError("Probability and severity scales cannot be empty")
+        if any(not 0.0 <= probability <= 1.0 for probability in probabilities):
+            raise ValueError("Probabilities must be between 0 and 1")
+        if any(median <= 0 for median in medians) or sigma < 0:
+            raise ValueError("Medians must be positive and sigma non-negative")
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.mus = np.log(np.asarray(medians, dtype=np.float64))
+        self.sigma = sigma
+
+    @classmethod
+    def from_env(cls) -> "SimulationConfig":
+        return cls(
+            _floats(SIMULATION_LIKELIHOOD_PROBABILITIES),
+            _floats(SIMULATION_IMPACT_MEDIANS),
+            SIMULATION_SEVERITY_SIGMA
+        )
+
+    @staticmethod
+    def _index(ratings: np.ndarray, size: int) -> np.ndarray:
+        return np.clip(np.asarray(ratings, dtype=np.int64) - 1, 0, size - 1)
+
+    def probability(self, likelihoods: np.ndarray) -> np.ndarray:
+        return self.probabilities[self._index(likelihoods, len(self.probabilities))]
+
+    def mu(self, impacts: np.ndarray) -> np.ndarray:
+        return self.mus[self._index(impacts, len(self.mus))]
+
+    def expected_loss(self, likelihoods: np.ndarray, impacts: np.ndarray) -> np.ndarray:
+        """
+        Exact mean annual loss of each risk: probability times the lognormal mean.
+        """
+        return self.probability(likelihoods) * np.exp(self.mu(impacts) + self.sigma ** 2 / 2)
+
+
+def normal_cdf(x: np.ndarray) -> np.ndarray:
+    """
+    Standard normal CDF, vectorized (Abramowitz & Stegun 7.1.26, error below 1.5e-7).
+    """
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    tail = 0.5 * poly * np.exp(-z * z)
+    return np.where(x >= 0, 1.0 - tail, tail)
+
+
+def simulate_losses(
+        config: SimulationConfig,
+        likelihoods: np.ndarray,
+        impacts: np.ndarray,
+        groups: Optional[np.ndarray] = None,
+        correlation: float = 0.0,
+        trials: int = SIMULATION_TRIALS,
+        seed: int = SIMULATION_SEED,
+        chunk_cells: int = SIMULATION_CHUNK_CELLS
+) -> np.ndarray:
+    """
+    Simulate the total annual loss of a set of risks over many trials.
+
+    Risks sharing a group, likelihood and impact are interchangeable, so they are
+    pooled into cells and each trial draws how many risks of each cell occur from a
+    binomial distribution. Severities are then drawn only for the occurrences, and
+    summed per trial. The cost grows with the number of occurrences rather than with
+    trials x risks.
+
+    With a positive `correlation`, the risks of a group (e.g. a category) share a
+    Gaussian copula factor S: a risk occurs when `sqrt(c) * S + sqrt(1 - c) * own`
+    falls below the normal quantile of its probability. Given S, risks occur
+    independently with probability `Phi((quantile - sqrt(c) * S) / sqrt(1 - c))`, so
+    the binomial draws simply use that conditional probability. Each risk keeps its
+    own probability, but risks of one group tend to occur in the same trials.
+
+    Args:
+        config (SimulationConfig): Rating scales.
+        likelihoods (np.ndarray): Likelihood rating of each risk.
+        impacts (np.ndarray): Impact rating of each risk.
+        groups (Optional[np.ndarray]): Group code (0..k-1) of each risk, for correlation.
+        correlation (float): Correlation of the occurrence factor within a group, 0 to <1.
+        trials (int): Number of trials.
+        seed (int): Random seed.
+        chunk_cells (int): Most occurrences (on average) and trials x cells simulated at
+                           once; bounds memory.
+
+    Returns:
+        np.ndarray: Total loss of each trial.
+    """
+    if not 0.0 <= correlation < 1.0:
+        raise ValueError("Correlation must be in [0, 1)")
+
+    rng = np.random.default_rng(seed)
+    totals = np.zeros(trials, dtype=np.float64)
+    if len(likelihoods) == 0 or trials == 0:
+        return totals
+
+    correlated = correlation > 0.0 and groups is not None
+    risk_groups = np.asarray(groups, dtype=np.int64) if correlated else np.zeros(len(likelihoods), dtype=np.int64)
+    probabilities = config.probability(likelihoods)
+    mus = config.mu(impacts)
+
+    # Pool interchangeable risks: one cell per (group, probability, severity).
+    keys = np.stack([risk_groups, probabilities, mus], axis=1)
+    cells, sizes = np.unique(keys, axis=0, return_counts=True)
+    cell_groups, cell_probabilities = cells[:, 0].astype(np.int64), cells[:, 1]
+    cell_mus32 = cells[:, 2].astype(np.float32)
+
+    if correlated:
+        normal = NormalDist()
+        quantiles = np.array([
+            -math.inf if p <= 0.0 else math.inf if p >= 1.0 else normal.inv_cdf(p)
+            for p in cell_probabilities.tolist()
+        ])
+        shared_weight, own_weight = math.sqrt(correlation), math.sqrt(1.0 - correlation)
+        group_count = int(cell_groups.max()) + 1
+
+    # Per-chunk arrays hold one entry per occurrence (severities) or per trial and
+    # cell (factors, probabilities, counts), so both sizes are capped.
+    per_trial = max(1.0, float(probabilities.sum()), float(len(sizes)))
+    chunk = max(1, int(chunk_cells / per_trial))
+    for start in range(0, trials, chunk):
+        size = min(chunk, trials - start)
+        if correlated:
+            shared = rng.standard_normal((size, group_count))[:, cell_groups]
+            conditional = normal_cdf((quantiles - shared_weight * shared) / own_weight)
+            counts = rng.binomial(sizes, conditional)
+        else:
+            counts = rng.binomial(sizes, cell_probabilities, size=(size, len(sizes)))
+
+        # Occurrences laid out trial by trial, cell by cell within a trial. Single
+        # precision halves the cost of the severity draws; sums are kept in double.
+        severities = rng.standard_normal(int(counts.sum()), dtype=np.float32)
+        severities *= config.sigma
+        severities += np.repeat(np.broadcast_to(cell_mus32, counts.shape).ravel(), counts.ravel())
+        np.exp(severities, out=severities)
+
+        ends = np.cumsum(counts.sum(axis=1))
+        running = np.concatenate(([0.0], np.cumsum(severities, dtype=np.float64)))
+        totals[start:start + size] = np.diff(running[np.concatenate(([0], ends))])
+    return totals
+
+
+def summarize_losses(losses: np.ndarray, percentiles: Sequence[float] = PERCENTILES) -> dict:
+    """
+    Percentiles, Value at Risk and Expected Shortfall of simulated losses.
+
+    VaR at level q is the q-th percentile of the loss; Expected Shortfall is the mean
+    loss of the trials at or beyond it.
+    """
+    if len(losses) == 0:
+        return {
+            "expected_loss": 0.0, "standard_deviation": 0.0, "probability_of_loss": 0.0,
+            "percentiles": {percentile: 0.0 for percentile in percentiles},
+            "var_95": 0.0, "var_99": 0.0, "expected_shortfall_95": 0.0, "expected_shortfall_99": 0.0,
+        }
+
+    levels = sorted(set(percentiles) | {95.0, 99.0})
+    values = dict(zip(levels, np.percentile(losses, levels).tolist()))
+
+    def shortfall(level: float) -> float:
+        return float(losses[losses >= values[level]].mean())
+
+    return {
+        "expected_loss": float(losses.mean()),
+        "standard_deviation": float(losses.std()),
+        "probability_of_loss": float(np.count_nonzero(losses) / len(losses)),
+        "percentiles": {percentile: values[percentile] for percentile in percentiles},
+        "var_95": values[95.0],
+        "var_99": values[99.0],
+        "expected_shortfall_95": shortfall(95.0),
+        "expected_shortfall_99": shortfall(99.0),
+    }